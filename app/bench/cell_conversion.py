@@ -0,0 +1,102 @@
+"""Benchmark cell conversion over wide tables of mixed rich values
+
+Usage: PYTHONPATH=. python bench/cell_conversion.py --rows 20000 --columns 60
+"""
+import csv
+import io
+import os
+import random
+import sys
+import time
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.cell_converters import cell_text, compile_converters
+from common.lookup_expander import display_value
+
+FORMATS = ["text", "number", "currency", "date", "person", "select", "lookup", "checkbox", "link", "percent"]
+
+
+def _rich_cell(format_type, rng, row_index):
+    """Return a cell value shaped like valueFormat=rich for a column format type"""
+    if format_type == "currency":
+        return {"@context": "http://schema.org/", "@type": "MonetaryAmount", "currency": "USD",
+                "amount": round(rng.uniform(0, 500), 2)}
+    if format_type == "person":
+        name = rng.choice(["Ann Lee", "Bob Stone", "Cy Park"])
+        return {"@context": "http://schema.org/", "@type": "Person", "name": name,
+                "email": name.split()[0].lower() + "@example.com"}
+    if format_type == "lookup":
+        return [{"@context": "http://schema.org/", "@type": "StructuredValue", "additionalType": "row",
+                 "name": f"Row {ref}", "url": f"https://coda.io/d/_d#_ru{ref}", "tableId": "grid-0",
+                 "rowId": f"i-0-{ref}", "tableUrl": "https://coda.io/d/_d#_tugrid-0"}
+                for ref in rng.sample(range(1000), 2)]
+    if format_type == "link":
+        return {"@context": "http://schema.org/", "@type": "WebPage", "url": f"https://example.com/{row_index}"}
+    if format_type == "select":
+        return rng.sample(["Open", "Blocked", "Done", "Urgent"], rng.randint(0, 2))
+    if format_type == "number":
+        return round(rng.uniform(0, 1000), 3)
+    if format_type == "percent":
+        return rng.random()
+    if format_type == "checkbox":
+        return rng.random() < 0.5
+    if format_type == "date":
+        return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00.000Z"
+    return f"note {row_index} {rng.random():.6f}"
+
+
+def wide_table(rows=20000, columns=60, seed=0):
+    """Return (columns, rows of value lists) for a wide mixed-type table"""
+    rng = random.Random(seed)
+    column_meta = [{"id": f"c-{c}", "name": f"Column {c}", "format": {"type": FORMATS[c % len(FORMATS)]}}
+                   for c in range(columns)]
+    data = [[_rich_cell(col["format"]["type"], rng, r) for col in column_meta] for r in range(rows)]
+    return column_meta, data
+
+
+def _time(convert_row, data):
+    """Return the best of three passes converting and writing every row as CSV, in seconds"""
+    best = None
+    for _ in range(3):
+        writer = csv.writer(io.StringIO())
+        started = time.perf_counter()
+        for row in data:
+            writer.writerow(convert_row(row))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(rows=20000, columns=60):
+    """Time str(), generic display_value and compiled converters over the same table
+
+    The compiled converters run when rows are added to a Table during export, so
+    their pass covers both that conversion and the cell_text step at write time.
+    """
+    column_meta, data = wide_table(rows, columns)
+    converters = compile_converters(column_meta)
+    methods = {
+        "str": lambda row: [str(value) if value is not None else "" for value in row],
+        "display_value": lambda row: [display_value(value) for value in row],
+        "compiled": lambda row: [cell_text(convert(value)) for convert, value in zip(converters, row)],
+    }
+    cells = rows * columns
+    return {name: {"seconds": round(seconds, 4), "cells_per_second": round(cells / seconds)}
+            for name, seconds in ((name, _time(method, data)) for name, method in methods.items())}
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('--rows', default=20000, show_default=True, help='Rows in the table')
+@click.option('--columns', default=60, show_default=True, help='Columns in the table')
+def main(rows, columns):
+    """ Benchmark cell conversion over a wide mixed-type table """
+    print(f"{rows} rows x {columns} columns of mixed rich values")
+    for name, result in run(rows, columns).items():
+        print(f"  {name:14} {result['seconds']:>8}s {result['cells_per_second']:>12} cells/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Offline stand-in for the Coda REST API used by tests and benchmarks"""
+
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+API_PREFIX = "/apis/v1"
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 500
+
+
+def simple_value(value):
+    """Render a stored cell value the way valueFormat=simple does"""
+    if isinstance(value, list):
+        return ", ".join(str(simple_value(item)) for item in value)
+    if isinstance(value, dict):
+        if value.get("@type") == "MonetaryAmount":
+            return f"${value['amount']:,.2f}"
+        return value.get("name", value.get("amount", ""))
+    return value
+
+
+class FakeCodaServer:
+    """Serves docs, sections, tables, columns and rows from in-memory documents
+
+    Supports limit/pageToken pagination with nextPageLink, row queries, sync tokens,
+    row upserts, document and page creation, injected latency, periodic 429s and
+an initial outage answered with 503s.
+    """
+
+    def __init__(self, docs=(), latency=0.0, rate_limit_every=0, unavailable=0, host="127.0.0.1", port=0):
+        """Initialize the fake server
+
+        Args:
+            docs: Documents as produced by synthetic_doc.generate_doc
+            latency: Seconds slept before answering each request
+            rate_limit_every: Answer every Nth request with 429 (0 disables)
+            unavailable: Answer the first N requests with 503
+        """
+        self.docs = {doc["id"]: doc for doc in docs}
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.unavailable = unavailable
+        self.requests = []
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self._version = 0
+        for doc in self.docs.values():
+            for table in doc.get("tables", []):
+                for row in table.get("rows", []):
+                    row.setdefault("_version", 0)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base API URL to pass as the Pycoda endpoint"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        """Serve requests in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-coda", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    """--------+---------+---------+---------+---------+---------+---------+---------+---------|
+    |                                    R O U T I N G                                         |
+    |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+    def handle(self, method, path, params, body):
+        """Dispatch a request and return (status, payload)"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            count = next(self._counter)
+        if self.rate_limit_every and count % self.rate_limit_every == 0:
+            return 429, {"statusCode": 429, "statusMessage": "Too Many Requests", "message": "Rate limit exceeded"}
+        if count <= self.unavailable:
+            return 503, {"statusCode": 503, "statusMessage": "Service Unavailable", "message": "Try again later"}
+
+        for pattern, route_method, handler in self.ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match and route_method == method:
+                try:
+                    return handler(self, params, body, *match.groups())
+                except KeyError as e:
+                    return 404, {"statusCode": 404, "statusMessage": "Not Found", "message": f"Not found: {e}"}
+        return 404, {"statusCode": 404, "statusMessage": "Not Found", "message": f"No route for {method} {path}"}
+
+    def _page(self, params, items, path, extra=None):
+        """Slice items into a page following Coda's limit/pageToken conventions"""
+        limit = min(int(params.get("limit", DEFAULT_PAGE_LIMIT)), MAX_PAGE_LIMIT)
+        start = int(params.get("pageToken", 0))
+        page = {"items": items[start:start + limit]}
+        if start + limit < len(items):
+            token = str(start + limit)
+            query = {key: value for key, value in params.items() if key != "pageToken"}
+            query["pageToken"] = token
+            page["nextPageToken"] = token
+            page["nextPageLink"] = f"{self.url}{path}?{urlencode(query)}"
+        elif extra:
+            page.update(extra)
+        return 200, page
+
+    def _doc(self, doc_id):
+        """Return a stored document by ID"""
+        return self.docs[doc_id]
+
+    def _table(self, doc_id, table_id_or_name):
+        """Return a stored table by ID or name"""
+        for table in self._doc(doc_id).get("tables", []):
+            if table_id_or_name in (table["id"], table["name"]):
+                return table
+        raise KeyError(table_id_or_name)
+
+    def _column_id(self, table, column_id_or_name):
+        """Resolve a column ID or name to its ID"""
+        for col in table["columns"]:
+            if column_id_or_name in (col["id"], col["name"]):
+                return col["id"]
+        raise KeyError(column_id_or_name)
+
+    @staticmethod
+    def _meta(item, exclude=("columns", "rows", "sections", "tables")):
+        """Return a copy of item without nested collections or private keys"""
+        return {key: value for key, value in item.items() if key not in exclude and not key.startswith("_")}
+
+    """--------+---------+---------+---------+---------+---------+---------+---------+---------|
+    |                                  E N D P O I N T S                                       |
+    |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+    def list_docs(self, params, body):
+        return self._page(params, [self._meta(doc) for doc in self.docs.values()], "/docs")
+
+    def create_doc(self, params, body):
+        with self._lock:
+            doc_id = f"doc-new-{len(self.docs) + 1}"
+            doc = {"id": doc_id, "type": "doc", "name": body.get("title", ""), "owner": "bench@example.com",
+                   "ownerName": "Bench User", "sections": [], "tables": []}
+            self.docs[doc_id] = doc
+        return 201, self._meta(doc)
+
+    def get_doc(self, params, body, doc_id):
+        return 200, self._meta(self._doc(doc_id))
+
+    def list_sections(self, params, body, doc_id):
+        return self._page(params, self._doc(doc_id)["sections"], f"/docs/{doc_id}/pages")
+
+    def create_section(self, params, body, doc_id):
+        doc = self._doc(doc_id)
+        with self._lock:
+            section = {"id": f"canvas-{doc_id}-new-{len(doc['sections'])}", "type": "page",
+                       "name": body.get("name", ""), "contentType": "canvas"}
+            doc["sections"].append(section)
+        return 202, {"id": section["id"], "requestId": f"req-{section['id']}"}
+
+    def get_section(self, params, body, doc_id, section_id):
+        for section in self._doc(doc_id)["sections"]:
+            if section_id in (section["id"], section["name"]):
+                return 200, section
+        raise KeyError(section_id)
+
+    def update_section(self, params, body, doc_id, section_id):
+        for section in self._doc(doc_id)["sections"]:
+            if section_id in (section["id"], section["name"]):
+                section.update({key: body[key] for key in ("name", "subtitle") if key in body})
+                return 202, {"id": section["id"], "requestId": f"req-{section['id']}"}
+        raise KeyError(section_id)
+
+    def list_tables(self, params, body, doc_id):
+        tables = [self._meta(table) for table in self._doc(doc_id)["tables"]]
+        if params.get("tableTypes"):
+            wanted = params["tableTypes"].split(",")
+            tables = [table for table in tables if table.get("tableType", "table") in wanted]
+        return self._page(params, tables, f"/docs/{doc_id}/tables")
+
+    def get_table(self, params, body, doc_id, table_id):
+        table = self._table(doc_id, table_id)
+        meta = self._meta(table)
+        meta["rowCount"] = len(table["rows"])
+        return 200, meta
+
+    def list_columns(self, params, body, doc_id, table_id):
+        return self._page(params, self._table(doc_id, table_id)["columns"], f"/docs/{doc_id}/tables/{table_id}/columns")
+
+    def get_column(self, params, body, doc_id, table_id, column_id):
+        table = self._table(doc_id, table_id)
+        wanted = self._column_id(table, column_id)
+        return 200, next(col for col in table["columns"] if col["id"] == wanted)
+
+    def list_rows(self, params, body, doc_id, table_id):
+        table = self._table(doc_id, table_id)
+        rows = table["rows"]
+        if params.get("syncToken"):
+            since = int(params["syncToken"])
+            rows = [row for row in rows if row["_version"] > since]
+        if params.get("query"):
+            column, _, raw = params["query"].partition(":")
+            column_id = self._column_id(table, column.strip('"'))
+            wanted = json.loads(raw)
+            rows = [row for row in rows if simple_value(row["values"].get(column_id)) == wanted
+                    or str(simple_value(row["values"].get(column_id))) == str(wanted)]
+
+        rich = params.get("valueFormat") == "rich"
+        items = [
+            dict(self._meta(row), values=row["values"] if rich else
+                 {key: simple_value(value) for key, value in row["values"].items()})
+            for row in rows
+        ]
+        return self._page(params, items, f"/docs/{doc_id}/tables/{table_id}/rows",
+                          extra={"nextSyncToken": str(self._version)})
+
+    def upsert_rows(self, params, body, doc_id, table_id):
+        table = self._table(doc_id, table_id)
+        key_ids = [self._column_id(table, key) for key in body.get("keyColumns", [])]
+        added = []
+        with self._lock:
+            self._version += 1
+            for new_row in body.get("rows", []):
+                values = {self._column_id(table, cell["column"]): cell["value"] for cell in new_row.get("cells", [])}
+                matches = [
+                    row for row in table["rows"]
+                    if key_ids and all(row["values"].get(key) == values.get(key) for key in key_ids)
+                ]
+                for row in matches:
+                    row["values"].update(values)
+                    row["_version"] = self._version
+                if not matches:
+                    index = len(table["rows"])
+                    row_id = f"i-{table_id}-new-{index}"
+                    first = table["columns"][0]["id"] if table["columns"] else None
+                    table["rows"].append({
+                        "id": row_id, "type": "row", "index": index,
+                        "name": str(values.get(first, "")), "values": values, "_version": self._version
+                    })
+                    added.append(row_id)
+        return 202, {"requestId": f"req-{self._version}", "addedRowIds": added}
+
+    def list_empty(self, params, body, doc_id):
+        self._doc(doc_id)
+        return 200, {"items": []}
+
+    ROUTES = [
+        (r"/docs", "GET", list_docs),
+        (r"/docs", "POST", create_doc),
+        (r"/docs/([^/]+)", "GET", get_doc),
+        (r"/docs/([^/]+)/pages", "GET", list_sections),
+        (r"/docs/([^/]+)/pages", "POST", create_section),
+        (r"/docs/([^/]+)/pages/([^/]+)", "GET", get_section),
+        (r"/docs/([^/]+)/pages/([^/]+)", "PUT", update_section),
+        (r"/docs/([^/]+)/tables", "GET", list_tables),
+        (r"/docs/([^/]+)/tables/([^/]+)", "GET", get_table),
+        (r"/docs/([^/]+)/tables/([^/]+)/columns", "GET", list_columns),
+        (r"/docs/([^/]+)/tables/([^/]+)/columns/([^/]+)", "GET", get_column),
+        (r"/docs/([^/]+)/tables/([^/]+)/rows", "GET", list_rows),
+        (r"/docs/([^/]+)/tables/([^/]+)/rows", "POST", upsert_rows),
+        (r"/docs/([^/]+)/(?:formulas|controls|folders)", "GET", list_empty),
+    ]
+
+    def _handler_class(self):
+        """Build the request handler class bound to this server"""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self, method):
+                started = time.perf_counter()
+                url = urlparse(self.path)
+                path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else url.path
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+                status, payload = fake.handle(method, path, params, body)
+                data = json.dumps(payload).encode("utf-8")
+                # Record before responding so the log is complete once the client has its answer
+                with fake._lock:
+                    fake.requests.append({
+                        "method": method, "path": path, "status": status,
+                        "bytes": len(data), "seconds": time.perf_counter() - started
+                    })
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PUT(self):
+                self._dispatch("PUT")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,105 @@
+"""Benchmark JsonPlan.create_plan on multi-MB and deeply nested configs
+
+Usage: PYTHONPATH=. python bench/json_plan.py --docs 200 --depth 100000
+"""
+import json
+import os
+import sys
+import time
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.json_cli import JsonPlan
+
+
+def _recursive_plan(config):
+    """The former per-node recursive copy, kept as the baseline"""
+    if isinstance(config, (int, str)):
+        return config
+    if isinstance(config, dict):
+        return {key: _recursive_plan(val) for key, val in config.items()}
+    if isinstance(config, list):
+        return [_recursive_plan(val) for val in config]
+    return config
+
+
+def wide_config(docs=200, sections=10, tables=4, columns=12):
+    """Return a {"coda": {"docs": [...]}} config of docs holding sections, tables and columns"""
+    return {"coda": {"docs": [{
+        "name": f"Doc {d}",
+        "sections": [{
+            "name": f"Section {s}", "type": "canvas",
+            "tables": [{
+                "name": f"Table {s}.{t}",
+                "columns": [{"name": f"Column {c}", "type": "column", "display": c == 0,
+                             "format": {"type": "number", "precision": 2, "useThousandsSeparator": True}}
+                            for c in range(columns)]}
+                for t in range(tables)]}
+            for s in range(sections)]}
+        for d in range(docs)]}}
+
+
+def deep_config(depth=100000):
+    """Return a config nested depth levels deep"""
+    config = leaf = {}
+    for level in range(depth):
+        leaf["child"] = {"level": level}
+        leaf = leaf["child"]
+    return config
+
+
+def _best(function, repeat=3):
+    """Return (best seconds, result) of repeat calls"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(docs=200, depth=100000):
+    """Time the recursive baseline, the iterative copy, a re-plan after one change, and a deep config"""
+    config = wide_config(docs)
+    objPlan = JsonPlan(object(), {})  # create_plan makes no API calls
+    results = {"config_bytes": len(json.dumps(config))}
+
+    results["recursive"], _ = _best(lambda: _recursive_plan(config))
+    results["iterative"], plan = _best(lambda: objPlan.create_plan(config))
+
+    changed = json.loads(json.dumps(config))
+    changed["coda"]["docs"][docs // 2]["sections"][0]["tables"][0]["columns"][0]["name"] = "Renamed"
+    results["replan"], replan = _best(lambda: objPlan.create_plan(changed, plan))
+    shared = sum(1 for before, after in zip(plan["coda"]["docs"], replan["coda"]["docs"]) if before is after)
+    results["shared_docs"] = shared
+
+    deep = deep_config(depth)
+    try:
+        results["deep_recursive"], _ = _best(lambda: _recursive_plan(deep), repeat=1)
+    except RecursionError:
+        results["deep_recursive"] = None
+    results["deep_iterative"], _ = _best(lambda: objPlan.create_plan(deep), repeat=1)
+    return results
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('--docs', default=200, show_default=True, help='Docs in the wide config (200 is about 13 MB of JSON)')
+@click.option('--depth', default=100000, show_default=True, help='Nesting depth of the deep config')
+def main(docs, depth):
+    """ Benchmark JsonPlan traversal on wide and deep configs """
+    results = run(docs, depth)
+    print(f"wide config: {docs} docs, {results['config_bytes'] / 1e6:.1f} MB of JSON")
+    print(f"  {'recursive':14} {results['recursive']:>8.4f}s")
+    print(f"  {'iterative':14} {results['iterative']:>8.4f}s")
+    print(f"  {'replan':14} {results['replan']:>8.4f}s  {results['shared_docs']} of {docs} docs shared")
+    print(f"deep config: {depth} levels")
+    deep_recursive = results["deep_recursive"]
+    print(f"  {'recursive':14} {'RecursionError' if deep_recursive is None else f'{deep_recursive:.4f}s':>8}")
+    print(f"  {'iterative':14} {results['deep_iterative']:>8.4f}s")
+
+
+if __name__ == "__main__":
+    main()
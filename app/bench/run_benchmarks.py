@@ -0,0 +1,138 @@
+"""Benchmark exporters and importers against the fake Coda API server
+
+Usage: PYTHONPATH=. python bench/run_benchmarks.py --tables 3 --columns 8 --rows 5000
+"""
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from common.pycoda import Pycoda
+from common.table_data_exporter import TableDataExporter
+from common.template_exporter import TemplateExporter
+from common.template_importer import TemplateImporter
+
+
+def _export_table(pycoda, doc):
+    """Export every table as CSV, returning rows exported"""
+    exporter = TableDataExporter(pycoda)
+    for table in doc["tables"]:
+        exporter.export_table_csv(doc["id"], table["id"])
+    return sum(len(table["rows"]) for table in doc["tables"])
+
+
+def _export_template(pycoda, doc):
+    """Export the document structure as a YAML template"""
+    exporter = TemplateExporter(pycoda)
+    structure = exporter.extract_document_structure(doc["id"])
+    exporter.generate_yaml_template(structure, exporter.detect_variables(structure))
+    return 0
+
+
+def _import_template(pycoda, doc):
+    """Export then import the document template, creating a new document"""
+    exporter = TemplateExporter(pycoda)
+    structure = exporter.extract_document_structure(doc["id"])
+    yaml_content = exporter.generate_yaml_template(structure, exporter.detect_variables(structure))
+    TemplateImporter().create_document_from_template(yaml_content, {"DOC_NAME": "BenchCopy"}, pycoda)
+    return 0
+
+
+SCENARIOS = {
+    "export-table": _export_table,
+    "export-template": _export_template,
+    "import-template": _import_template,
+}
+
+
+def _percentile(values, fraction):
+    """Return the value at fraction (0..1) of the sorted values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_scenario(name, doc, latency=0.0, rate_limit_every=0, repeat=3):
+    """Run one scenario repeat times and return its measurements
+
+    Timing runs are separate from the tracemalloc run so tracing overhead does not
+    distort throughput.
+    """
+    operation = SCENARIOS[name]
+    with FakeCodaServer([doc], latency=latency, rate_limit_every=rate_limit_every) as server:
+        pycoda = Pycoda("bench-key", server.url)
+        pycoda.fltRetryBackoff = 0.01
+
+        timings = []
+        rows = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = operation(pycoda, doc)
+            timings.append(time.perf_counter() - started)
+        requests = list(server.requests)
+
+        tracemalloc.start()
+        operation(pycoda, doc)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    best = min(timings)
+    latencies = [request["seconds"] * 1000 for request in requests]
+    return {
+        "scenario": name,
+        "seconds": round(best, 4),
+        "rows": rows,
+        "rows_per_second": round(rows / best, 1) if rows and best else 0,
+        "requests": len(requests) // repeat,
+        "rate_limited": sum(1 for request in requests if request["status"] == 429) // repeat,
+        "latency_ms_p50": round(_percentile(latencies, 0.50), 2),
+        "latency_ms_p95": round(_percentile(latencies, 0.95), 2),
+        "latency_ms_mean": round(statistics.mean(latencies), 2) if latencies else 0,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(tables=2, columns=6, rows=2000, latency=0.0, rate_limit_every=0, repeat=3, scenarios=None):
+    """Run the selected scenarios over a synthetic document"""
+    doc = generate_doc(tables=tables, columns=columns, rows=rows)
+    return [
+        run_scenario(name, doc, latency, rate_limit_every, repeat)
+        for name in scenarios or SCENARIOS
+    ]
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('--tables', default=2, show_default=True, help='Tables in the synthetic document')
+@click.option('--columns', default=6, show_default=True, help='Columns per table')
+@click.option('--rows', default=2000, show_default=True, help='Rows per table')
+@click.option('--latency-ms', default=0.0, show_default=True, help='Latency injected per request')
+@click.option('--rate-limit-every', default=0, show_default=True, help='Answer every Nth request with 429')
+@click.option('--repeat', default=3, show_default=True, help='Timed runs per scenario (best is reported)')
+@click.option('--scenario', multiple=True, type=click.Choice(list(SCENARIOS)), help='Scenario to run (repeatable)')
+@click.option('--json-output', help='Write results as JSON to this file')
+def main(tables, columns, rows, latency_ms, rate_limit_every, repeat, scenario, json_output):
+    """ Benchmark coda-cli exporters against an offline Coda API """
+    results = run_benchmarks(tables, columns, rows, latency_ms / 1000.0, rate_limit_every, repeat, scenario)
+    print(f"Synthetic doc: {tables} tables x {columns} columns x {rows} rows")
+    print(f"{'scenario':16} {'seconds':>9} {'rows/s':>10} {'requests':>9} {'429s':>5} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'peak KB':>10}")
+    for result in results:
+        print(f"{result['scenario']:16} {result['seconds']:>9} {result['rows_per_second']:>10} "
+              f"{result['requests']:>9} {result['rate_limited']:>5} {result['latency_ms_p50']:>8} "
+              f"{result['latency_ms_p95']:>8} {result['peak_memory_kb']:>10}")
+    if json_output:
+        with open(json_output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Generate synthetic Coda documents for the fake API server"""
+
+import random
+
+# Column formats cycled through when generating columns
+COLUMN_FORMATS = [
+    {"type": "text"},
+    {"type": "number", "precision": 2},
+    {"type": "currency", "currencyCode": "USD"},
+    {"type": "checkbox"},
+    {"type": "date"},
+    {"type": "select"},
+    {"type": "person"},
+]
+
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
+STATUSES = ["Open", "In Progress", "Blocked", "Done"]
+PEOPLE = ["Ann Lee", "Bob Stone", "Cy Park", "Dee Moss"]
+
+
+def _cell(format_type, rng, row_index):
+    """Return a cell value for a column format type, rich where the API has a rich form"""
+    if format_type == "number":
+        return round(rng.uniform(0, 1000), 2)
+    if format_type == "currency":
+        return {"@context": "http://schema.org/", "@type": "MonetaryAmount", "currency": "USD",
+                "amount": round(rng.uniform(0, 500), 2)}
+    if format_type == "checkbox":
+        return rng.random() < 0.5
+    if format_type == "date":
+        return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    if format_type == "select":
+        return rng.choice(STATUSES)
+    if format_type == "person":
+        name = rng.choice(PEOPLE)
+        return {"@context": "http://schema.org/", "@type": "Person", "name": name,
+                "email": name.lower().replace(" ", ".") + "@example.com"}
+    return f"{rng.choice(WORDS)} {rng.choice(WORDS)} {row_index}"
+
+
+def generate_doc(doc_id="doc-bench", tables=2, columns=5, rows=1000, seed=0):
+    """Generate a document with tables x columns x rows of deterministic data
+
+    The last column of every table after the first is a lookup into the first table,
+    so expanded exports have references to resolve.
+
+    Returns:
+        Dict with id, name, ownerName, sections and tables (each with columns and rows)
+    """
+    rng = random.Random(seed)
+    sections = [
+        {"id": f"canvas-{doc_id}-{i}", "type": "page", "name": f"Section {i}", "contentType": "canvas"}
+        for i in range(max(1, tables))
+    ]
+    doc = {
+        "id": doc_id,
+        "type": "doc",
+        "name": f"Bench{doc_id.replace('-', '')}",
+        "owner": "bench@example.com",
+        "ownerName": "Bench User",
+        "sections": sections,
+        "tables": []
+    }
+
+    for t in range(tables):
+        table_id = f"grid-{doc_id}-{t}"
+        section = sections[t % len(sections)]
+        table_columns = []
+        for c in range(columns):
+            column_format = dict(COLUMN_FORMATS[c % len(COLUMN_FORMATS)])
+            if t > 0 and c == columns - 1:
+                first = doc["tables"][0]
+                column_format = {"type": "lookup", "table": {"id": first["id"], "name": first["name"]}}
+            table_columns.append({
+                "id": f"c-{t}-{c}",
+                "type": "column",
+                "name": f"Column {c}",
+                "display": c == 0,
+                "calculated": False,
+                "format": column_format
+            })
+
+        table_rows = []
+        for r in range(rows):
+            values = {}
+            for col in table_columns:
+                if col["format"]["type"] == "lookup":
+                    # Stored rich like currency and person cells, the server renders it as display text for valueFormat=simple
+                    target = doc["tables"][0]["rows"]
+                    ref = target[rng.randrange(len(target))] if target else None
+                    values[col["id"]] = {
+                        "@context": "http://schema.org/",
+                        "@type": "StructuredValue",
+                        "additionalType": "row",
+                        "name": ref["name"],
+                        "rowId": ref["id"],
+                        "tableId": doc["tables"][0]["id"]
+                    } if ref else ""
+                else:
+                    values[col["id"]] = _cell(col["format"]["type"], rng, r)
+            row_name = str(values[table_columns[0]["id"]]) if table_columns else f"Row {r}"
+            table_rows.append({
+                "id": f"i-{t}-{r}",
+                "type": "row",
+                "index": r,
+                "name": row_name,
+                "createdAt": "2024-01-01T00:00:00.000Z",
+                "updatedAt": "2024-01-01T00:00:00.000Z",
+                "values": values
+            })
+
+        doc["tables"].append({
+            "id": table_id,
+            "type": "table",
+            "tableType": "table",
+            "name": f"Table {t}",
+            "parent": {"id": section["id"], "type": "page", "name": section["name"]},
+            "columns": table_columns,
+            "rows": table_rows
+        })
+    return doc
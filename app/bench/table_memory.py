@@ -0,0 +1,87 @@
+"""Compare the memory held by API row dicts and by the compact Table model
+
+Usage: PYTHONPATH=. python bench/table_memory.py --rows 200000 --columns 8
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_coda_server import simple_value
+from bench.synthetic_doc import generate_doc
+from common.table_model import Table
+
+PAGE_SIZE = 200
+
+
+def api_pages(table, doc_id):
+    """Return the table's rows as JSON pages shaped like the Coda API's default (simple) format"""
+    pages = []
+    rows = table["rows"]
+    for start in range(0, len(rows), PAGE_SIZE):
+        items = [
+            dict(row,
+                 values={key: simple_value(value) for key, value in row["values"].items()},
+                 href=f"https://coda.io/apis/v1/docs/{doc_id}/tables/{table['id']}/rows/{row['id']}",
+                 browserLink=f"https://coda.io/d/_d{doc_id}#_tu{table['id']}/_ru{row['id']}")
+            for row in rows[start:start + PAGE_SIZE]
+        ]
+        pages.append(json.dumps({"items": items}))
+    return pages
+
+
+def _traced(build):
+    """Return (result, bytes still allocated by build)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def measure(rows=200000, columns=8):
+    """Measure bytes held by the list of row dicts and by a Table of the same rows"""
+    doc = generate_doc(tables=1, columns=columns, rows=rows)
+    table = doc["tables"][0]
+    pages = api_pages(table, doc["id"])
+    del doc
+
+    dict_rows, dict_bytes = _traced(lambda: [row for page in pages for row in json.loads(page)["items"]])
+    del dict_rows
+
+    def build_table():
+        compact = Table.from_columns(table["columns"])
+        for page in pages:
+            compact.extend(json.loads(page)["items"])
+        return compact
+
+    compact, table_bytes = _traced(build_table)
+    return {
+        "rows": len(compact),
+        "columns": columns,
+        "dict_rows_kb": round(dict_bytes / 1024, 1),
+        "table_kb": round(table_bytes / 1024, 1),
+        "ratio": round(table_bytes / dict_bytes, 3),
+    }
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('--rows', default=200000, show_default=True, help='Rows in the table')
+@click.option('--columns', default=8, show_default=True, help='Columns in the table')
+def main(rows, columns):
+    """ Compare memory of API row dicts with the compact Table model """
+    result = measure(rows, columns)
+    print(f"{result['rows']} rows x {result['columns']} columns")
+    print(f"  list of row dicts: {result['dict_rows_kb']:>12} KB")
+    print(f"  Table:             {result['table_kb']:>12} KB ({result['ratio']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
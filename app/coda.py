@@ -3,12 +3,19 @@
 import click
 #---------------
 # Custom library
+from common.compression import COMPRESSION_CHOICES
+from common.row_writers import OUTPUT_FORMATS
 from common.pycoda import Pycoda
 from common.template_exporter import TemplateExporter
 from common.template_registry import TemplateRegistry
 # Standard library
 import json
 import os
+import sys
+
+#------------------------------------------------------------------
+# Requests per window for reads and writes, and the window in seconds
+RATE_BUDGET_KEYS = ('CODA_RATE_READS', 'CODA_RATE_WRITES', 'CODA_RATE_WINDOW')
 
 """--------+---------+---------+---------+---------+---------+---------+---------+---------|
 |                                    M A I N   C L A S S                                   |
@@ -18,7 +25,7 @@ class Coda(object):
   """--------+---------+---------+---------+---------+---------+---------+---------+---------|
   |                                   C O N S T R U C T O R                                  |
   |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
-  def __init__(self, out):
+  def __init__(self, out, strRecordDir=None, strReplayDir=None, boolReplayTiming=False):
     #----------------------------
     # initialize class _CONSTANTS
     self._init_meta()
@@ -27,10 +34,23 @@ class Coda(object):
     # Class variables
     self.load_config()
 
+    #-------------------------------------------
+    # Replayed sessions never reach the Coda API
+    if strReplayDir and not self.API_KEY:
+      self.API_KEY = "replay"
+
     #-------------------------
     # Initialize click objects
     self.out = out
-    self.objCoda = Pycoda(self.API_KEY)
+    self.objCoda = Pycoda(self.API_KEY, self.API_ENDPOINT)
+    if self.RATE_BUDGET:
+      self.objCoda.budget = self.rate_budget()
+    if strRecordDir or strReplayDir:
+      from common.cassette import Cassette
+      if strReplayDir:
+        self.objCoda.cassette = Cassette(strReplayDir, "replay", boolReplayTiming)
+      else:
+        self.objCoda.cassette = Cassette(strRecordDir, "record")
 
   """--------+---------+---------+---------+---------+---------+---------+---------+---------|
   |                        E X T E R N A L   C L A S S   M E T H O D S                       |
@@ -107,29 +127,156 @@ class Coda(object):
     result = self.objCoda.list_columns(strDocId, strTableId)
     print ( result )
 
-  def list_rows(self, strDocId, strTableId):
+  def list_rows(self, strDocId, strTableId, strColumns=None, listWhere=None):
     strDocId = self.resolve_doc_id(strDocId)
-    result = self.objCoda.list_rows(strDocId, strTableId)
-    print ( result )
+    if not strColumns and not listWhere:
+      result = self.objCoda.list_rows(strDocId, strTableId)
+      print ( result )
+      return
+    #--------------------------------------------------
+    # Filter at the API where possible, project locally
+    from common.row_filter import parse_columns
+    from common.table_data_exporter import TableDataExporter
+    exporter = TableDataExporter(self.objCoda)
+    try:
+      _, rows = exporter.iter_filtered_rows(strDocId, strTableId, parse_columns(strColumns), listWhere or [])
+      for row in rows:
+        print( json.dumps(row), end='' )
+      print()
+    except ValueError as e:
+      raise click.ClickException(str(e))
+
+  def describe_table(self, strDocId, strTableId, strColumns=None, listWhere=None, intTop=5):
+    """Profile table columns in one streaming pass using TableDescriber"""
+    from common.row_filter import parse_columns
+    from common.table_describer import TableDescriber
+    strDocId = self.resolve_doc_id(strDocId)
+    describer = TableDescriber(self.objCoda, intTop)
+    describer.describe_with_cli_output(strDocId, strTableId, parse_columns(strColumns), listWhere or [], self.out)
 
-  def export_template(self, strDocId, strOutputFile=None):
+  def watch_table(self, strDocId, strTableId, fltMinInterval=1.0, fltMaxInterval=60.0, boolInitial=False, intMaxPolls=None, intReconcileEvery=30):
+    """Stream changed rows as NDJSON using TableWatcher, bounded by the rate budget"""
+    from common.table_watcher import TableWatcher
+    strDocId = self.resolve_doc_id(strDocId)
+    watcher = TableWatcher(self.objCoda, fltMinInterval, fltMaxInterval, budget=self.objCoda.budget or self.rate_budget(),
+                           reconcile_every=intReconcileEvery)
+    watcher.watch_with_cli_output(strDocId, strTableId, boolInitial, intMaxPolls)
+
+  def export_template(self, strDocId, strOutputFile=None, strCompress=None, boolDryRun=False):
     """Export document as YAML template using TemplateExporter"""
     strDocId = self.resolve_doc_id(strDocId)
+    if boolDryRun:
+      estimator = self.cost_estimator()
+      estimator.estimate_with_cli_output(estimator.estimate_export_template, strDocId, out=self.out)
+      return
     exporter = TemplateExporter(self.objCoda)
-    exporter.export_with_cli_output(strDocId, strOutputFile)
+    exporter.export_with_cli_output(strDocId, strOutputFile, strCompress)
 
-  def import_template(self, strTemplateFile, strVariables=None):
+  def import_template(self, strTemplateFile, strVariables=None, boolDryRun=False):
     """Import YAML template and create new document using TemplateImporter"""
     from common.template_importer import TemplateImporter
+    if boolDryRun:
+      estimator = self.cost_estimator()
+      estimator.estimate_with_cli_output(estimator.estimate_import_template, self.load_plan(strTemplateFile, strVariables).config, out=self.out)
+      return
     importer = TemplateImporter()
     importer.import_with_cli_output(strTemplateFile, strVariables, self.objCoda)
 
-  def export_table(self, strDocId, strTableId, strOutputFile=None):
-    """Export table data as CSV with comprehensive error handling"""
+  def export_table(self, strDocId, strTableId, strOutputFile=None, listExpand=None, strColumns=None, listWhere=None, intPrefetch=2, strCompress=None, boolResume=False, intShardRows=None, strShardBytes=None, strFormat="csv", boolDryRun=False):
+    """Export table data as CSV, JSON Lines or SQLite with comprehensive error handling"""
+    from common.row_filter import parse_columns
+    from common.sharded_output import parse_size
     from common.table_data_exporter import TableDataExporter
+    try:
+      intShardBytes = parse_size(strShardBytes) if strShardBytes else None
+    except ValueError as e:
+      raise click.BadParameter(str(e), param_hint="'--shard-bytes'")
     strDocId = self.resolve_doc_id(strDocId)
-    exporter = TableDataExporter(self.objCoda)
-    exporter.export_with_cli_output(strDocId, strTableId, strOutputFile)
+    if boolDryRun:
+      estimator = self.cost_estimator()
+      estimator.estimate_with_cli_output(estimator.estimate_export_table, strDocId, strTableId, listExpand or [], parse_columns(strColumns), listWhere or [], out=self.out)
+      return
+    exporter = TableDataExporter(self.objCoda, intPrefetch)
+    exporter.export_with_cli_output(strDocId, strTableId, strOutputFile, listExpand or [], parse_columns(strColumns), listWhere or [], strCompress, boolResume, intShardRows, intShardBytes, strFormat)
+
+  def cost_estimator(self):
+    """Return a CostEstimator under the configured rate budget, or Coda's published limits"""
+    from common.cost_estimator import CostEstimator
+    return CostEstimator(self.objCoda, self.objCoda.budget or self.rate_budget())
+
+  def copy_table(self, strSrcDocId, strSrcTableId, strDstDocId, strDstTableId, listKeyColumns=None, intBatchSize=100):
+    """Copy table rows into another table, streaming pages into batched upserts"""
+    from common.table_copier import TableCopier
+    strSrcDocId = self.resolve_doc_id(strSrcDocId)
+    strDstDocId = self.resolve_doc_id(strDstDocId)
+    copier = TableCopier(self.objCoda, batch_size=intBatchSize)
+    copier.copy_with_cli_output(strSrcDocId, strSrcTableId, strDstDocId, strDstTableId, listKeyColumns)
+
+  def backup(self, strDest, boolAllDocs=False, listDocIds=None, intJobs=4, boolFull=False):
+    """Back up documents into a content-addressed store using DocumentBackup"""
+    from common.doc_backup import DocumentBackup
+    if not boolAllDocs and not listDocIds:
+      raise click.UsageError("Specify --all-docs or at least one --doc")
+    listDocIds = None if boolAllDocs else [self.resolve_doc_id(strDocId) for strDocId in listDocIds]
+    backup = DocumentBackup(self.objCoda, strDest, intJobs)
+    backup.backup_with_cli_output(listDocIds, boolFull)
+
+  def mirror(self, strDocId, strDbPath, listIndexColumns=None, boolFull=False):
+    """Mirror document tables into a local SQLite database"""
+    from common.doc_mirror import DocumentMirror
+    strDocId = self.resolve_doc_id(strDocId)
+    mirror = DocumentMirror(self.objCoda, strDbPath)
+    mirror.mirror_with_cli_output(strDocId, listIndexColumns or [], boolFull)
+
+  def query(self, strDocId, strSql, strDbPath=None, boolRefresh=False):
+    """Run SQL against the local mirror of a document"""
+    from common.local_query import LocalQuery
+    strDocId = self.resolve_doc_id(strDocId)
+    query = LocalQuery(self.objCoda, strDbPath or f"{strDocId}.sqlite")
+    query.query_with_cli_output(strDocId, strSql, self.out, boolRefresh)
+
+  def fingerprint(self, strDocId, strCacheFile="fingerprints.json"):
+    """Print the structural hash tree of a document using DocumentFingerprint"""
+    from common.doc_fingerprint import DocumentFingerprint
+    strDocId = self.resolve_doc_id(strDocId)
+    fingerprint = DocumentFingerprint(self.objCoda, strCacheFile)
+    fingerprint.fingerprint_with_cli_output(strDocId, self.out)
+
+  def check_drift(self, strTemplate, listDocIds, strCacheFile="fingerprints.json"):
+    """Compare documents with a template document subtree by subtree"""
+    from common.doc_fingerprint import DocumentFingerprint
+    strTemplateDocId = self.resolve_doc_id(strTemplate)
+    listDocIds = [self.resolve_doc_id(strDocId) for strDocId in listDocIds]
+    fingerprint = DocumentFingerprint(self.objCoda, strCacheFile)
+    fingerprint.check_drift_with_cli_output(strTemplateDocId, listDocIds, self.out)
+
+  def plan(self, strFile, strDocId=None, strVariables=None, strCacheFile="fingerprints.json"):
+    """Print the operations that bring live docs in line with a template or JSON config"""
+    objPlan = self.load_plan(strFile, strVariables)
+    objPlan.plan_with_cli_output(strDocId and self.resolve_doc_id(strDocId), strCacheFile, self.out)
+
+  def apply(self, strFile, strDocId=None, strVariables=None, strCacheFile="fingerprints.json", intJobs=4):
+    """Execute the operations that bring live docs in line with a template or JSON config"""
+    objPlan = self.load_plan(strFile, strVariables)
+    objPlan.apply_with_cli_output(strDocId and self.resolve_doc_id(strDocId), strCacheFile, intJobs)
+
+  def load_plan(self, strFile, strVariables=None):
+    """Load a JSON config, or a YAML template with its variables substituted, into a JsonPlan"""
+    from common.json_cli import JsonFile, JsonPlan
+    from common.template_importer import TemplateImporter
+    if not os.path.exists(strFile):
+      raise click.ClickException(f"File not found: {strFile}")
+    try:
+      if strFile.endswith(".json"):
+        dictConfig = JsonFile(strFile).config
+      else:
+        importer = TemplateImporter()
+        with open(strFile, "r", encoding="utf-8") as f:
+          strYaml = importer.substitute_variables(f.read(), importer.parse_variables(strVariables))
+        dictConfig = importer.parse_yaml_template(strYaml)
+    except Exception as e:
+      raise click.ClickException(f"Invalid config {strFile}: {str(e)}")
+    return JsonPlan(self.objCoda, dictConfig)
 
   def register_template(self, strName, strDocId, strDescription=None):
     """Register a template with given name and document ID using TemplateRegistry"""
@@ -151,11 +298,18 @@ class Coda(object):
   |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
   def load_config(self):
     self.API_KEY = ""
+    self.API_ENDPOINT = None
+    self.RATE_BUDGET = {}
 
     #---------------------------
     # Load environment variables
     if 'CODA_API_KEY' in os.environ:
       self.API_KEY = os.environ['CODA_API_KEY']
+    if 'CODA_API_ENDPOINT' in os.environ:
+      self.API_ENDPOINT = os.environ['CODA_API_ENDPOINT']
+    for strKey in RATE_BUDGET_KEYS:
+      if strKey in os.environ:
+        self.RATE_BUDGET[strKey] = os.environ[strKey]
 
     #--------------------------------------
     # A JSON file supercedes os environment
@@ -164,6 +318,23 @@ class Coda(object):
             config = json.load(f)
             if 'CODA_API_KEY' in config:
               self.API_KEY = config['CODA_API_KEY']
+            if 'CODA_API_ENDPOINT' in config:
+              self.API_ENDPOINT = config['CODA_API_ENDPOINT']
+            for strKey in RATE_BUDGET_KEYS:
+              if strKey in config:
+                self.RATE_BUDGET[strKey] = config[strKey]
+
+  def rate_budget(self):
+    """Return the RateBudget configured by CODA_RATE_READS, CODA_RATE_WRITES and CODA_RATE_WINDOW"""
+    from common.rate_budget import DEFAULT_READS, DEFAULT_WINDOW, DEFAULT_WRITES, RateBudget
+    try:
+      return RateBudget(
+        int(self.RATE_BUDGET.get('CODA_RATE_READS', DEFAULT_READS)),
+        int(self.RATE_BUDGET.get('CODA_RATE_WRITES', DEFAULT_WRITES)),
+        float(self.RATE_BUDGET.get('CODA_RATE_WINDOW', DEFAULT_WINDOW))
+      )
+    except ValueError as e:
+      raise click.ClickException(f"Invalid rate budget: {str(e)}")
 
   def print_result(self, result):
     if self.out == 'text':
@@ -195,6 +366,11 @@ class Coda(object):
 """--------+---------+---------+---------+---------+---------+---------+---------+---------|
 |                                  M A I N   C O M M A N D                                 |
 |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+def command_succeeded():
+  """ Returns True unless the command is ending with an error (for use in close callbacks) """
+  exc = sys.exc_info()[1]
+  return exc is None or (isinstance(exc, click.exceptions.Exit) and exc.exit_code == 0)
+
 @click.group( context_settings=dict(help_option_names=['-h', '--help']) )
 @click.version_option("v0.1")
 #---------------
@@ -207,14 +383,57 @@ class Coda(object):
     'text'
   ]),
   help='Output type, default=text')
+#------------------
+# Cassette options
+@click.option('--record', 'record_dir', type=click.Path(file_okay=False), help='Record API responses to this directory')
+@click.option('--replay', 'replay_dir', type=click.Path(exists=True, file_okay=False), help='Replay API responses from this directory')
+@click.option('--replay-timing', is_flag=True, help='Reproduce recorded latencies when replaying')
+#-------------------
+# Telemetry options
+@click.option('--stats', is_flag=True, help='Print API call latency and export throughput to stderr on exit')
+@click.option('--profile', type=click.Choice(['cpu', 'mem']), help='Profile the command and report to stderr on exit')
+@click.option('--profile-output', default='coda.pstats', type=click.Path(dir_okay=False), help='pstats file written by --profile cpu, default=coda.pstats')
+@click.option('--metrics-file', type=click.Path(dir_okay=False), help='Write run metrics in Prometheus textfile format to this path')
+@click.option('--trace', 'trace_file', type=click.Path(dir_okay=False), help='Write nested timing spans to this trace file')
+@click.option('--trace-format', default='chrome', type=click.Choice(['chrome', 'json']), help='Trace file format, default=chrome (chrome://tracing, Perfetto)')
 @click.pass_context
 #--------------
 # Main function
-def clickMain(ctx, out):
+def clickMain(ctx, out, record_dir, replay_dir, replay_timing, stats, profile, profile_output, metrics_file, trace_file, trace_format):
   """
   This script prints coda data
   """
-  ctx.obj = Coda(out)
+  if record_dir and replay_dir:
+    raise click.UsageError("--record and --replay cannot be used together")
+  ctx.obj = Coda(out, record_dir, replay_dir, replay_timing)
+  if ctx.obj.objCoda.cassette:
+    ctx.call_on_close(ctx.obj.objCoda.cassette.close)
+  if stats or metrics_file:
+    from common.call_stats import CallStats
+    objStats = CallStats()
+    ctx.obj.objCoda.stats = objStats
+  if stats:
+    ctx.call_on_close(lambda: click.echo(objStats.format_summary(), err=True))
+  if metrics_file:
+    from common.metrics import RunMetrics
+    objMetrics = RunMetrics(objStats, ctx.invoked_subcommand).start()
+    ctx.call_on_close(lambda: objMetrics.write(metrics_file, command_succeeded()))
+  if trace_file:
+    from common.spans import span
+    from common.tracer import Tracer
+    objTracer = Tracer(trace_file, trace_format).start()
+    ctx.call_on_close(objTracer.stop)
+    #-----------------------------------------------------------
+    # The command span closes first as close callbacks run LIFO
+    objCommandSpan = span("command", command=ctx.invoked_subcommand)
+    objCommandSpan.__enter__()
+    ctx.call_on_close(lambda: objCommandSpan.__exit__(*(
+      (None, None, None) if command_succeeded() else sys.exc_info()
+    )))
+  if profile:
+    from common.profiler import Profiler
+    objProfiler = Profiler(profile, profile_output).start()
+    ctx.call_on_close(lambda: click.echo(objProfiler.stop(), err=True))
 
 """--------+---------+---------+---------+---------+---------+---------+---------+---------|
 |                             L I S T _ D O C S   C O M M A N D                            |
@@ -318,12 +537,53 @@ def list_columns(objCoda, doc, table):
 @clickMain.command()
 @click.option('--doc', required=True)
 @click.option('--table', required=True)
+@click.option('--columns', help='Comma-separated column names to return')
+@click.option('--where', multiple=True, help='Row filter as Column:value (repeatable)')
 @click.pass_obj
 #---------
 # Function 
-def list_rows(objCoda, doc, table):
+def list_rows(objCoda, doc, table, columns, where):
   """ Returns the list of rows in a table """
-  objCoda.list_rows(doc, table)
+  objCoda.list_rows(doc, table, columns, list(where))
+
+"""--------+---------+---------+---------+---------+---------+---------+---------+---------|
+|                       D E S C R I B E _ T A B L E   C O M M A N D                        |
+|----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+@clickMain.command()
+@click.option('--doc', required=True, help='Document ID')
+@click.option('--table', required=True, help='Table ID')
+@click.option('--columns', help='Comma-separated column names to describe')
+@click.option('--where', multiple=True, help='Row filter as Column:value (repeatable)')
+@click.option('--top', default=5, show_default=True, type=click.IntRange(0, 50), help='Most frequent values reported per column')
+@click.pass_obj
+#---------
+# Function 
+def describe_table(objCoda, doc, table, columns, where, top):
+  """ Profile nulls, distinct values, ranges and top values of each column """
+  objCoda.describe_table(doc, table, columns, list(where), top)
+
+"""--------+---------+---------+---------+---------+---------+---------+---------+---------|
+|                          W A T C H _ T A B L E   C O M M A N D                           |
+|----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+@clickMain.command()
+@click.option('--doc', required=True, help='Document ID')
+@click.option('--table', required=True, help='Table ID')
+@click.option('--min-interval', default=1.0, show_default=True, type=click.FloatRange(0.1), help='Seconds between polls while rows are changing')
+@click.option('--max-interval', default=60.0, show_default=True, type=click.FloatRange(0.1), help='Longest wait between polls of an idle table')
+@click.option('--initial', is_flag=True, help='Also emit every existing row as added on start')
+@click.option('--max-polls', type=click.IntRange(1), help='Stop after N polls (default: run until interrupted)')
+@click.option('--reconcile-every', default=30, show_default=True, type=click.IntRange(0), help='List the whole table every N polls to find deleted rows (0 disables)')
+@click.pass_obj
+#---------
+# Function 
+def watch_table(objCoda, doc, table, min_interval, max_interval, initial, max_polls, reconcile_every):
+  """ Stream changed rows as NDJSON, polling faster while rows change
+
+  Polls list only rows changed since the previous one, which never include
+  deleted rows, so deletions are found by a full listing every
+  --reconcile-every polls and are reported up to that many polls late.
+  """
+  objCoda.watch_table(doc, table, min_interval, max_interval, initial, max_polls, reconcile_every)
 
 """--------+---------+---------+---------+---------+---------+---------+---------+---------|
 |                            G E T _ C O L U M N   C O M M A N D                           |
@@ -370,12 +630,14 @@ def get_section(objCoda, doc, section):
 @clickMain.command()
 @click.option('--doc', required=True)
 @click.option('--output', '-o', help='Output file path (optional)')
+@click.option('--compress', type=click.Choice(COMPRESSION_CHOICES), help='Compress the output (default: from the --output extension)')
+@click.option('--dry-run', is_flag=True, help='Estimate API calls, pages, bytes and time without exporting; reads the doc, and its pages and tables unless cached')
 @click.pass_obj
 #---------
 # Function 
-def export_template(objCoda, doc, output):
+def export_template(objCoda, doc, output, compress, dry_run):
   """ Export document as YAML template """
-  objCoda.export_template(doc, output)
+  objCoda.export_template(doc, output, compress, dry_run)
 
 """--------+---------+---------+---------+---------+---------+---------+---------+---------|
 |                        I M P O R T _ T E M P L A T E   C O M M A N D                     |
@@ -383,12 +645,13 @@ def export_template(objCoda, doc, output):
 @clickMain.command()
 @click.option('--file', required=True, help='YAML template file path')
 @click.option('--variables', help='Template variables in format: VAR1=value1 VAR2=value2')
+@click.option('--dry-run', is_flag=True, help='Estimate API calls, bytes and time without creating the document')
 @click.pass_obj
 #---------
 # Function 
-def import_template(objCoda, file, variables):
+def import_template(objCoda, file, variables, dry_run):
   """ Import YAML template and create new document """
-  objCoda.import_template(file, variables)
+  objCoda.import_template(file, variables, dry_run)
 
 """--------+---------+---------+---------+---------+---------+---------+---------+---------|
 |                        E X P O R T _ T A B L E   C O M M A N D                           |
@@ -396,13 +659,86 @@ def import_template(objCoda, file, variables):
 @clickMain.command()
 @click.option('--doc', required=True, help='Document ID')
 @click.option('--table', required=True, help='Table ID')
-@click.option('--output', '-o', help='Output CSV file path (optional)')
+@click.option('--output', '-o', help='Output file path, or SQLite database for --format sqlite (optional)')
+@click.option('--format', 'output_format', default='csv', show_default=True, type=click.Choice(OUTPUT_FORMATS), help='Output format; jsonl and sqlite keep native value types')
+@click.option('--expand', multiple=True, type=click.Choice(['lookups']), help='Join lookup columns with the tables they reference')
+@click.option('--columns', help='Comma-separated column names to export')
+@click.option('--where', multiple=True, help='Row filter as Column:value (repeatable)')
+@click.option('--prefetch', default=2, show_default=True, type=click.IntRange(0, 32), help='Row pages fetched ahead of the writer (0 disables)')
+@click.option('--compress', type=click.Choice(COMPRESSION_CHOICES), help='Compress the output (default: from the --output extension)')
+@click.option('--resume', is_flag=True, help='Continue an interrupted export from its checkpoint')
+@click.option('--shard-rows', type=click.IntRange(1), help='Split the output into parts of at most N rows')
+@click.option('--shard-bytes', help='Split the output into parts of about SIZE of CSV text, e.g. 100MB')
+@click.option('--dry-run', is_flag=True, help='Estimate API calls, row pages, bytes and time without exporting; reads the table and its columns')
+@click.pass_obj
+#---------
+# Function 
+def export_table(objCoda, doc, table, output, output_format, expand, columns, where, prefetch, compress, resume, shard_rows, shard_bytes, dry_run):
+  """ Export table data as CSV, JSON Lines or SQLite """
+  objCoda.export_table(doc, table, output, list(expand), columns, list(where), prefetch, compress, resume, shard_rows, shard_bytes, output_format, dry_run)
+
+"""--------+---------+---------+---------+---------+---------+---------+---------+---------|
+|                           C O P Y _ T A B L E   C O M M A N D                            |
+|----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+@clickMain.command()
+@click.option('--src-doc', required=True, help='Source document ID')
+@click.option('--src-table', required=True, help='Source table ID')
+@click.option('--dst-doc', required=True, help='Destination document ID')
+@click.option('--dst-table', required=True, help='Destination table ID')
+@click.option('--key', multiple=True, help='Column name used to update matching rows (repeatable)')
+@click.option('--batch-size', default=100, show_default=True, type=click.IntRange(1, 500), help='Rows per upsert request')
+@click.pass_obj
+#---------
+# Function 
+def copy_table(objCoda, src_doc, src_table, dst_doc, dst_table, key, batch_size):
+  """ Copy table rows into another table, mapping columns by name """
+  objCoda.copy_table(src_doc, src_table, dst_doc, dst_table, list(key), batch_size)
+
+"""--------+---------+---------+---------+---------+---------+---------+---------+---------|
+|                               B A C K U P   C O M M A N D                                |
+|----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+@clickMain.command()
+@click.option('--dest', required=True, type=click.Path(file_okay=False), help='Backup directory holding blobs and snapshots')
+@click.option('--all-docs', is_flag=True, help='Back up every document returned by list-docs')
+@click.option('--doc', multiple=True, help='Document ID to back up (repeatable)')
+@click.option('--jobs', default=4, show_default=True, type=click.IntRange(1, 32), help='Documents backed up concurrently')
+@click.option('--full', is_flag=True, help='Export documents even when unchanged since the last snapshot')
 @click.pass_obj
 #---------
 # Function 
-def export_table(objCoda, doc, table, output):
-  """ Export table data as CSV """
-  objCoda.export_table(doc, table, output)
+def backup(objCoda, dest, all_docs, doc, jobs, full):
+  """ Back up document templates and table data with content-addressed dedup """
+  objCoda.backup(dest, all_docs, list(doc), jobs, full)
+
+"""--------+---------+---------+---------+---------+---------+---------+---------+---------|
+|                               M I R R O R   C O M M A N D                                |
+|----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+@clickMain.command()
+@click.option('--doc', required=True, help='Document ID')
+@click.option('--db', required=True, help='SQLite database file path')
+@click.option('--index', multiple=True, help='Column to index as Table.Column (repeatable)')
+@click.option('--full', is_flag=True, help='Reload all tables instead of refreshing incrementally')
+@click.pass_obj
+#---------
+# Function 
+def mirror(objCoda, doc, db, index, full):
+  """ Mirror document tables into a local SQLite database, one table per table ID """
+  objCoda.mirror(doc, db, list(index), full)
+
+"""--------+---------+---------+---------+---------+---------+---------+---------+---------|
+|                                Q U E R Y   C O M M A N D                                 |
+|----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+@clickMain.command()
+@click.option('--doc', required=True, help='Document ID')
+@click.option('--db', help='SQLite mirror path (default: <doc>.sqlite)')
+@click.option('--refresh', is_flag=True, help='Refresh the mirror from the API before querying')
+@click.argument('sql')
+@click.pass_obj
+#---------
+# Function 
+def query(objCoda, doc, db, refresh, sql):
+  """ Run SQL against locally mirrored tables, by table ID or by the document's table names """
+  objCoda.query(doc, sql, db, refresh)
 
 """--------+---------+---------+---------+---------+---------+---------+---------+---------|
 |                      R E G I S T E R _ T E M P L A T E   C O M M A N D                   |
@@ -439,6 +775,62 @@ def remove_template(objCoda, name):
   """ Remove a registered template """
   objCoda.remove_template(name)
 
+"""--------+---------+---------+---------+---------+---------+---------+---------+---------|
+|                          F I N G E R P R I N T   C O M M A N D                           |
+|----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+@clickMain.command()
+@click.option('--doc', required=True, help='Document ID or template name')
+@click.option('--cache', 'cache_file', default='fingerprints.json', show_default=True, help='File caching fingerprints of unchanged documents')
+@click.pass_obj
+#---------
+# Function 
+def fingerprint(objCoda, doc, cache_file):
+  """ Print the structural hash of a document and each section, table and column """
+  objCoda.fingerprint(doc, cache_file)
+
+#---------
+# Command
+@clickMain.command()
+@click.option('--template', required=True, help='Registered template name or template document ID')
+@click.option('--doc', multiple=True, required=True, help='Document ID to compare with the template (repeatable)')
+@click.option('--cache', 'cache_file', default='fingerprints.json', show_default=True, help='File caching fingerprints of unchanged documents')
+@click.pass_obj
+#---------
+# Function 
+def check_drift(objCoda, template, doc, cache_file):
+  """ Report structural drift from a template, exiting with status 1 on drift """
+  objCoda.check_drift(template, list(doc), cache_file)
+
+"""--------+---------+---------+---------+---------+---------+---------+---------+---------|
+|                            P L A N / A P P L Y   C O M M A N D                           |
+|----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+@clickMain.command()
+@click.option('--file', required=True, help='YAML template or JSON config describing the desired docs')
+@click.option('--doc', help='Document ID or template name to plan against (default: match docs by name)')
+@click.option('--variables', help='Template variables in format: VAR1=value1 VAR2=value2')
+@click.option('--cache', 'cache_file', default='fingerprints.json', show_default=True, help='File caching fingerprints of unchanged documents')
+@click.pass_obj
+#---------
+# Function 
+def plan(objCoda, file, doc, variables, cache_file):
+  """ Show the minimal operations that bring live docs in line with a config """
+  objCoda.plan(file, doc, variables, cache_file)
+
+#---------
+# Command
+@clickMain.command()
+@click.option('--file', required=True, help='YAML template or JSON config describing the desired docs')
+@click.option('--doc', help='Document ID or template name to apply to (default: match docs by name)')
+@click.option('--variables', help='Template variables in format: VAR1=value1 VAR2=value2')
+@click.option('--cache', 'cache_file', default='fingerprints.json', show_default=True, help='File caching fingerprints of unchanged documents')
+@click.option('--jobs', default=4, show_default=True, type=click.IntRange(1, 32), help='Operations executed concurrently')
+@click.pass_obj
+#---------
+# Function 
+def apply(objCoda, file, doc, variables, cache_file, jobs):
+  """ Execute only the operations a plan shows, skipping manual steps """
+  objCoda.apply(file, doc, variables, cache_file, jobs)
+
 """--------+---------+---------+---------+---------+---------+---------+---------+---------|
 |                                M A I N   P R O C E D U R E                               |
 |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
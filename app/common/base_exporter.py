@@ -1,6 +1,7 @@
 """Base class for Coda data exporters with shared API response handling"""
 
 import json
+from .spans import span
 
 
 class BaseExporter:
@@ -9,7 +10,20 @@ class BaseExporter:
     def __init__(self, pycoda_client):
         """Initialize exporter with Pycoda client"""
         self.pycoda = pycoda_client
+
+    def _record_rows(self, label, count, seconds):
+        """Report rows processed to the client's call statistics, when enabled"""
+        stats = getattr(self.pycoda, "stats", None)
+        if stats is not None:
+            stats.record_rows(label, count, seconds)
     
+    def _fetch_list(self, request, *args):
+        """Call a Pycoda list request and parse its response, timing both phases"""
+        with span("fetch"):
+            response_json = request(*args)
+        with span("parse"):
+            return self._parse_api_response(response_json)
+
     def _parse_api_response(self, response_json):
         """Parse API response handling both JSON array and concatenated JSON formats"""
         if not response_json or response_json == "{}":
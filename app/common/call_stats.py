@@ -0,0 +1,104 @@
+"""Per-request latency and throughput statistics for Pycoda API calls"""
+
+import math
+import re
+import threading
+from collections import defaultdict
+
+STATUS_PATTERN = re.compile(r"Status code: (\d+)")
+
+
+def status_of(error):
+    """Return the HTTP status for a call result, 200 on success and 0 when unknown"""
+    if error is None:
+        return 200
+    match = STATUS_PATTERN.search(str(error))
+    return int(match.group(1)) if match else 0
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile (fraction in 0..1) of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class CallStats:
+    """Collects every API call made through Pycoda and the rows moved by exports"""
+
+    def __init__(self):
+        """Initialize empty call and row statistics"""
+        self._lock = threading.Lock()
+        self.calls = defaultdict(list)
+        self.rows = []
+
+    def record_call(self, endpoint, status, size, seconds, retries=0, cache="miss"):
+        """Record one API call
+
+        Args:
+            endpoint: Endpoint label from Pycoda.endpoint_name
+            status: HTTP status (200 on success, 0 when unknown)
+            size: Response size in bytes
+            seconds: Wall time including retries
+            retries: Number of retried attempts
+            cache: "hit" when served locally, otherwise "miss"
+        """
+        with self._lock:
+            self.calls[endpoint].append((status, size, seconds, retries, cache))
+
+    def record_rows(self, label, count, seconds):
+        """Record rows processed by an export or copy and how long it took"""
+        with self._lock:
+            self.rows.append((label, count, seconds))
+
+    def snapshot(self):
+        """Return copies of the recorded calls per endpoint and the recorded rows"""
+        with self._lock:
+            return {endpoint: list(entries) for endpoint, entries in self.calls.items()}, list(self.rows)
+
+    def endpoint_summary(self):
+        """Return per-endpoint aggregates sorted by total time spent"""
+        calls, _ = self.snapshot()
+        summary = []
+        for endpoint, entries in calls.items():
+            latencies = [entry[2] for entry in entries]
+            summary.append({
+                "endpoint": endpoint,
+                "calls": len(entries),
+                "errors": sum(1 for entry in entries if entry[0] >= 400 or entry[0] == 0),
+                "bytes": sum(entry[1] for entry in entries),
+                "retries": sum(entry[3] for entry in entries),
+                "cache_hits": sum(1 for entry in entries if entry[4] == "hit"),
+                "seconds": sum(latencies),
+                "p50": percentile(latencies, 0.50),
+                "p95": percentile(latencies, 0.95),
+                "p99": percentile(latencies, 0.99),
+            })
+        return sorted(summary, key=lambda item: item["seconds"], reverse=True)
+
+    def format_summary(self):
+        """Return the summary as printable text"""
+        lines = [
+            "API call statistics:",
+            f"  {'endpoint':34} {'calls':>6} {'errors':>6} {'retries':>7} {'hits':>5} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'bytes':>11}"
+        ]
+        summary = self.endpoint_summary()
+        for item in summary:
+            lines.append(
+                f"  {item['endpoint'][:34]:34} {item['calls']:>6} {item['errors']:>6} {item['retries']:>7} "
+                f"{item['cache_hits']:>5} {item['p50'] * 1000:>8.1f} {item['p95'] * 1000:>8.1f} "
+                f"{item['p99'] * 1000:>8.1f} {item['bytes']:>11}"
+            )
+        lines.append(
+            f"  total: {sum(item['calls'] for item in summary)} calls, "
+            f"{sum(item['bytes'] for item in summary)} bytes, "
+            f"{sum(item['seconds'] for item in summary):.3f}s in API calls"
+        )
+        _, rows = self.snapshot()
+        for label, count, seconds in rows:
+            rate = count / seconds if seconds else 0.0
+            lines.append(f"  rows: {label}: {count} rows in {seconds:.3f}s ({rate:.1f} rows/s)")
+        return "\n".join(lines)
@@ -0,0 +1,152 @@
+"""Record and replay Coda API responses at the Pycoda transport level"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+DATA_FILE = "responses.bin"
+INDEX_FILE = "index.jsonl"
+CASSETTE_VERSION = 2
+
+
+class CassetteMissError(Exception):
+    """Raised when a replayed request was never recorded"""
+
+    def __init__(self, endpoint):
+        """Initialize with the endpoint for a descriptive error message"""
+        self.endpoint = endpoint
+        super().__init__(f"No recorded response for {endpoint}")
+
+
+def request_key(endpoint, args, kwargs):
+    """Return a stable key for a request from its endpoint and arguments"""
+    canonical = json.dumps([endpoint, list(args), kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Stores request/response pairs in an append-only compressed data file plus an index
+
+    Each response is a zlib-compressed JSON blob appended to responses.bin, and a
+    line giving its request key, endpoint, offset, length and seconds is appended
+    to index.jsonl right after it. A recording that crashes or is interrupted
+    therefore keeps every response recorded so far. On load the lines become a map
+    of request keys to every recorded occurrence, so replay seeks straight to the
+    response without reading the whole file. Repeated identical requests replay
+    their recordings in order.
+    """
+
+    def __init__(self, directory, mode="replay", timing=False):
+        """Initialize a cassette
+
+        Args:
+            directory: Directory holding responses.bin and index.jsonl
+            mode: "record" to append new responses, "replay" to serve recorded ones
+            timing: On replay, sleep for each request's recorded latency
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._played = {}
+        self._index = self._load_index()
+        if mode == "record":
+            os.makedirs(directory, exist_ok=True)
+            self._data = open(os.path.join(directory, DATA_FILE), "ab")
+            index_file = os.path.join(directory, INDEX_FILE)
+            fresh = not self._index["entries"]
+            if not fresh:
+                with open(index_file, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    complete = f.read(1) == b"\n"
+            self._index_file = open(index_file, "w" if fresh else "a", encoding="utf-8")
+            if fresh:
+                self._append_index({"version": CASSETTE_VERSION})
+            elif not complete:
+                self._index_file.write("\n")  # end a line cut short by a crash
+        else:
+            if not os.path.exists(os.path.join(directory, INDEX_FILE)):
+                raise FileNotFoundError(f"No cassette found in {directory}")
+            self._data = open(os.path.join(directory, DATA_FILE), "rb")
+
+    @property
+    def replaying(self):
+        """True when responses are served from disk"""
+        return self.mode == "replay"
+
+    def record(self, endpoint, args, kwargs, result=None, error=None, seconds=0.0):
+        """Append a response (or the error it raised) for a request"""
+        blob = zlib.compress(json.dumps({"result": result, "error": error}).encode("utf-8"))
+        key = request_key(endpoint, args, kwargs)
+        with self._lock:
+            self._data.seek(0, os.SEEK_END)
+            offset = self._data.tell()
+            self._data.write(blob)
+            self._data.flush()
+            occurrence = [offset, len(blob), round(seconds, 6)]
+            self._index["entries"].setdefault(key, []).append(occurrence)
+            self._index["endpoints"][key] = endpoint
+            self._append_index([key, endpoint] + occurrence)
+
+    def play(self, endpoint, args, kwargs):
+        """Return the recorded response for a request, raising the recorded error if any
+
+        Raises:
+            CassetteMissError: If the request was never recorded
+        """
+        key = request_key(endpoint, args, kwargs)
+        with self._lock:
+            occurrences = self._index["entries"].get(key)
+            if not occurrences:
+                raise CassetteMissError(endpoint)
+            position = self._played.get(key, 0)
+            self._played[key] = position + 1
+            offset, length, seconds = occurrences[min(position, len(occurrences) - 1)]
+            self._data.seek(offset)
+            entry = json.loads(zlib.decompress(self._data.read(length)))
+        if self.timing and seconds:
+            time.sleep(seconds)
+        if entry["error"] is not None:
+            raise Exception(entry["error"])
+        return entry["result"]
+
+    def close(self):
+        """Close the data and index files"""
+        with self._lock:
+            if self.mode == "record" and not self._index_file.closed:
+                self._index_file.close()
+            if not self._data.closed:
+                self._data.close()
+
+    def _append_index(self, entry):
+        """Append one line to index.jsonl and flush it, so it survives a crash"""
+        self._index_file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._index_file.flush()
+
+    def _load_index(self):
+        """Load the entries of an existing index, skipping a line cut short by a crash, or start an empty one"""
+        index = {"version": CASSETTE_VERSION, "entries": {}, "endpoints": {}}
+        index_file = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(index_file):
+            return index
+        with open(index_file, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            header = {}
+        if not isinstance(header, dict) or header.get("version") != CASSETTE_VERSION:
+            return index
+        for line in lines[1:]:
+            try:
+                key, endpoint, offset, length, seconds = json.loads(line)
+            except ValueError:
+                continue
+            index["entries"].setdefault(key, []).append([offset, length, seconds])
+            index["endpoints"][key] = endpoint
+        return index
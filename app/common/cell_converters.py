@@ -0,0 +1,91 @@
+"""Per-column cell converters compiled from list_columns format metadata"""
+
+import json
+
+def _name(value):
+    """Display name of a rich value (person, lookup row, select option)"""
+    return value.get("name") or value.get("email") or value.get("url") or _fallback(value)
+
+
+def _amount(value):
+    """Numeric amount of a currency value"""
+    amount = value.get("amount")
+    return amount if amount is not None else _fallback(value)
+
+
+def _url(value):
+    """Target of a link, image or attachment value"""
+    return value.get("url") or value.get("name") or _fallback(value)
+
+
+def _fallback(value):
+    """Any other structured value, by its name or amount or else as compact JSON"""
+    for key in ("name", "amount", "url"):
+        if value.get(key) is not None:
+            return value[key]
+    return json.dumps({key: item for key, item in value.items() if not key.startswith("@")},
+                      separators=(",", ":"), sort_keys=True)
+
+
+RICH_EXTRACTORS = {
+    "person": _name,
+    "lookup": _name,
+    "select": _name,
+    "reaction": _name,
+    "currency": _amount,
+    "link": _url,
+    "image": _url,
+    "attachments": _url,
+}
+
+
+def compile_converter(column):
+    """Return a function converting this column's cell values into clean typed values
+
+    Scalars (text, numbers, checkboxes, ISO dates) pass through unchanged. Rich
+    values become their useful scalar according to the column format: currency
+    amounts, person and lookup names, link URLs. Lists (multi-select, lookup
+    arrays) become lists of converted items. The format is resolved once here,
+    so converting a scalar cell costs two type checks.
+    """
+    format_type = (column.get("format") or {}).get("type", "text")
+    extract = RICH_EXTRACTORS.get(format_type, _fallback)
+
+    def convert(value):
+        kind = type(value)
+        if kind is dict:
+            return extract(value)
+        if kind is list:
+            return [convert(item) for item in value]
+        return value
+
+    return convert
+
+
+def compile_converters(columns):
+    """Compile one converter per column, in column order"""
+    return [compile_converter(column) for column in columns]
+
+
+def value_format_for(columns):
+    """Return "rich" when a column's values need a rich extractor, else None for the API default
+
+    In the simple format currency comes back as display text such as "$482.73",
+    and people, links and lookups as their display strings, so the converters
+    only produce amounts, names and URLs from rich values.
+    """
+    for column in columns:
+        if (column.get("format") or {}).get("type") in RICH_EXTRACTORS:
+            return "rich"
+    return None
+
+
+def cell_text(value):
+    """Render a converted value for csv.writer: lists joined by commas, anything else as is
+
+    csv.writer already writes None as an empty field and numbers via str(), so
+    scalars are passed through untouched rather than converted twice.
+    """
+    if type(value) is list:
+        return ", ".join("" if item is None else str(item) for item in value)
+    return value
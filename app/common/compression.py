@@ -0,0 +1,67 @@
+"""Streaming compressed outputs chosen explicitly or from the file extension"""
+
+import bz2
+import gzip
+import io
+import lzma
+
+
+def _zstd_open():
+    """Return an open() for zstd streams, or None when no zstd module is installed"""
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.open
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard.open
+    except ImportError:
+        return None
+
+
+COMPRESSORS = {
+    "gzip": (".gz", gzip.open),
+    "bz2": (".bz2", bz2.open),
+    "xz": (".xz", lzma.open),
+}
+ZSTD_OPEN = _zstd_open()
+if ZSTD_OPEN:
+    COMPRESSORS["zstd"] = (".zst", ZSTD_OPEN)
+
+COMPRESSION_CHOICES = ("gzip", "bz2", "xz", "zstd")
+
+
+def compression_for(path, compress=None):
+    """Return the compression for an output: the explicit choice, else the one matching its extension
+
+    Raises:
+        ValueError: If zstd is requested but no zstd module is available
+    """
+    if compress:
+        if compress not in COMPRESSORS:
+            raise ValueError(f"{compress} compression is not available (install the zstandard package)")
+        return compress
+    if path:
+        for name, (extension, _) in COMPRESSORS.items():
+            if str(path).endswith(extension):
+                return name
+    return None
+
+
+def open_output(target, compress=None):
+    """Open a text stream writing to a path or binary file object, compressing as it goes
+
+    Data is compressed incrementally as it is written, so no uncompressed copy of
+    the output is ever held in memory or on disk.
+
+    Args:
+        target: Output file path, or a binary file object such as sys.stdout.buffer
+            (file objects are only accepted together with compress)
+        compress: "gzip", "bz2", "xz" or "zstd"; defaults to the path's extension
+    """
+    name = compression_for(target if isinstance(target, str) else None, compress)
+    if name is None:
+        return open(target, "w", encoding="utf-8", newline="")
+    _, opener = COMPRESSORS[name]
+    return io.TextIOWrapper(opener(target, "wb"), encoding="utf-8", newline="")
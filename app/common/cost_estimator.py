@@ -0,0 +1,131 @@
+"""Dry-run estimates of the API calls, pages, bytes and time of imports and exports"""
+
+import math
+
+from .base_exporter import BaseExporter
+from .doc_fingerprint import DocumentFingerprint
+from .lookup_expander import LookupExpander
+from .pycoda import ROWS_PAGE_LIMIT
+from .rate_budget import RateBudget
+from .row_filter import RowFilter
+from .row_renderer import render_rows
+from .template_exporter import TemplateExporter
+
+HEADERS = ["operation", "calls", "reads", "writes", "pages", "bytes", "seconds", "dry_run_reads", "budget"]
+
+# Items per page of list requests made without a limit
+LIST_PAGE_LIMIT = 100
+# Typical JSON sizes of a listed doc, page, table or column, of a row without
+# its values, and of one cell value
+ITEM_BYTES = 500
+ROW_BYTES = 250
+CELL_BYTES = 40
+# Columns assumed per table when the document structure is not cached
+ASSUMED_COLUMNS = 10
+# Seconds per request when the rate budget is not what limits a sequential run
+TYPICAL_LATENCY = 0.3
+
+
+def pages_for(items, limit=LIST_PAGE_LIMIT):
+    """Return the pages needed to list items; an empty listing still takes one request"""
+    return max(1, math.ceil(items / limit))
+
+
+class CostEstimator(BaseExporter):
+    """Estimates what an import or export would cost without performing it
+
+    Estimates need only metadata: the template file for an import, the cached
+    fingerprint tree of an unchanged document (or a listing of its pages and
+    tables) for a template export, and the table's rowCount and columns for a
+    table export. Wall time is the larger of the requests made one after another
+    at a typical latency and the time the rate budget needs to let them through.
+    Those metadata requests are reads the dry run itself makes against the rate
+    budget, reported apart as dry_run_reads.
+    """
+
+    def __init__(self, pycoda_client, budget=None, cache_file="fingerprints.json"):
+        """Initialize CostEstimator
+
+        Args:
+            pycoda_client: Instance of Pycoda for API operations
+            budget: RateBudget to estimate under (default: the client's budget, else Coda's limits)
+            cache_file: Fingerprint cache holding the structure of documents seen before
+        """
+        super().__init__(pycoda_client)
+        self.budget = budget or getattr(pycoda_client, "budget", None) or RateBudget()
+        self.cache_file = cache_file
+
+    def estimate(self, operation, reads=0, writes=0, pages=0, size=0, dry_run_reads=0):
+        """Return an estimate dict for a number of read and write requests, and the reads made to estimate them"""
+        seconds = max((reads + writes) * TYPICAL_LATENCY, self.budget.seconds_for(reads, writes))
+        return {"operation": operation, "calls": reads + writes, "reads": reads, "writes": writes,
+                "pages": pages, "bytes": size, "seconds": round(seconds, 1), "dry_run_reads": dry_run_reads,
+                "budget": self.budget.describe()}
+
+    def estimate_import_template(self, template):
+        """Estimate import-template for a parsed template: it creates the document only"""
+        name = template["document"]["name"]
+        return self.estimate(f"import-template {name}", writes=1, size=ITEM_BYTES)
+
+    def estimate_export_template(self, doc_id):
+        """Estimate export-template, listing pages and tables only when the structure is not cached"""
+        templates = TemplateExporter(self.pycoda)
+        doc_data = templates.get_doc_data(doc_id)
+        if not doc_data.get("id"):
+            raise ValueError(f"Document not found: {doc_id}")
+        entry = DocumentFingerprint(self.pycoda, self.cache_file).cached_entry(doc_data["id"], doc_data.get("updatedAt"))
+        if entry and "sections" in entry:
+            sections = entry["sections"]
+            columns = [len(table["children"]) for section in entry["tree"]["children"].values()
+                       for table in section["children"].values()]
+            dry_run_reads = 1
+        else:
+            sections = len(self._fetch_list(self.pycoda.list_sections, doc_id))
+            columns = [ASSUMED_COLUMNS] * len(self._fetch_list(self.pycoda.list_tables, doc_id))
+            dry_run_reads = 1 + pages_for(sections) + pages_for(len(columns))
+        pages = pages_for(sections) + pages_for(len(columns)) + sum(pages_for(count) for count in columns)
+        items = 1 + sections + len(columns) + sum(columns)
+        return self.estimate(f"export-template {doc_id}", reads=1 + pages, pages=pages, size=items * ITEM_BYTES,
+                             dry_run_reads=dry_run_reads)
+
+    def estimate_export_table(self, doc_id, table_id, expand=(), select=None, where=()):
+        """Estimate export-table, including the tables --expand lookups would load
+
+        How many rows match --where cannot be known in advance, so with filters the
+        estimate is an upper bound.
+        """
+        rows, all_columns = self._table_size(doc_id, table_id)
+        columns = RowFilter(all_columns, select, where).columns
+        reads = pages_for(len(all_columns))
+        dry_run_reads = 1 + reads
+        pages = pages_for(rows, ROWS_PAGE_LIMIT)
+        size = len(all_columns) * ITEM_BYTES + rows * (ROW_BYTES + len(all_columns) * CELL_BYTES)
+        if "lookups" in expand:
+            for lookup_table_id in set(LookupExpander(self.pycoda, doc_id, columns).lookups.values()):
+                lookup_rows, lookup_columns = self._table_size(doc_id, lookup_table_id)
+                reads += pages_for(len(lookup_columns))
+                dry_run_reads += 1 + pages_for(len(lookup_columns))
+                pages += pages_for(lookup_rows, ROWS_PAGE_LIMIT)
+                size += len(lookup_columns) * ITEM_BYTES + lookup_rows * (ROW_BYTES + len(lookup_columns) * CELL_BYTES)
+        return self.estimate(f"export-table {table_id}", reads=reads + pages, pages=pages, size=size,
+                             dry_run_reads=dry_run_reads)
+
+    def _table_size(self, doc_id, table_id):
+        """Return (rowCount, columns) of a table"""
+        table = self._parse_api_response(self.pycoda.get_table(doc_id, table_id))
+        if not table or "rowCount" not in table[0]:
+            raise ValueError(f"Table not found: {table_id}")
+        return table[0]["rowCount"], self._parse_api_response(self.pycoda.list_columns(doc_id, table_id))
+
+    def estimate_with_cli_output(self, method, *args, out="text"):
+        """Run an estimate_* method and render its result in the --out format"""
+        try:
+            estimate = method(*args)
+            render_rows(HEADERS, [tuple(estimate[header] for header in HEADERS)], out)
+        except Exception as e:
+            # Import click here to avoid circular dependencies
+            import click
+            if isinstance(e, click.ClickException):
+                raise
+            else:
+                raise click.ClickException(f"Dry run failed: {str(e)}")
@@ -0,0 +1,266 @@
+"""Concurrent backups of Coda documents into a content-addressed blob store"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .base_exporter import BaseExporter
+from .spans import adopt, current_span_id, span
+from .table_data_exporter import TableDataExporter
+from .template_exporter import TemplateExporter
+
+
+class BlobWriter(io.RawIOBase):
+    """Gzip-compresses data into a temporary file while hashing the uncompressed bytes"""
+
+    def __init__(self, store):
+        """Start a new blob in store"""
+        super().__init__()
+        self.store = store
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.temp_file = os.path.join(store.root, f".tmp-{os.getpid()}-{id(self)}")
+        self._file = open(self.temp_file, "wb")
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode="wb", mtime=0)
+        self.digest = None
+        self.created = False
+        self._aborted = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        """Write data to the compressed blob and the running checksum"""
+        self._gzip.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def abort(self):
+        """Discard the blob when it is closed, e.g. after a failed export"""
+        self._aborted = True
+
+    def close(self):
+        """Finish the blob, keeping it only when the store has no blob with the same content"""
+        if self.closed:
+            return
+        self._gzip.close()
+        self._file.close()
+        super().close()
+        if self._aborted:
+            os.remove(self.temp_file)
+            return
+        self.digest = self.sha256.hexdigest()
+        self.created = self.store.commit(self.temp_file, self.digest)
+
+
+class BlobStore:
+    """Stores gzip-compressed blobs under blobs/ab/abcdef....gz, named by the SHA-256 of their content
+
+    Identical content is only ever stored once, so a table or template that did
+    not change between runs costs no extra space.
+    """
+
+    def __init__(self, root):
+        """Initialize a store rooted at a directory, creating it if needed"""
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+
+    def path(self, digest):
+        """Return the file holding a blob"""
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}.gz")
+
+    def exists(self, digest):
+        """Return True when a blob is stored"""
+        return os.path.exists(self.path(digest))
+
+    def open_text(self):
+        """Return (text stream, BlobWriter) for streaming a new blob; close the stream to store it"""
+        writer = BlobWriter(self)
+        return io.TextIOWrapper(io.BufferedWriter(writer), encoding="utf-8", newline=""), writer
+
+    def put(self, data):
+        """Store bytes, returning (digest, size, created)"""
+        writer = BlobWriter(self)
+        writer.write(data)
+        writer.close()
+        return writer.digest, writer.size, writer.created
+
+    def commit(self, temp_file, digest):
+        """Move a finished temporary blob into place, returning False when it was already stored"""
+        path = self.path(digest)
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(temp_file)
+                return False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_file, path)
+            return True
+
+
+class DocumentBackup(BaseExporter):
+    """Backs up the template and every table of many documents concurrently
+
+    Each run writes snapshots/<timestamp>.json listing, for every document, the
+    blobs holding its YAML template and the CSV data of each table. A document
+    whose updatedAt matches the previous snapshot is carried over without any
+    API calls, and any other unchanged content is deduplicated by the blob store.
+    """
+
+    def __init__(self, pycoda_client, dest, jobs=4):
+        """Initialize DocumentBackup
+
+        Args:
+            pycoda_client: Instance of Pycoda for API operations
+            dest: Backup directory holding blobs/ and snapshots/
+            jobs: Number of documents backed up at the same time
+        """
+        super().__init__(pycoda_client)
+        self.dest = dest
+        self.jobs = jobs
+        self.store = BlobStore(dest)
+        self.snapshot_dir = os.path.join(dest, "snapshots")
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def latest_snapshot(self):
+        """Return the most recent snapshot manifest, or None for a first run"""
+        names = sorted(name for name in os.listdir(self.snapshot_dir) if name.endswith(".json"))
+        if not names:
+            return None
+        with open(os.path.join(self.snapshot_dir, names[-1]), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def backup(self, doc_ids=None, full=False):
+        """Back up documents and write a snapshot manifest
+
+        Args:
+            doc_ids: Documents to back up (default: every document from list_docs)
+            full: Export every document even when it is unchanged since the last snapshot
+
+        Returns:
+            Tuple of (snapshot manifest dict, snapshot file path)
+        """
+        started = time.time()
+        docs = self._fetch_list(self.pycoda.list_docs)
+        if doc_ids:
+            known = {doc.get("id"): doc for doc in docs}
+            docs = [known.get(doc_id, {"id": doc_id}) for doc_id in doc_ids]
+
+        previous = {} if full else {
+            entry["id"]: entry for entry in (self.latest_snapshot() or {}).get("docs", [])
+        }
+        parent_id = current_span_id()
+
+        def run(doc):
+            with adopt(parent_id), span("backup", doc=doc.get("id")):
+                return self.backup_doc(doc, previous.get(doc.get("id")))
+
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="backup") as pool:
+            entries = list(pool.map(run, docs))
+
+        manifest = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started)),
+            "seconds": round(time.time() - started, 3),
+            "docs": entries,
+            "new_blobs": sum(entry["new_blobs"] for entry in entries),
+            "new_bytes": sum(entry["new_bytes"] for entry in entries),
+        }
+        # Microseconds keep names unique and in run order
+        name = time.strftime("%Y%m%dT%H%M%S", time.gmtime(started)) + f".{int(started * 1e6) % 1000000:06d}Z.json"
+        path = os.path.join(self.snapshot_dir, name)
+        temp_file = path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_file, path)
+        return manifest, path
+
+    def backup_doc(self, doc, previous=None):
+        """Back up one document, returning its snapshot entry
+
+        Errors are recorded in the entry rather than raised, so one failing document
+        does not stop the others.
+        """
+        doc_id = doc.get("id")
+        updated_at = doc.get("updatedAt")
+        if previous and not previous.get("error") and updated_at and previous.get("updatedAt") == updated_at \
+                and all(self.store.exists(digest) for digest in self._digests(previous)):
+            return dict(previous, unchanged=True, new_blobs=0, new_bytes=0)
+
+        entry = {"id": doc_id, "name": doc.get("name"), "updatedAt": updated_at, "new_blobs": 0, "new_bytes": 0}
+        try:
+            templates = TemplateExporter(self.pycoda)
+            structure = templates.extract_document_structure(doc_id)
+            entry["name"] = structure["name"]
+            with span("transform"):
+                yaml_content = templates.generate_yaml_template(structure, templates.detect_variables(structure))
+            with span("write", target="blob") as write_span:
+                digest, size, created = self.store.put(yaml_content.encode("utf-8"))
+                if write_span:
+                    write_span.attrs["bytes"] = size
+            entry["template"] = {"blob": digest, "bytes": size}
+            self._count(entry, size, created)
+
+            entry["tables"] = []
+            for table in structure["tables"]:
+                if table.get("tableType", "table") != "table":
+                    continue
+                entry["tables"].append(self._backup_table(entry, doc_id, table))
+        except Exception as e:
+            entry["error"] = str(e)
+        return entry
+
+    def _backup_table(self, entry, doc_id, table):
+        """Stream one table's CSV into the blob store, returning its snapshot entry"""
+        # Documents already run concurrently, so pages are not prefetched on top
+        exporter = TableDataExporter(self.pycoda, prefetch_depth=0)
+        stream, writer = self.store.open_text()
+        with stream:
+            try:
+                rows = exporter.write_table_csv(stream, doc_id, table["id"])
+            except BaseException:
+                writer.abort()
+                raise
+        self._count(entry, writer.size, writer.created)
+        return {"id": table["id"], "name": table.get("name"), "rows": rows or 0,
+                "blob": writer.digest, "bytes": writer.size}
+
+    def _count(self, entry, size, created):
+        """Add a newly stored blob to a document entry's totals (uncompressed bytes)"""
+        if created:
+            entry["new_blobs"] += 1
+            entry["new_bytes"] += size
+
+    def _digests(self, entry):
+        """Return every blob digest referenced by a snapshot entry"""
+        digests = [entry["template"]["blob"]] if entry.get("template") else []
+        return digests + [table["blob"] for table in entry.get("tables", [])]
+
+    def backup_with_cli_output(self, doc_ids=None, full=False):
+        """Back up documents with CLI-specific messaging"""
+        try:
+            import click
+            manifest, path = self.backup(doc_ids, full)
+            docs = manifest["docs"]
+            if not docs:
+                print("Warning: No documents found to back up")
+            failed = [entry for entry in docs if entry.get("error")]
+            for entry in failed:
+                print(f"{entry['id']}: {entry['error']}")
+            unchanged = sum(1 for entry in docs if entry.get("unchanged"))
+            print(f"Backed up {len(docs) - len(failed)} docs ({unchanged} unchanged), "
+                  f"{manifest['new_blobs']} new blobs ({manifest['new_bytes']} bytes), snapshot {path}")
+            if failed:
+                raise click.ClickException(f"Backup failed for {len(failed)} of {len(docs)} docs")
+        except Exception as e:
+            # Import click here to avoid circular dependencies
+            import click
+            if isinstance(e, click.ClickException):
+                raise
+            else:
+                raise click.ClickException(f"Backup failed: {str(e)}")
@@ -0,0 +1,234 @@
+"""Structural fingerprints of Coda documents and drift checks against templates"""
+
+import hashlib
+import json
+import os
+
+from .base_exporter import BaseExporter
+from .row_renderer import render_rows
+from .template_exporter import TemplateExporter, format_column
+
+# Keys that differ between documents created from the same template
+VOLATILE_KEYS = {"id", "href", "browserLink"}
+
+
+def _stable(value):
+    """Drop per-document identifiers from nested format metadata"""
+    if isinstance(value, dict):
+        return {key: _stable(item) for key, item in value.items() if key not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_stable(item) for item in value]
+    return value
+
+
+def _digest(attrs, children):
+    """Hash a node's own attributes together with its children's hashes"""
+    attrs_hash = hashlib.sha256(json.dumps(attrs, sort_keys=True).encode("utf-8")).hexdigest()
+    combined = hashlib.sha256(attrs_hash.encode("ascii"))
+    for key, child in children.items():
+        combined.update(f"\0{key}\0{child['hash']}".encode("utf-8"))
+    return attrs_hash, combined.hexdigest()
+
+
+def _node(attrs, children=None):
+    """Build a hash tree node"""
+    children = children or {}
+    attrs_hash, node_hash = _digest(attrs, children)
+    return {"hash": node_hash, "attrs": attrs_hash, "children": children}
+
+
+def _unique(key, siblings):
+    """Return key, suffixed with #2, #3, ... when a sibling already uses it"""
+    if key not in siblings:
+        return key
+    count = 2
+    while f"{key}#{count}" in siblings:
+        count += 1
+    return f"{key}#{count}"
+
+
+def fingerprint_tree(structure, index=None):
+    """Build a Merkle tree over the parts of a document structure a template defines
+
+    Sections hold their tables and tables their columns, keyed by name in document
+    order. Only what generate_yaml_template keeps is hashed: section names and
+    types, table names, and column types, formats, display flags and formulas,
+    without IDs or links. Documents created from one template therefore share
+    hashes, and a changed column changes exactly the hashes on its path to the root.
+
+    Args:
+        structure: Document structure as extract_document_structure returns it
+        index: Optional dict filled with each node's path, as diff_trees reports it, and source dict
+    """
+    index = {} if index is None else index
+    tables_by_section = {}
+    for table in structure.get("tables", []):
+        section_tables = tables_by_section.setdefault((table.get("parent") or {}).get("name"), {})
+        columns = {}
+        column_sources = {}
+        for column in table.get("columns", []):
+            key = _unique(column.get("name", ""), columns)
+            columns[key] = _node(_stable(format_column(column)))
+            column_sources[key] = column
+        key = _unique(table.get("name", ""), section_tables)
+        section_tables[key] = (_node({"name": table.get("name")}, columns), table, column_sources)
+
+    sections = {}
+
+    def add_section(key, attrs, source, tables):
+        sections[key] = _node(attrs, {table_key: entry[0] for table_key, entry in tables.items()})
+        index[f"/{key}"] = source
+        for table_key, (_, table, column_sources) in tables.items():
+            index[f"/{key}/{table_key}"] = table
+            for column_key, column in column_sources.items():
+                index[f"/{key}/{table_key}/{column_key}"] = column
+
+    for section in structure.get("sections", []):
+        name = section.get("name")
+        add_section(_unique(name, sections), {"name": name, "type": section.get("contentType")}, section,
+                    tables_by_section.pop(name, {}))
+    for name, tables in tables_by_section.items():
+        # Tables whose parent is not a listed section still count towards drift
+        add_section(_unique(name, sections), {"name": name, "type": None}, {"name": name}, tables)
+    return _node({}, sections)
+
+
+def diff_trees(expected, actual, path=""):
+    """Return (change, path) pairs for the smallest subtrees that differ
+
+    A node whose own attributes changed is reported as "changed"; otherwise only
+    its differing descendants are, so a single altered column is reported by its
+    own path rather than as a change of its table and section.
+    """
+    if expected["hash"] == actual["hash"]:
+        return []
+    if expected["attrs"] != actual["attrs"]:
+        return [("changed", path or "/")]
+    changes = []
+    for key, child in expected["children"].items():
+        child_path = f"{path}/{key}"
+        if key not in actual["children"]:
+            changes.append(("missing", child_path))
+        else:
+            changes.extend(diff_trees(child, actual["children"][key], child_path))
+    for key in actual["children"]:
+        if key not in expected["children"]:
+            changes.append(("extra", f"{path}/{key}"))
+    if not changes:
+        changes.append(("reordered", path or "/"))
+    return changes
+
+
+class DocumentFingerprint(BaseExporter):
+    """Computes document hash trees, reusing cached trees of unchanged documents
+
+    The cache maps each document ID to its updatedAt, tree and number of pages,
+    so checking a document that has not changed costs a single get_doc request.
+    """
+
+    def __init__(self, pycoda_client, cache_file="fingerprints.json"):
+        """Initialize DocumentFingerprint
+
+        Args:
+            pycoda_client: Instance of Pycoda for API operations
+            cache_file: JSON file caching trees by document ID, None to disable
+        """
+        super().__init__(pycoda_client)
+        self.cache_file = cache_file
+        self._cache = self._load_cache()
+
+    def fingerprint(self, doc_id):
+        """Return the hash tree of a document, from the cache when the document is unchanged"""
+        templates = TemplateExporter(self.pycoda)
+        doc_data = templates.get_doc_data(doc_id)
+        if not doc_data.get("id"):
+            raise ValueError(f"Document not found: {doc_id}")
+        updated_at = doc_data.get("updatedAt")
+        cached = self.cached(doc_data["id"], updated_at)
+        if cached:
+            return cached
+        structure = templates.extract_document_structure(doc_id, doc_data)
+        tree = fingerprint_tree(structure)
+        if updated_at:
+            # The tree also holds pseudo-sections for tables outside listed pages, so count pages apart
+            self._cache[doc_data["id"]] = {"updatedAt": updated_at, "tree": tree,
+                                           "sections": len(structure.get("sections", []))}
+            self._save_cache()
+        return tree
+
+    def cached(self, doc_id, updated_at):
+        """Return the cached tree of a document last seen at updated_at, or None"""
+        entry = self.cached_entry(doc_id, updated_at)
+        return entry["tree"] if entry else None
+
+    def cached_entry(self, doc_id, updated_at):
+        """Return the cache entry ({"updatedAt", "tree", "sections"}) of a document last seen at updated_at, or None"""
+        entry = self._cache.get(doc_id)
+        if entry and updated_at and entry.get("updatedAt") == updated_at:
+            return entry
+        return None
+
+    def check_drift(self, template_doc_id, doc_ids):
+        """Return {doc_id: [(change, path), ...]} comparing each document with the template document"""
+        expected = self.fingerprint(template_doc_id)
+        return {doc_id: diff_trees(expected, self.fingerprint(doc_id)) for doc_id in doc_ids}
+
+    def fingerprint_with_cli_output(self, doc_id, out="text"):
+        """Print the root hash and the hash of every section, table and column"""
+        try:
+            tree = self.fingerprint(doc_id)
+            render_rows(["path", "hash"], self._walk(tree), out)
+        except Exception as e:
+            # Import click here to avoid circular dependencies
+            import click
+            if isinstance(e, click.ClickException):
+                raise
+            else:
+                raise click.ClickException(f"Fingerprint failed: {str(e)}")
+
+    def check_drift_with_cli_output(self, template_doc_id, doc_ids, out="text"):
+        """Report drift per document and subtree, exiting with status 1 when any document drifted"""
+        try:
+            import click
+            drift = self.check_drift(template_doc_id, doc_ids)
+            rows = []
+            for doc_id, changes in drift.items():
+                rows.extend((doc_id, change, path) for change, path in changes)
+                if not changes:
+                    rows.append((doc_id, "none", ""))
+            render_rows(["doc", "drift", "path"], rows, out)
+        except Exception as e:
+            # Import click here to avoid circular dependencies
+            import click
+            if isinstance(e, click.ClickException):
+                raise
+            else:
+                raise click.ClickException(f"Drift check failed: {str(e)}")
+        if any(drift.values()):
+            raise click.exceptions.Exit(1)
+
+    def _walk(self, node, path=""):
+        """Yield (path, hash) for a node and its descendants, depth first"""
+        yield path or "/", node["hash"]
+        for key, child in node["children"].items():
+            yield from self._walk(child, f"{path}/{key}")
+
+    def _load_cache(self):
+        """Load cached trees, starting empty when the cache is missing or unreadable"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self):
+        """Atomically write the cache file"""
+        if not self.cache_file:
+            return
+        temp_file = self.cache_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(self._cache, f)
+        os.replace(temp_file, self.cache_file)
@@ -0,0 +1,253 @@
+"""Mirror Coda document tables into a local SQLite read replica"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from .base_exporter import BaseExporter
+from .cell_converters import compile_converters, value_format_for
+
+
+# Column format types stored with numeric SQLite affinity
+SQL_TYPES = {
+    "number": "REAL",
+    "percent": "REAL",
+    "currency": "REAL",
+    "slider": "REAL",
+    "scale": "REAL",
+    "checkbox": "INTEGER",
+}
+
+# Bookkeeping tables describing what has been mirrored
+META_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS _coda_tables (
+        table_id TEXT PRIMARY KEY,
+        doc_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        schema_hash TEXT NOT NULL,
+        sync_token TEXT,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        refreshed_at REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS _coda_columns (
+        table_id TEXT NOT NULL,
+        column_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        sql_type TEXT NOT NULL,
+        format_type TEXT,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (table_id, column_id)
+    )""",
+]
+
+# Version of how cell values are stored, part of the schema hash so that mirrors
+# loaded by an older version are rebuilt rather than refreshed incrementally
+VALUE_FORMAT_VERSION = 2
+
+# Columns added to every mirrored table ahead of the Coda columns
+ROW_COLUMNS = ["_row_id", "_row_index", "_updated_at"]
+
+
+def quote_identifier(name):
+    """Quote a Coda table or column name for use as an SQLite identifier"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sql_type_for(column):
+    """Return the SQLite column type for a Coda column based on its format"""
+    format_type = (column.get("format") or {}).get("type", "text")
+    return SQL_TYPES.get(format_type, "TEXT")
+
+
+def to_sql_value(value):
+    """Convert a Coda cell value into a value SQLite can bind"""
+    if value is None or isinstance(value, (str, int, float)):
+        return int(value) if isinstance(value, bool) else value
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+class DocumentMirror(BaseExporter):
+    """Creates and incrementally refreshes one SQLite table per Coda table
+
+    Each SQLite table is named by its Coda table ID, which is unique across
+    documents, so several documents, or tables sharing a name, can be mirrored
+    into one database. The display name is kept in _coda_tables; table_views()
+    maps a document's names onto its tables for queries.
+    """
+
+    def __init__(self, pycoda_client, db_path):
+        """Initialize DocumentMirror with Pycoda client and SQLite database path"""
+        super().__init__(pycoda_client)
+        self.db_path = db_path
+
+    def connect(self):
+        """Open the mirror database and ensure the bookkeeping tables exist"""
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            for statement in META_SCHEMA:
+                conn.execute(statement)
+        return conn
+
+    def mirror_document(self, doc_id, index_columns=(), full=False):
+        """Mirror every table in a document, refreshing incrementally where possible
+
+        Args:
+            doc_id: Coda document ID
+            index_columns: "Table.Column" names to index after loading
+            full: Reload every table from scratch instead of using sync tokens
+
+        Returns:
+            List of dicts with table name, rows loaded and refresh mode
+        """
+        conn = self.connect()
+        try:
+            results = []
+            tables = self._parse_api_response(self.pycoda.list_tables(doc_id))
+            for table in tables:
+                if table.get("tableType", "table") != "table":
+                    continue
+                results.append(self.mirror_table(conn, doc_id, table, full))
+            self.create_indexes(conn, doc_id, index_columns)
+            return results
+        finally:
+            conn.close()
+
+    def mirror_table(self, conn, doc_id, table, full=False):
+        """Mirror a single table, rebuilding it when its column schema changed"""
+        table_id = table["id"]
+        columns = self._parse_api_response(self.pycoda.list_columns(doc_id, table_id))
+        schema_hash = self._schema_hash(table, columns)
+
+        state = conn.execute(
+            "SELECT schema_hash, sync_token FROM _coda_tables WHERE table_id = ?", (table_id,)
+        ).fetchone()
+        incremental = bool(state and not full and state[0] == schema_hash and state[1])
+
+        with conn:
+            if not incremental:
+                self._create_table(conn, doc_id, table, columns, schema_hash, state)
+            sync_token = state[1] if incremental else None
+            loaded, next_sync_token = self._load_rows(conn, doc_id, table, columns, sync_token)
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {quote_identifier(table_id)}").fetchone()[0]
+            conn.execute(
+                "UPDATE _coda_tables SET sync_token = ?, row_count = ?, refreshed_at = ? WHERE table_id = ?",
+                (next_sync_token or sync_token, row_count, time.time(), table_id)
+            )
+        return {
+            "table": table["name"],
+            "rows": loaded,
+            "mode": "incremental" if incremental else "full"
+        }
+
+    def create_indexes(self, conn, doc_id, index_columns):
+        """Create indexes for "Table.Column" names on the mirrored tables of a document"""
+        table_ids = {name: table_id for name, table_id in self.table_views(conn, doc_id)}
+        with conn:
+            for spec in index_columns:
+                table_name, sep, column_name = spec.partition(".")
+                if not sep or not table_name or not column_name:
+                    raise ValueError(f"Invalid index '{spec}', expected Table.Column")
+                if table_name not in table_ids:
+                    raise ValueError(f"Invalid index '{spec}', no mirrored table named {table_name}")
+                table_id = table_ids[table_name]
+                index_name = quote_identifier(f"ix_{table_id}_{column_name}")
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} "
+                    f"ON {quote_identifier(table_id)} ({quote_identifier(column_name)})"
+                )
+
+    def table_views(self, conn, doc_id):
+        """Return (name, table ID) of a document's mirrored tables whose name is unique in it"""
+        rows = conn.execute("SELECT name, table_id FROM _coda_tables WHERE doc_id = ?", (doc_id,)).fetchall()
+        counts = {}
+        for name, _ in rows:
+            counts[name] = counts.get(name, 0) + 1
+        return [(name, table_id) for name, table_id in rows if counts[name] == 1 and name != table_id]
+
+    def _schema_hash(self, table, columns):
+        """Hash table name, column names/types and the value format version to detect schema changes"""
+        schema = [VALUE_FORMAT_VERSION, table.get("name")] + [
+            [col.get("id"), col.get("name"), sql_type_for(col)] for col in columns
+        ]
+        return hashlib.sha1(json.dumps(schema).encode("utf-8")).hexdigest()
+
+    def _create_table(self, conn, doc_id, table, columns, schema_hash, state):
+        """Drop and recreate the SQLite table and its bookkeeping rows"""
+        table_id = table["id"]
+        if state:
+            # Mirrors built before tables were named by ID hold the table under its
+            # display name; drop it unless another mirrored table has that name
+            previous = conn.execute("SELECT name FROM _coda_tables WHERE table_id = ?", (table_id,)).fetchone()
+            shared = conn.execute("SELECT 1 FROM _coda_tables WHERE name = ? AND table_id != ?",
+                                  (previous[0], table_id)).fetchone()
+            if not shared and previous[0] != table_id:
+                conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(previous[0])}")
+        conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(table_id)}")
+
+        column_defs = ["_row_id TEXT PRIMARY KEY", "_row_index INTEGER", "_updated_at TEXT"]
+        column_defs += [f"{quote_identifier(col['name'])} {sql_type_for(col)}" for col in columns]
+        conn.execute(f"CREATE TABLE {quote_identifier(table_id)} ({', '.join(column_defs)})")
+
+        conn.execute("DELETE FROM _coda_columns WHERE table_id = ?", (table_id,))
+        conn.executemany(
+            "INSERT INTO _coda_columns (table_id, column_id, name, sql_type, format_type, position) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (table_id, col["id"], col["name"], sql_type_for(col),
+                 (col.get("format") or {}).get("type"), position)
+                for position, col in enumerate(columns)
+            ]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO _coda_tables (table_id, doc_id, name, schema_hash, sync_token, row_count, refreshed_at) "
+            "VALUES (?, ?, ?, ?, NULL, 0, ?)",
+            (table_id, doc_id, table["name"], schema_hash, time.time())
+        )
+
+    def _load_rows(self, conn, doc_id, table, columns, sync_token):
+        """Bulk-insert row pages with executemany, returning rows loaded and the next sync token
+
+        Cells are converted by column format, as export-table does, so currency
+        columns hold amounts rather than "$…" text.
+        """
+        column_ids = [col["id"] for col in columns]
+        cells = list(zip(column_ids, compile_converters(columns)))
+        names = ROW_COLUMNS + [col["name"] for col in columns]
+        statement = (
+            f"INSERT OR REPLACE INTO {quote_identifier(table['id'])} "
+            f"({', '.join(quote_identifier(name) for name in names)}) "
+            f"VALUES ({', '.join('?' for _ in names)})"
+        )
+
+        loaded = 0
+        next_sync_token = None
+        pages = self.pycoda.iter_row_pages(doc_id, table["id"], strValueFormat=value_format_for(columns),
+                                           strSyncToken=sync_token)
+        for page in pages:
+            items = page.get("items", [])
+            conn.executemany(statement, (
+                [row.get("id"), row.get("index"), row.get("updatedAt")]
+                + [to_sql_value(convert(row.get("values", {}).get(column_id))) for column_id, convert in cells]
+                for row in items
+            ))
+            loaded += len(items)
+            next_sync_token = page.get("nextSyncToken") or next_sync_token
+        return loaded, next_sync_token
+
+    def mirror_with_cli_output(self, doc_id, index_columns=(), full=False):
+        """Mirror a document with CLI-specific messaging"""
+        try:
+            results = self.mirror_document(doc_id, index_columns, full)
+            if not results:
+                print("Warning: No tables found in the specified document")
+                return
+            for result in results:
+                print(f"{result['table']}: {result['rows']} rows ({result['mode']})")
+            print(f"Document mirrored to {self.db_path}")
+        except Exception as e:
+            # Import click here to avoid circular dependencies
+            import click
+            if isinstance(e, click.ClickException):
+                raise
+            else:
+                raise click.ClickException(f"Mirror failed: {str(e)}")
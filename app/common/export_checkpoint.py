@@ -0,0 +1,64 @@
+"""Sidecar checkpoints that let an interrupted export-table resume"""
+
+import json
+import os
+import time
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+class ExportCheckpoint:
+    """Records the next page token, rows written and output byte offset of an export
+
+    The checkpoint is saved after each complete page reaches the output file, so
+    resuming truncates the file to the saved offset (dropping any partial trailing
+    row) and continues with the page that follows.
+    """
+
+    def __init__(self, output_file, params):
+        """Initialize a checkpoint for an output file
+
+        Args:
+            output_file: Uncompressed CSV file being written
+            params: Export parameters that must match for a resume to be valid
+        """
+        self.output_file = output_file
+        self.path = output_file + CHECKPOINT_SUFFIX
+        self.params = params
+
+    def load(self):
+        """Return the saved state, or None when there is nothing to resume
+
+        Raises:
+            ValueError: If the checkpoint belongs to a different export or the output
+                file is shorter than the checkpointed offset
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("params") != self.params:
+            raise ValueError(f"Checkpoint {self.path} was written by a different export, remove it to start over")
+        size = os.path.getsize(self.output_file) if os.path.exists(self.output_file) else -1
+        if size < state["offset"]:
+            raise ValueError(f"{self.output_file} is shorter than its checkpoint, remove {self.path} to start over")
+        return state
+
+    def save(self, page_token, rows, offset):
+        """Atomically record progress after a page has been written and flushed"""
+        state = {
+            "params": self.params,
+            "page_token": page_token,
+            "rows": rows,
+            "offset": offset,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_file, self.path)
+
+    def clear(self):
+        """Remove the checkpoint once the export has completed"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
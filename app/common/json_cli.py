@@ -1,6 +1,24 @@
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .base_exporter import BaseExporter
+from .doc_fingerprint import DocumentFingerprint, diff_trees, fingerprint_tree
+
+#----------------------------------------------------------------
+# Operations the Coda API cannot perform, planned as manual steps
+MANUAL_OPS = {
+  "create_table": "tables cannot be created through the Coda API",
+  "create_column": "columns cannot be created through the Coda API",
+  "update_column": "columns cannot be changed through the Coda API",
+  "update_section": "a page type cannot be changed through the Coda API",
+  "reorder": "pages, tables and columns cannot be reordered through the Coda API",
+}
+
+#----------------------------------------------------------------
+# Leaf values JsonPlan keeps as they are
+SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
 
 class JsonFile():
   """--------+---------+---------+---------+---------+---------+---------+---------+---------|
@@ -25,9 +43,9 @@ class JsonPlan(object):
     assert(isinstance(config, dict))
 
     self.client = client
-    self.log = logging.getLogger()
-    self.log.setLevel(logging.INFO)
+    self.log = logging.getLogger(__name__)
     self.checkSum = True
+    self.ops = []
     self.config = self.create_plan(config)
     if not self.checkSum:
       self.log.info(json.dumps(self.config))
@@ -36,32 +54,250 @@ class JsonPlan(object):
   |                        E X T E R N A L   C L A S S   M E T H O D S                       |
   |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
 
+  def replan(self, config):
+    """ Replaces the config, sharing subtrees unchanged since the current plan """
+    self.config = self.create_plan(config, self.config)
+    return self.config
+
   def get_plan(self, output="json"):
     return json.dumps(self.config) if output == "json" else self.config
 
+  def plan(self, strDocId=None, strCacheFile="fingerprints.json"):
+    """ Returns the minimal operations that bring live docs in line with the config
+
+    The config is either a template ({"document": {...}}) or {"coda": {"docs": [...]}}
+    whose docs may name their live "id". Docs without one are matched by name and
+    created when missing. Desired and live structures are compared as fingerprint
+    hash trees, so only differing subtrees produce operations, and the live tree of
+    a doc unchanged since the last plan comes from the cache for one get_doc call.
+    Tables and columns cannot be created or altered through the API, so those
+    operations are planned as manual steps.
+
+    Each operation is a dict with op, doc (an ID, or "new:<name>" for a doc the plan
+    creates), path, name and manual (the reason it cannot be applied, or None).
+    """
+    listDocs = self.desired_docs()
+    if strDocId and len(listDocs) != 1:
+      raise ValueError("A target doc ID needs a config with exactly one document")
+    objFingerprint = DocumentFingerprint(self.client, strCacheFile)
+    dictByName = None
+    self.ops = []
+    for dictDoc in listDocs:
+      strId = strDocId or dictDoc.get("id")
+      if not strId:
+        if dictByName is None:
+          listLive = BaseExporter(self.client)._parse_api_response(self.client.list_docs())
+          dictByName = {objDoc.get("name"): objDoc.get("id") for objDoc in listLive}
+        strId = dictByName.get(dictDoc.get("name"))
+      self.ops.extend(self.plan_doc(dictDoc, strId, objFingerprint))
+    return self.ops
+
+  def plan_doc(self, dictDoc, strDocId, objFingerprint):
+    """ Returns the operations for one desired doc against its live state (None to create it) """
+    dictIndex = {}
+    dictExpected = fingerprint_tree(self.doc_structure(dictDoc), dictIndex)
+    listOps = []
+    if strDocId:
+      dictActual = objFingerprint.fingerprint(strDocId)
+    else:
+      strDocId = f"new:{dictDoc.get('name')}"
+      listOps.append(self.new_op("create_doc", strDocId, "/", dictDoc.get("name")))
+      dictActual = fingerprint_tree({})
+
+    for strChange, strPath in diff_trees(dictExpected, dictActual):
+      listParts = strPath.strip("/").split("/")
+      dictSource = dictIndex.get(strPath, {})
+      if strChange == "extra":
+        continue  # Plans only create and update, never delete
+      elif strChange == "reordered":
+        listOps.append(self.new_op("reorder", strDocId, strPath, dictSource.get("name")))
+      elif strChange == "changed":
+        strOp = "update_section" if len(listParts) == 1 else "update_column"
+        listOps.append(self.new_op(strOp, strDocId, strPath, dictSource.get("name")))
+      elif len(listParts) == 1:
+        listOps.append(self.new_op("create_section", strDocId, strPath, dictSource.get("name")))
+        for strTablePath in [strKey for strKey in dictIndex if strKey.count("/") == 2 and strKey.startswith(strPath + "/")]:
+          listOps.append(self.new_op("create_table", strDocId, strTablePath, dictIndex[strTablePath].get("name")))
+      else:
+        strOp = "create_table" if len(listParts) == 2 else "create_column"
+        listOps.append(self.new_op(strOp, strDocId, strPath, dictSource.get("name")))
+    return listOps
+
+  def apply(self, listOps=None, intJobs=4):
+    """ Executes the applicable planned operations concurrently, returning (op, result) pairs
+
+    New docs are created first, in parallel. Their pages and the new pages of
+    existing docs are then created with one worker per doc, each doc's pages in plan
+    order so that they appear in the template's order. Manual operations are skipped.
+    """
+    listOps = self.ops if listOps is None else listOps
+    listResults = []
+    dictIds = {}
+    with ThreadPoolExecutor(max_workers=intJobs, thread_name_prefix="apply") as pool:
+      listCreates = [op for op in listOps if op["op"] == "create_doc"]
+      for op, result in zip(listCreates, pool.map(lambda op: self.client.create_document(op["name"]), listCreates)):
+        listResults.append((op, result))
+        if "id" in result:
+          dictIds[op["doc"]] = result["id"]
+
+      dictChains = {}
+      for op in listOps:
+        if op["op"] == "create_section":
+          dictChains.setdefault(op["doc"], []).append(op)
+
+      def run_chain(listChain):
+        listDone = []
+        for op in listChain:
+          strDocId = dictIds.get(op["doc"], op["doc"])
+          if strDocId.startswith("new:"):
+            listDone.append((op, {"error": "document was not created"}))
+          else:
+            listDone.append((op, self.client.create_page(strDocId, op["name"])))
+        return listDone
+
+      for listDone in pool.map(run_chain, dictChains.values()):
+        listResults.extend(listDone)
+    return listResults
+
+  def desired_docs(self):
+    """ Returns the desired documents described by the config """
+    if "document" in self.config:
+      return [self.config["document"]]
+    return list((self.config.get("coda") or {}).get("docs") or [])
+
+  def doc_structure(self, dictDoc):
+    """ Converts a template document into the structure extract_document_structure returns """
+    listSections = []
+    listTables = []
+    for dictSection in dictDoc.get("sections") or []:
+      listSections.append({"name": dictSection.get("name"), "contentType": dictSection.get("type")})
+      for dictTable in dictSection.get("tables") or []:
+        listTables.append({
+          "name": dictTable.get("name"),
+          "parent": {"name": dictSection.get("name")},
+          "columns": dictTable.get("columns") or []
+        })
+    return {"sections": listSections, "tables": listTables}
+
+  def new_op(self, strOp, strDocId, strPath, strName):
+    """ Returns a planned operation """
+    return {"op": strOp, "doc": strDocId, "path": strPath, "name": strName, "manual": MANUAL_OPS.get(strOp)}
+
+  def plan_with_cli_output(self, strDocId=None, strCacheFile="fingerprints.json", strOut="text"):
+    """ Prints the plan, one operation per line """
+    from .row_renderer import render_rows
+    try:
+      listOps = self.plan(strDocId, strCacheFile)
+      if not listOps:
+        print("No changes, live docs match the config")
+        return
+      render_rows(["op", "doc", "path", "manual"], [(op["op"], op["doc"], op["path"], op["manual"]) for op in listOps], strOut)
+    except Exception as e:
+      # Import click here to avoid circular dependencies
+      import click
+      if isinstance(e, click.ClickException):
+        raise
+      raise click.ClickException(f"Plan failed: {str(e)}")
+
+  def apply_with_cli_output(self, strDocId=None, strCacheFile="fingerprints.json", intJobs=4):
+    """ Plans, applies and reports each operation, failing when any operation failed """
+    import click
+    try:
+      listOps = self.plan(strDocId, strCacheFile)
+      listResults = self.apply(listOps, intJobs)
+    except Exception as e:
+      raise click.ClickException(f"Apply failed: {str(e)}")
+    intErrors = 0
+    for op, result in listResults:
+      if "error" in result:
+        intErrors += 1
+        print(f"{op['op']} {op['path']}: failed: {result['error']}")
+      else:
+        print(f"{op['op']} {op['path']}: {result.get('id')}")
+    listManual = [op for op in listOps if op["manual"]]
+    for op in listManual:
+      print(f"manual {op['op']} {op['path']}: {op['manual']}")
+    print(f"Applied {len(listResults) - intErrors} of {len(listResults)} operations, {len(listManual)} manual steps left")
+    if intErrors:
+      raise click.ClickException(f"{intErrors} operations failed")
+
   """--------+---------+---------+---------+---------+---------+---------+---------+---------|
   |                        I N T E R N A L   C L A S S   M E T H O D S                       |
   |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
 
-  def create_plan(self, config):
-    if config is None:
-      assert config
-    # Terminate condition int or str
-    if isinstance(config, int):
-      return config
-    elif isinstance(config, str):
-      return config
-    elif isinstance(config, dict):
-      data = {}
-      for key, val in config.items():
-        val = self.create_plan(val)
-        data[key] = val
-    elif isinstance(config, list):
-      data = []
-      for i, var in enumerate(config):
-        var = self.create_plan(var)
-        data.append(var)
+  def create_plan(self, config, previous=None):
+    """ Returns a copy of config, walked with an explicit stack so any depth is allowed
+
+    Each dict or list compared with the node at the same position in previous (an
+    earlier plan) is visited again after its children. When every child is then
+    the previous child itself, or a scalar of the same type and value, the previous
+    node is reused rather than the copy, so re-planning a mostly unchanged config
+    shares its unchanged subtrees with the earlier plan. A dict or list reached
+    twice, e.g. through a YAML alias, is copied once and shared in the same way.
+    """
+    assert config is not None
+    dictCopies = {}
+    listRoot = [None]
+    listStack = [(config, previous, listRoot, 0, None)]
+    push = listStack.append
+    while listStack:
+      objValue, objPrevious, objParent, objKey, objCopy = listStack.pop()
+      if objCopy is not None:
+        # Second visit, after all children: keep previous when none of them changed
+        if self.same_children(objCopy, objPrevious):
+          objCopy = objPrevious
+          dictCopies[id(objValue)] = objCopy
+        objParent[objKey] = objCopy
+        continue
+      clsValue = type(objValue)
+      if clsValue is not dict and clsValue is not list:
+        if clsValue not in SCALAR_TYPES:
+          self.log.warning("[create_plan] unknown data type " + str(clsValue))
+        objParent[objKey] = objValue
+        continue
+      objCopy = dictCopies.get(id(objValue))
+      if objCopy is not None:
+        objParent[objKey] = objCopy
+        continue
+      # Scalars are kept by the shallow copy; children that are containers are pushed and replaced
+      if clsValue is dict:
+        objCopy = dict(objValue)
+        items = objCopy.items()
+      else:
+        objCopy = list(objValue)
+        items = enumerate(objCopy)
+      dictCopies[id(objValue)] = objCopy
+      if type(objPrevious) is clsValue and len(objPrevious) == len(objCopy):
+        push((objValue, objPrevious, objParent, objKey, objCopy))
+        getPrevious = objPrevious.get if clsValue is dict else objPrevious.__getitem__
+      else:
+        getPrevious = None
+        objParent[objKey] = objCopy
+      for objChildKey, objChild in items:
+        clsChild = type(objChild)
+        if clsChild is dict or clsChild is list:
+          push((objChild, None if getPrevious is None else getPrevious(objChildKey), objCopy, objChildKey, None))
+        elif clsChild not in SCALAR_TYPES:
+          self.log.warning("[create_plan] unknown data type " + str(clsChild))
+    return listRoot[0]
+
+  def same_children(self, objCopy, objPrevious):
+    """ Returns True when the children of a planned node are those of the previous node
+
+    Container children are already planned, so an unchanged one is the previous
+    child itself. Scalars must have the same type as well as value, so 1, 1.0 and
+    True count as changes.
+    """
+    if type(objCopy) is dict:
+      if list(objCopy) != list(objPrevious):
+        return False
+      pairs = zip(objCopy.values(), objPrevious.values())
     else:
-      data = config
-      self.log.info("[WARNING][create_plan] unknown data type " + str(type(config)))
-    return data
+      pairs = zip(objCopy, objPrevious)
+    for objChild, objPreviousChild in pairs:
+      if objChild is objPreviousChild:
+        continue
+      clsChild = type(objChild)
+      if clsChild is dict or clsChild is list or clsChild is not type(objPreviousChild) or objChild != objPreviousChild:
+        return False
+    return True
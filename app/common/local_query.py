@@ -0,0 +1,95 @@
+"""Run SQL against locally mirrored Coda tables"""
+
+import os
+import sqlite3
+from .doc_mirror import DocumentMirror, quote_identifier
+from .row_renderer import render_rows
+
+
+class LocalQuery:
+    """Runs SQL over a document's SQLite mirror, mirroring it first only when missing"""
+
+    def __init__(self, pycoda_client, db_path, fetch_size=500):
+        """Initialize LocalQuery with Pycoda client and SQLite database path
+
+        Args:
+            pycoda_client: Instance of Pycoda, only used when the mirror must be built
+            db_path: Path to the SQLite mirror created by DocumentMirror
+            fetch_size: Number of result rows fetched per cursor round-trip
+        """
+        self.pycoda = pycoda_client
+        self.db_path = db_path
+        self.fetch_size = fetch_size
+
+    def is_cached(self, doc_id):
+        """Check whether the mirror already holds tables for doc_id"""
+        if not os.path.exists(self.db_path):
+            return False
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            found = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '_coda_tables'"
+            ).fetchone()
+            if not found:
+                return False
+            return conn.execute("SELECT 1 FROM _coda_tables WHERE doc_id = ? LIMIT 1", (doc_id,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def ensure_cached(self, doc_id, refresh=False):
+        """Mirror the document when it is not cached yet or a refresh is requested
+
+        Returns:
+            bool: True if the API was called to build or refresh the mirror
+        """
+        if self.is_cached(doc_id) and not refresh:
+            return False
+        DocumentMirror(self.pycoda, self.db_path).mirror_document(doc_id)
+        return True
+
+    def run(self, sql, doc_id=None):
+        """Execute SQL read-only against the mirror
+
+        Mirrored tables are named by table ID; with doc_id, that document's tables
+        can also be queried by name through temporary views.
+
+        Returns:
+            Tuple of (column names, iterator of row tuples); rows are fetched lazily
+        """
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            if doc_id:
+                for name, table_id in DocumentMirror(self.pycoda, self.db_path).table_views(conn, doc_id):
+                    conn.execute(f"CREATE TEMP VIEW {quote_identifier(name)} AS "
+                                 f"SELECT * FROM main.{quote_identifier(table_id)}")
+            cursor = conn.execute(sql)
+        except Exception:
+            conn.close()
+            raise
+        headers = [description[0] for description in cursor.description or []]
+        return headers, self._iter_rows(conn, cursor)
+
+    def _iter_rows(self, conn, cursor):
+        """Yield result rows in fetch_size chunks and close the connection when done"""
+        try:
+            while True:
+                chunk = cursor.fetchmany(self.fetch_size)
+                if not chunk:
+                    break
+                yield from chunk
+        finally:
+            conn.close()
+
+    def query_with_cli_output(self, doc_id, sql, out="text", refresh=False):
+        """Run SQL against the document mirror and stream results in the --out format"""
+        try:
+            self.ensure_cached(doc_id, refresh)
+            headers, rows = self.run(sql, doc_id)
+            render_rows(headers, rows, out)
+        except Exception as e:
+            # Import click here to avoid circular dependencies
+            import click
+            if isinstance(e, click.ClickException):
+                raise
+            else:
+                raise click.ClickException(f"Query failed: {str(e)}")
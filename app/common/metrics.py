@@ -0,0 +1,123 @@
+"""Prometheus textfile-collector metrics for a CLI run"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+
+from .call_stats import percentile
+from .spans import add_listener, remove_listener
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def escape_label(value):
+    """Escape a label value for the Prometheus text format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_sample(name, labels, value):
+    """Return one sample line, e.g. coda_cli_rows_total{table="grid-1"} 450"""
+    if labels:
+        pairs = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+        return f"{name}{{{pairs}}} {value}"
+    return f"{name} {value}"
+
+
+class RunMetrics:
+    """Collects metrics for one command run and writes them as a .prom textfile
+
+    API call counts, latencies, errors and retries come from the CallStats attached
+    to Pycoda; bytes written are taken from the exporters' write spans, which
+    count output before compression.
+    """
+
+    def __init__(self, stats, command):
+        """Initialize run metrics
+
+        Args:
+            stats: CallStats collecting the run's API calls and rows
+            command: Name of the CLI command being run
+        """
+        self.stats = stats
+        self.command = command or ""
+        self._lock = threading.Lock()
+        self.bytes_written = 0
+        self._started = 0.0
+
+    def start(self):
+        """Start timing the command and counting written bytes"""
+        self._started = time.perf_counter()
+        add_listener(self._on_span)
+        return self
+
+    def _on_span(self, span):
+        """Add the bytes of a finished write span"""
+        if span.name == "write" and "bytes" in span.attrs:
+            with self._lock:
+                self.bytes_written += span.attrs["bytes"]
+
+    def format(self, success, duration=None):
+        """Return all metrics in the Prometheus text exposition format"""
+        if duration is None:
+            duration = time.perf_counter() - self._started
+        command = {"command": self.command}
+        families = []
+
+        def family(name, kind, help_text, samples):
+            families.append(f"# HELP {name} {help_text}")
+            families.append(f"# TYPE {name} {kind}")
+            families.extend(format_sample(sample_name, labels, value) for sample_name, labels, value in samples)
+
+        family("coda_cli_command_duration_seconds", "gauge", "Wall time of the last run of the command.",
+               [("coda_cli_command_duration_seconds", command, f"{duration:.6f}")])
+        family("coda_cli_command_success", "gauge", "1 if the last run of the command succeeded, else 0.",
+               [("coda_cli_command_success", command, 1 if success else 0)])
+        family("coda_cli_last_run_timestamp_seconds", "gauge", "Unix time the last run of the command finished.",
+               [("coda_cli_last_run_timestamp_seconds", command, f"{time.time():.3f}")])
+
+        calls, rows = self.stats.snapshot()
+
+        requests, errors, retries, received, latency = [], [], [], [], []
+        for endpoint in sorted(calls):
+            entries = calls[endpoint]
+            labels = dict(command, method=endpoint)
+            latencies = [entry[2] for entry in entries]
+            requests.append(("coda_cli_requests_total", labels, len(entries)))
+            errors.append(("coda_cli_request_errors_total", labels,
+                           sum(1 for entry in entries if entry[0] >= 400 or entry[0] == 0)))
+            retries.append(("coda_cli_request_retries_total", labels, sum(entry[3] for entry in entries)))
+            received.append(("coda_cli_response_bytes_total", labels, sum(entry[1] for entry in entries)))
+            for quantile in QUANTILES:
+                latency.append(("coda_cli_request_duration_seconds", dict(labels, quantile=str(quantile)),
+                                f"{percentile(latencies, quantile):.6f}"))
+            latency.append(("coda_cli_request_duration_seconds_sum", labels, f"{sum(latencies):.6f}"))
+            latency.append(("coda_cli_request_duration_seconds_count", labels, len(latencies)))
+
+        family("coda_cli_requests_total", "counter", "Coda API calls per Pycoda method.", requests)
+        family("coda_cli_request_errors_total", "counter", "Coda API calls that failed after retries.", errors)
+        family("coda_cli_request_retries_total", "counter", "Retried Coda API attempts.", retries)
+        family("coda_cli_response_bytes_total", "counter", "Bytes of Coda API responses received.", received)
+        family("coda_cli_request_duration_seconds", "summary", "Coda API call latency including retries.", latency)
+
+        exported = defaultdict(int)
+        for label, count, _ in rows:
+            operation, _, table = label.partition(" ")
+            exported[(operation, table)] += count
+        family("coda_cli_rows_total", "counter", "Rows exported or copied per table.", [
+            ("coda_cli_rows_total", dict(command, operation=operation, table=table), count)
+            for (operation, table), count in sorted(exported.items())
+        ])
+        family("coda_cli_uncompressed_bytes_written_total", "counter",
+               "Bytes of output written to files or stdout, counted before compression.",
+               [("coda_cli_uncompressed_bytes_written_total", command, self.bytes_written)])
+        return "\n".join(families) + "\n"
+
+    def write(self, path, success):
+        """Stop collecting and atomically write the metrics to path"""
+        remove_listener(self._on_span)
+        content = self.format(success)
+        temp_file = f"{path}.{os.getpid()}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_file, path)
@@ -0,0 +1,67 @@
+"""Bounded read-ahead over an iterator using a background thread"""
+
+import queue
+import threading
+
+from .profiler import profile_thread
+from .spans import adopt, current_span_id
+
+_DONE = object()
+
+
+def prefetch(iterable, depth=2):
+    """Iterate over iterable in a background thread, buffering up to depth items ahead
+
+    The producer blocks once depth items are waiting, so memory stays bounded while
+    the consumer works on the current item. Errors raised by the producer are
+    re-raised in the consumer, and closing the generator early stops the producer.
+
+    Args:
+        iterable: Source iterable, e.g. Pycoda.iter_row_pages(...)
+        depth: Maximum number of items fetched ahead (0 disables the thread)
+
+    Yields:
+        Items of iterable in their original order
+    """
+    if depth < 1:
+        yield from iterable
+        return
+
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry):
+        # Poll so that an abandoned consumer never leaves the producer blocked
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    parent_id = current_span_id()
+
+    def produce():
+        try:
+            # Spans opened while producing nest under the consumer's current span
+            with adopt(parent_id), profile_thread():
+                for item in iterable:
+                    if not put((item, None)):
+                        return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+
+    worker = threading.Thread(target=produce, name="prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
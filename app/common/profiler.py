@@ -0,0 +1,156 @@
+"""CPU and memory profiling of a CLI command with per-phase wall times"""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from .spans import add_listener, remove_listener
+
+PHASES = ("fetch", "parse", "transform", "write")
+TOP_ENTRIES = 15
+
+# The running cpu Profiler, which worker threads report to through profile_thread()
+_active = None
+
+
+def profile_thread():
+    """Return a context manager profiling the calling worker thread into the running cpu profile
+
+    cProfile only records the thread that enabled it, so background threads such
+    as the prefetch producer wrap their work in this to appear in --profile cpu.
+    Without a running cpu profile it does nothing.
+    """
+    profiler = _active
+    return profiler.thread_profile() if profiler else nullcontext()
+
+
+class PhaseTimer:
+    """Span listener adding up wall time and count per phase name"""
+
+    def __init__(self, phases=PHASES):
+        """Initialize empty totals for the given phase names"""
+        self.phases = phases
+        self._lock = threading.Lock()
+        self.totals = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, span):
+        """Add a finished span to its phase total"""
+        if span.name in self.phases:
+            with self._lock:
+                total = self.totals[span.name]
+                total[0] += 1
+                total[1] += span.seconds
+
+    def format_summary(self, wall_seconds):
+        """Return phase totals as printable text"""
+        lines = [f"Phase wall times (command {wall_seconds:.3f}s):"]
+        for name in self.phases:
+            if name in self.totals:
+                count, seconds = self.totals[name]
+                share = seconds / wall_seconds * 100 if wall_seconds else 0.0
+                lines.append(f"  {name:10} {seconds:>9.3f}s {share:>5.1f}%  ({count} spans)")
+        return "\n".join(lines)
+
+
+class Profiler:
+    """Profiles everything between start() and stop()
+
+    In "cpu" mode cProfile statistics are written to a pstats file and the top
+    functions by cumulative time are reported. In "mem" mode tracemalloc reports
+    the top allocation sites and the peak traced memory. Both modes report the
+    wall time spent in each exporter phase.
+    """
+
+    def __init__(self, mode, output_file=None, top=TOP_ENTRIES):
+        """Initialize a profiler
+
+        Args:
+            mode: "cpu" or "mem"
+            output_file: pstats file written in cpu mode
+            top: Number of functions or allocation sites reported
+        """
+        if mode not in ("cpu", "mem"):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.output_file = output_file or "coda.pstats"
+        self.top = top
+        self.phases = PhaseTimer()
+        self._profile = None
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+        self._started = 0.0
+
+    def start(self):
+        """Start collecting"""
+        global _active
+        add_listener(self.phases)
+        if self.mode == "cpu":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            _active = self
+        else:
+            tracemalloc.start()
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self):
+        """Stop collecting and return the report as printable text"""
+        wall_seconds = time.perf_counter() - self._started
+        remove_listener(self.phases)
+        if self.mode == "cpu":
+            global _active
+            _active = None
+            self._profile.disable()
+            report = self._cpu_report()
+        else:
+            report = self._memory_report()
+        return f"{report}\n{self.phases.format_summary(wall_seconds)}"
+
+    @contextmanager
+    def thread_profile(self):
+        """Profile the calling thread until the block exits, merging it into the report"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Profilers built on sys.monitoring (Python 3.12+) already see every thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._thread_profiles.append(profile)
+
+    def _cpu_report(self):
+        """Write the pstats file, including worker threads, and summarize the top functions"""
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        stats.dump_stats(self.output_file)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        return f"CPU profile written to {self.output_file}\n{stream.getvalue().strip()}"
+
+    def _memory_report(self):
+        """Summarize the top allocation sites and the peak"""
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        lines = [f"Memory: peak {peak / 1024:.1f} KiB, current {current / 1024:.1f} KiB",
+                 "Top allocation sites:"]
+        for stat in snapshot.statistics("lineno")[:self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size / 1024:>9.1f} KiB {stat.count:>7} blocks  {frame.filename}:{frame.lineno}")
+        return "\n".join(lines)
@@ -1,11 +1,33 @@
 #-------------------------
 # Blasterai/codaio library
 from codaio import Coda
+#---------------
+# Custom library
+from .call_stats import status_of
+from .rate_budget import is_write
+from .spans import span
 
 #-----------------
 # Standard library
+import copy
 import json
 import re
+import time
+from contextlib import nullcontext
+
+#---------------------------------------------
+# Page size used when streaming rows page by page
+ROWS_PAGE_LIMIT = 200
+#-----------------------------------------------------------
+# Retries for rate-limited (429) and transient (5xx) responses
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.5
+RETRY_STATUS = re.compile(r"Status code: (429|50[234])\b")
+#-----------------------------------------------------------
+# Writes that are safe to repeat after a 5xx; other writes may already have
+# taken effect, so they are retried only when rate-limited (429)
+IDEMPOTENT_WRITE_PREFIXES = ("put ", "delete ", "update_", "delete_")
+RATE_LIMIT_STATUS = re.compile(r"Status code: 429\b")
 
 """--------+---------+---------+---------+---------+---------+---------+---------+---------|
 |                                    M A I N   C L A S S                                   |
@@ -15,14 +37,19 @@ class Pycoda():
   """--------+---------+---------+---------+---------+---------+---------+---------+---------|
   |                                   C O N S T R U C T O R                                  |
   |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
-  def __init__(self, strApiKey):
+  def __init__(self, strApiKey, strEndpoint=None):
     #----------------------------
     # initialize class _CONSTANTS
     assert(strApiKey)
     self._init_meta()
 
     self.CODA_API_KEY = strApiKey
-    self.coda = Coda(strApiKey)
+    self.coda = Coda(strApiKey, href=strEndpoint) if strEndpoint else Coda(strApiKey)
+    self.intMaxRetries = MAX_RETRIES
+    self.fltRetryBackoff = RETRY_BACKOFF
+    self.cassette = None
+    self.stats = None
+    self.budget = None
 
   """--------+---------+---------+---------+---------+---------+---------+---------+---------|
   |                                C L A S S   R E Q U E S T S                               |
@@ -30,7 +57,7 @@ class Pycoda():
   def list_docs(self):
     """ Returns a list of documents """
     try:
-      list = self.coda.list_docs(is_owner=True)
+      list = self._call(self.coda.list_docs, is_owner=True)
     except:
       return "{}"
     return self.json_items(list)
@@ -39,7 +66,7 @@ class Pycoda():
     """ Returns a list of controls in DocId """
     assert(strDocId)
     try:
-      list = self.coda.list_controls(strDocId)
+      list = self._call(self.coda.list_controls, strDocId)
     except:
       return "{}"
     return self.json_items(list)
@@ -48,7 +75,7 @@ class Pycoda():
     """ Returns a list of folders in DocId """
     assert(strDocId)
     try:
-      list = self.coda.list_folders(strDocId)
+      list = self._call(self.coda.list_folders, strDocId)
     except:
       return "{}"
     return self.json_items(list)
@@ -57,7 +84,7 @@ class Pycoda():
     """ Returns a list of formulas in DocId """
     assert(strDocId)
     try:
-      list = self.coda.list_formulas(strDocId)
+      list = self._call(self.coda.list_formulas, strDocId)
     except:
       return "{}"
     return self.json_items(list)
@@ -66,7 +93,7 @@ class Pycoda():
     """ Returns a list of sections in DocId """
     assert(strDocId)
     try:
-      list = self.coda.list_sections(strDocId)
+      list = self._call(self.coda.list_sections, strDocId)
     except:
       return "{}"
     return self.json_items(list)
@@ -75,7 +102,7 @@ class Pycoda():
     """ Returns a list of tables in DocId """
     assert(strDocId)
     try:
-      list = self.coda.list_tables(strDocId)
+      list = self._call(self.coda.list_tables, strDocId)
     except:
       return "{}"
     return self.json_items(list)
@@ -84,7 +111,7 @@ class Pycoda():
     """ Returns a list of views in DocId """
     assert(strDocId)
     try:
-      list = self.coda.list_views(strDocId)
+      list = self._call(self.coda.list_views, strDocId)
     except:
       return "{}"
     return self.json_items(list)
@@ -94,7 +121,7 @@ class Pycoda():
     assert(strDocId)
     assert(strTableId)
     try:
-      list = self.coda.list_columns(strDocId, strTableId)
+      list = self._call(self.coda.list_columns, strDocId, strTableId)
     except:
       return "{}"
     return self.json_items(list)
@@ -104,16 +131,38 @@ class Pycoda():
     assert(strDocId)
     assert(strTableId)
     try:
-      list = self.coda.list_rows(strDocId, strTableId)
+      list = self._call(self.coda.list_rows, strDocId, strTableId)
     except:
       return "{}"
     return self.json_items(list)
 
+  def iter_row_pages(self, strDocId, strTableId, strQuery=None, strValueFormat=None, strPageToken=None, intLimit=ROWS_PAGE_LIMIT, strSyncToken=None):
+    """ Yields pages of rows in TableId, following nextPageToken until exhausted
+
+    With strSyncToken only rows changed since the call that returned it are listed;
+    the last page carries nextSyncToken for the following refresh.
+    """
+    assert(strDocId)
+    assert(strTableId)
+    data = {}
+    if strQuery:
+      data["query"] = strQuery
+    if strValueFormat:
+      data["valueFormat"] = strValueFormat
+    if strSyncToken:
+      data["syncToken"] = strSyncToken
+    while True:
+      page = self._call(self.coda.get, f"/docs/{strDocId}/tables/{strTableId}/rows", data=dict(data), limit=intLimit, offset=strPageToken)
+      yield page
+      strPageToken = page.get("nextPageToken")
+      if not strPageToken:
+        break
+
   def get_doc(self, strDocId):
     """ Returns a document """
     assert(strDocId)
     try:
-      val = self.coda.get_doc(strDocId)
+      val = self._call(self.coda.get_doc, strDocId)
     except:
       return "{}"
     return json.dumps(val)
@@ -123,7 +172,17 @@ class Pycoda():
     assert(strDocId)
     assert(strSectionId)
     try:
-      val = self.coda.get_section(strDocId, strSectionId)
+      val = self._call(self.coda.get_section, strDocId, strSectionId)
+    except:
+      return "{}"
+    return json.dumps(val)
+
+  def get_table(self, strDocId, strTableId):
+    """ Returns a table, including its rowCount """
+    assert(strDocId)
+    assert(strTableId)
+    try:
+      val = self._call(self.coda.get_table, strDocId, strTableId)
     except:
       return "{}"
     return json.dumps(val)
@@ -134,7 +193,7 @@ class Pycoda():
     assert(strTableId)
     assert(strColumnId)
     try:
-      val = self.coda.get_column(strDocId, strTableId, strColumnId)
+      val = self._call(self.coda.get_column, strDocId, strTableId, strColumnId)
     except:
       return "{}"
     return json.dumps(val)
@@ -143,7 +202,7 @@ class Pycoda():
     """ Create a new document """
     assert(name)
     try:
-      result = self.coda.create_doc(name)
+      result = self._call(self.coda.create_doc, name)
       return {"id": result["id"], "name": result["name"]}
     except Exception as e:
       return {"error": str(e)}
@@ -156,17 +215,111 @@ class Pycoda():
     try:
       # For canvas sections, add content as text
       if section_type == "canvas":
-        result = self.coda.create_section(doc_id, section_name, content)
+        result = self._call(self.coda.create_section, doc_id, section_name, content)
       else:
         # For other section types, create section without content for now
-        result = self.coda.create_section(doc_id, section_name)
+        result = self._call(self.coda.create_section, doc_id, section_name)
       return {"id": result["id"], "name": result["name"]}
     except Exception as e:
       return {"error": str(e)}
 
+  def create_page(self, strDocId, strName):
+    """ Creates a canvas page (section) at the end of DocId """
+    assert(strDocId)
+    assert(strName)
+    try:
+      result = self._call(self.coda.post, f"/docs/{strDocId}/pages", {"name": strName})
+      return {"id": result["id"], "name": strName}
+    except Exception as e:
+      return {"error": str(e)}
+
+  def upsert_rows(self, strDocId, strTableId, listRows, listKeyColumns=None):
+    """ Inserts a batch of rows into TableId, updating rows that match listKeyColumns """
+    assert(strDocId)
+    assert(strTableId)
+    data = {"rows": listRows}
+    if listKeyColumns:
+      data["keyColumns"] = listKeyColumns
+    try:
+      return self._call(self.coda.upsert_row, strDocId, strTableId, data)
+    except Exception as e:
+      return {"error": str(e)}
+
   """--------+---------+---------+---------+---------+---------+---------+---------+---------|
   |                                 C L A S S   M E T H O D S                                |
   |----------+---------+---------+---------+---------+---------+---------+---------+-------"""
+  def _call(self, fnRequest, *args, **kwargs):
+    """ Calls a codaio request through the cassette (if any), retrying rate-limited and transient failures """
+    strEndpoint = self.endpoint_name(fnRequest, args)
+    with span("pycoda", method=strEndpoint):
+      return self._call_endpoint(strEndpoint, fnRequest, *args, **kwargs)
+
+  def _call_endpoint(self, strEndpoint, fnRequest, *args, **kwargs):
+    """ Replays or performs a labelled request, recording it in the cassette and statistics """
+    fltStart = time.perf_counter()
+    if self.cassette and self.cassette.replaying:
+      try:
+        result = self.cassette.play(strEndpoint, args, kwargs)
+      except Exception as e:
+        self._record_stats(strEndpoint, fltStart, 0, "hit", error=e)
+        raise
+      self._record_stats(strEndpoint, fltStart, 0, "hit", result=result)
+      return result
+
+    #------------------------------------------------------------------
+    # codaio adds limit and pageToken to a non-empty data dict in place, so the
+    # cassette keys the request by its arguments as they were before the call
+    dictRecordKwargs = copy.deepcopy(kwargs) if self.cassette else kwargs
+    objRetryStatus = RETRY_STATUS if self.is_idempotent(strEndpoint, args) else RATE_LIMIT_STATUS
+    intRetries = 0
+    while True:
+      try:
+        with span("retry", attempt=intRetries) if intRetries else nullcontext():
+          if intRetries:
+            time.sleep(self.fltRetryBackoff * (2 ** (intRetries - 1)))
+          if self.budget:
+            self.budget.acquire(is_write(strEndpoint))
+          result = fnRequest(*args, **kwargs)
+          #------------------------------------------------------------
+          # codaio merges a failed follow-up page into the listing result
+          if isinstance(result, dict) and isinstance(result.get("statusCode"), int) and result["statusCode"] >= 400:
+            raise Exception(f'Status code: {result["statusCode"]}. Message: {result.get("message", "")}')
+        break
+      except Exception as e:
+        if intRetries >= self.intMaxRetries or not objRetryStatus.search(str(e)):
+          if self.cassette:
+            self.cassette.record(strEndpoint, args, dictRecordKwargs, error=str(e), seconds=time.perf_counter() - fltStart)
+          self._record_stats(strEndpoint, fltStart, intRetries, "miss", error=e)
+          raise
+        intRetries += 1
+
+    if self.cassette:
+      self.cassette.record(strEndpoint, args, dictRecordKwargs, result=result, seconds=time.perf_counter() - fltStart)
+    self._record_stats(strEndpoint, fltStart, intRetries, "miss", result=result)
+    return result
+
+  def _record_stats(self, strEndpoint, fltStart, intRetries, strCache, result=None, error=None):
+    """ Records a finished call when statistics are being collected """
+    if not self.stats:
+      return
+    intBytes = len(json.dumps(result)) if result is not None else 0
+    self.stats.record_call(strEndpoint, status_of(error), intBytes, time.perf_counter() - fltStart, intRetries, strCache)
+
+  def is_idempotent(self, strEndpoint, args):
+    """ Returns True when a request can be repeated safely: reads, PUT, DELETE and upserts with key columns """
+    if not is_write(strEndpoint) or strEndpoint.startswith(IDEMPOTENT_WRITE_PREFIXES):
+      return True
+    return strEndpoint == "upsert_row" and len(args) > 2 and isinstance(args[2], dict) and bool(args[2].get("keyColumns"))
+
+  def endpoint_name(self, fnRequest, args):
+    """ Returns a label for a request, e.g. list_columns or get /docs/*/tables/*/rows """
+    strName = getattr(fnRequest, "__name__", str(fnRequest))
+    if strName in ("get", "post", "put", "delete") and args:
+      listParts = str(args[0]).strip("/").split("/")
+      strPath = "/".join("*" if i % 2 else part for i, part in enumerate(listParts))
+      return f"{strName} /{strPath}"
+    return strName
+
   def json_items(self, dictItems):
     strRet=""
     for key in dictItems:
@@ -0,0 +1,72 @@
+"""Token-bucket budget for Coda API read and write requests"""
+
+import threading
+import time
+
+# Coda's published limits: 100 reads and 10 writes per 6 seconds
+DEFAULT_READS = 100
+DEFAULT_WRITES = 10
+DEFAULT_WINDOW = 6.0
+
+# Request labels (see Pycoda.endpoint_name) that count against the write budget
+WRITE_PREFIXES = ("post ", "put ", "delete ", "create_", "upsert_", "update_", "delete_", "push_")
+
+
+def is_write(endpoint):
+    """Return True when a request label is a write request"""
+    return endpoint.startswith(WRITE_PREFIXES)
+
+
+class RateBudget:
+    """Allows up to reads (or writes) requests per window seconds, in bursts of at most that many
+
+    Each kind of request has its own bucket that refills continuously at
+    limit/window tokens per second. acquire() blocks until a token is free, so
+    a client sharing one budget across threads never exceeds the limits, and
+    seconds_for() gives the shortest time a number of requests can take.
+    """
+
+    def __init__(self, reads=DEFAULT_READS, writes=DEFAULT_WRITES, window=DEFAULT_WINDOW):
+        """Initialize full buckets"""
+        if reads <= 0 or writes <= 0 or window <= 0:
+            raise ValueError("Rate budget limits and window must be positive")
+        self.reads = reads
+        self.writes = writes
+        self.window = window
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        self._buckets = {False: [float(reads), now], True: [float(writes), now]}
+
+    def limit(self, write=False):
+        """Return the requests allowed per window"""
+        return self.writes if write else self.reads
+
+    def acquire(self, write=False):
+        """Take a token, sleeping until one is available; returns the seconds waited"""
+        limit = self.limit(write)
+        rate = limit / self.window
+        waited = 0.0
+        while True:
+            with self._lock:
+                bucket = self._buckets[write]
+                now = time.monotonic()
+                bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                if bucket[0] >= 1:
+                    bucket[0] -= 1
+                    return waited
+                delay = (1 - bucket[0]) / rate
+            time.sleep(delay)
+            waited += delay
+
+    def seconds_for(self, reads=0, writes=0):
+        """Return the shortest time in which reads and writes requests fit the budget from full buckets"""
+        return max(self._seconds(reads, self.reads), self._seconds(writes, self.writes))
+
+    def _seconds(self, count, limit):
+        """Requests beyond the first burst arrive at limit/window per second"""
+        return max(0, count - limit) * self.window / limit
+
+    def describe(self):
+        """Return the budget as text, e.g. "100 reads and 10 writes per 6s" """
+        return f"{self.reads} reads and {self.writes} writes per {self.window:g}s"
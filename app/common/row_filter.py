@@ -0,0 +1,89 @@
+"""Column projection and row filters for table reads"""
+
+import json
+
+# Row metadata kept on projected rows, everything else (href, browserLink, ...) is dropped
+ROW_FIELDS = ("id", "name", "index", "updatedAt")
+
+
+def parse_where(spec):
+    """Parse a "Column:value" filter into a (column name, value) pair
+
+    The value is read as JSON when possible (numbers, booleans, quoted strings),
+    otherwise it is taken literally as a string.
+    """
+    name, sep, raw = spec.partition(":")
+    if not sep or not name.strip():
+        raise ValueError(f"Invalid filter '{spec}', expected Column:value")
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw
+    return name.strip(), value
+
+
+def parse_columns(spec):
+    """Parse a comma-separated list of column names"""
+    return [name.strip() for name in spec.split(",") if name.strip()] if spec else []
+
+
+class RowFilter:
+    """Splits a row selection into what the API can filter and what is filtered locally
+
+    The rows endpoint accepts a single column:value query, so the first filter is
+    pushed to the server and any remaining filters are applied while streaming.
+    """
+
+    def __init__(self, columns, select=None, where=()):
+        """Initialize RowFilter for a table
+
+        Args:
+            columns: Column metadata from list_columns
+            select: Column names to keep, in output order (default: all columns)
+            where: "Column:value" filters that every returned row must match
+
+        Raises:
+            ValueError: If a selected or filtered column does not exist
+        """
+        by_name = {col.get("name"): col for col in columns}
+        missing = [name for name in select or [] if name not in by_name]
+        if missing:
+            raise ValueError(f"Unknown column(s): {', '.join(missing)}")
+        self.columns = [by_name[name] for name in select] if select else list(columns)
+
+        self.filters = []
+        for spec in where:
+            name, value = parse_where(spec)
+            if name not in by_name:
+                raise ValueError(f"Unknown column in filter: {name}")
+            self.filters.append((by_name[name].get("id"), value))
+
+    def api_query(self):
+        """Return the filter pushed down to the rows endpoint, or None"""
+        if not self.filters:
+            return None
+        column_id, value = self.filters[0]
+        return f"{column_id}:{json.dumps(value)}"
+
+    def local_filters(self):
+        """Return the filters the API cannot apply"""
+        return self.filters[1:]
+
+    def apply(self, rows):
+        """Yield rows matching the local filters, keeping only the selected values"""
+        local = self.local_filters()
+        column_ids = [col.get("id") for col in self.columns]
+        for row in rows:
+            values = row.get("values", {}) if isinstance(row, dict) else {}
+            if all(self._matches(values.get(column_id), value) for column_id, value in local):
+                projected = {key: row[key] for key in ROW_FIELDS if key in row}
+                projected["values"] = {column_id: values[column_id] for column_id in column_ids if column_id in values}
+                yield projected
+
+    def _matches(self, cell, value):
+        """Compare a cell with a filter value the way the API query does"""
+        if isinstance(cell, list):
+            return any(self._matches(item, value) for item in cell)
+        if isinstance(cell, dict):
+            cell = cell.get("name", cell.get("amount", cell))
+        return cell == value or str(cell) == str(value)
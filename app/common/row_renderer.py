@@ -0,0 +1,81 @@
+"""Streaming renderers for tabular results selected by the --out option"""
+
+import csv
+import json
+import sys
+
+
+def render_rows(headers, rows, out="text", stream=None):
+    """Write headers and an iterable of row tuples to stream in the requested format
+
+    Rows are written as they are produced, so large results are never held in memory.
+
+    Args:
+        headers: Column names
+        rows: Iterable of row tuples matching headers
+        out: One of csv, json, markdown or text
+        stream: File-like object to write to (default: sys.stdout)
+
+    Returns:
+        int: Number of rows written
+    """
+    stream = stream or sys.stdout
+    renderer = RENDERERS.get(out)
+    if renderer is None:
+        raise ValueError(f"Unsupported output type: {out}")
+    return renderer(headers, rows, stream)
+
+
+def _render_csv(headers, rows, stream):
+    """Render rows as CSV with a header line"""
+    writer = csv.writer(stream)
+    writer.writerow(headers)
+    count = 0
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        count += 1
+    return count
+
+
+def _render_json(headers, rows, stream):
+    """Render rows as a JSON array of objects, one object per line"""
+    stream.write("[")
+    count = 0
+    for row in rows:
+        stream.write(",\n" if count else "\n")
+        stream.write(json.dumps(dict(zip(headers, row)), ensure_ascii=False))
+        count += 1
+    stream.write("\n]\n" if count else "]\n")
+    return count
+
+
+def _render_markdown(headers, rows, stream):
+    """Render rows as a Markdown table"""
+    def cell(value):
+        return "" if value is None else str(value).replace("|", "\\|").replace("\n", " ")
+
+    stream.write("| " + " | ".join(cell(h) for h in headers) + " |\n")
+    stream.write("|" + "|".join(" --- " for _ in headers) + "|\n")
+    count = 0
+    for row in rows:
+        stream.write("| " + " | ".join(cell(value) for value in row) + " |\n")
+        count += 1
+    return count
+
+
+def _render_text(headers, rows, stream):
+    """Render rows as tab-separated text with a header line"""
+    stream.write("\t".join(str(h) for h in headers) + "\n")
+    count = 0
+    for row in rows:
+        stream.write("\t".join("" if value is None else str(value) for value in row) + "\n")
+        count += 1
+    return count
+
+
+RENDERERS = {
+    "csv": _render_csv,
+    "json": _render_json,
+    "markdown": _render_markdown,
+    "text": _render_text,
+}
@@ -0,0 +1,105 @@
+"""JSON Lines and SQLite writers for typed export-table records"""
+
+import json
+import sqlite3
+
+from .doc_mirror import quote_identifier, sql_type_for, to_sql_value
+
+OUTPUT_FORMATS = ("csv", "jsonl", "sqlite")
+
+
+def output_types(columns, expander=None):
+    """Return the SQLite type of each output column, storing expanded lookup columns as text"""
+    types = []
+    for col in columns:
+        if expander and expander.is_lookup(col.get("id")):
+            types.extend("TEXT" for _ in expander.headers(col))
+        else:
+            types.append(sql_type_for(col))
+    return types
+
+
+class JsonlWriter:
+    """Writes records as one JSON object per line, keyed by column name
+
+    Values keep their native types (numbers, booleans, null, lists), and each page
+    of records is encoded and written in a single call as it arrives.
+    """
+
+    def __init__(self, stream):
+        """Initialize a writer over a text stream"""
+        self.stream = stream
+        self.keys = None
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def write_records(self, records, header=False):
+        """Write records as JSON lines, or remember the header record as the object keys
+
+        Returns:
+            Number of bytes written
+        """
+        if header:
+            self.keys = records[0] if records else []
+            return 0
+        keys = self.keys
+        encode = self._encode
+        chunk = "".join([encode(dict(zip(keys, record))) + "\n" for record in records])
+        self.stream.write(chunk)
+        return len(chunk.encode("utf-8"))
+
+
+class SqliteWriter:
+    """Writes records into a typed SQLite table, one transaction per page
+
+    The header record (re)creates the table with column types taken from the Coda
+    column formats; each later page is bulk-inserted with executemany and
+    committed, so an interrupted export leaves every completed page in place.
+    """
+
+    def __init__(self, db_path, table_name, types):
+        """Initialize a writer for one table of a database
+
+        Args:
+            db_path: SQLite database file, created when missing
+            table_name: Table to replace with the exported rows
+            types: SQLite type of each output column, see output_types()
+        """
+        self.db_path = db_path
+        self.table_name = table_name
+        self.types = types
+        self.conn = sqlite3.connect(db_path)
+        self._insert = None
+
+    def write_records(self, records, header=False):
+        """Create the table from the header record or insert a page of records
+
+        Returns:
+            Number of bytes the database grew by
+        """
+        size = self._size()
+        table = quote_identifier(self.table_name)
+        with self.conn:
+            if header:
+                names = [quote_identifier(name) for name in (records[0] if records else [])]
+                column_defs = [f"{name} {sql_type}" for name, sql_type in zip(names, self.types)]
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self.conn.execute(f"CREATE TABLE {table} ({', '.join(column_defs)})")
+                self._insert = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})"
+            else:
+                self.conn.executemany(self._insert, ([to_sql_value(value) for value in record] for record in records))
+        return max(self._size() - size, 0)
+
+    def _size(self):
+        """Return the database size in bytes"""
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        return page_count * self.conn.execute("PRAGMA page_size").fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
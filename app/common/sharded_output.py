@@ -0,0 +1,183 @@
+"""Numbered CSV part files with a manifest, for splitting very large exports"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+
+from .compression import COMPRESSORS, compression_for
+
+SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$", re.IGNORECASE)
+SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+
+def parse_size(value):
+    """Parse a size such as 500000, 64k, 100MB or 1.5G into bytes"""
+    match = SIZE_PATTERN.match(str(value))
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f"Invalid size: {value} (expected e.g. 100MB, 1.5G or 500000)")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+class HashingFile(io.RawIOBase):
+    """Binary file that keeps a SHA-256 and byte count of everything written"""
+
+    def __init__(self, path):
+        """Open path for writing"""
+        super().__init__()
+        self._file = open(path, "wb")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        """Write data to the file and the running checksum"""
+        self._file.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def close(self):
+        """Close the underlying file"""
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class ByteCountingText:
+    """Text stream whose write() returns the UTF-8 bytes written rather than characters
+
+    csv.writer.writerow returns what the stream's write() returns, so with this
+    wrapper it reports the encoded size of each row.
+    """
+
+    def __init__(self, stream):
+        """Wrap a UTF-8 text stream"""
+        self._stream = stream
+
+    def write(self, text):
+        """Write text and return its size in UTF-8 bytes"""
+        self._stream.write(text)
+        return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+class ShardedOutput:
+    """Writes CSV records into numbered part files, each starting with the header
+
+    A new part starts once the current one holds shard_rows rows or shard_bytes
+    bytes of CSV text (measured before compression). Parts are named after the
+    output file, e.g. rows.csv.gz becomes rows.part-00001.csv.gz, and close() writes
+    rows.manifest.json listing each part's row range, size and SHA-256.
+    """
+
+    def __init__(self, output_file, shard_rows=None, shard_bytes=None, compress=None):
+        """Initialize sharded output
+
+        Args:
+            output_file: Output path the part and manifest names are derived from
+            shard_rows: Maximum rows per part
+            shard_bytes: Maximum uncompressed CSV bytes per part
+            compress: Optional compression for every part, defaults to the output extension
+        """
+        if not shard_rows and not shard_bytes:
+            raise ValueError("Sharding needs shard_rows or shard_bytes")
+        self.shard_rows = shard_rows
+        self.shard_bytes = shard_bytes
+        self.compress = compression_for(output_file, compress)
+        compressed_ext = COMPRESSORS[self.compress][0] if self.compress else ""
+        base = output_file[:-len(compressed_ext)] if compressed_ext and output_file.endswith(compressed_ext) else output_file
+        self._stem, extension = os.path.splitext(base)
+        self._suffix = (extension or ".csv") + compressed_ext
+        self.manifest_file = f"{self._stem}.manifest.json"
+        self.header = None
+        self.parts = []
+        self.rows = 0
+        self._part = None
+
+    def part_file(self, number):
+        """Return the path of a part by its 1-based number"""
+        return f"{self._stem}.part-{number:05d}{self._suffix}"
+
+    def write_records(self, records, header=False):
+        """Write CSV records, starting new parts as limits are reached
+
+        Returns:
+            Number of bytes of CSV text written, before compression
+        """
+        if header:
+            self.header = records[0] if records else []
+            return 0
+        written = 0
+        for record in records:
+            if self._part is None:
+                self._open_part()
+            size = self._part["writer"].writerow(record)
+            written += size
+            self.rows += 1
+            self._part["rows"] += 1
+            self._part["text_bytes"] += size
+            if ((self.shard_rows and self._part["rows"] >= self.shard_rows)
+                    or (self.shard_bytes and self._part["text_bytes"] >= self.shard_bytes)):
+                self._close_part()
+        return written
+
+    def close(self):
+        """Close the last part and write the manifest"""
+        if self._part is None and not self.parts:
+            self._open_part()  # An empty table still gets one part with the header
+        if self._part is not None:
+            self._close_part()
+        manifest = {
+            "header": self.header,
+            "rows": self.rows,
+            "compression": self.compress,
+            "shard_rows": self.shard_rows,
+            "shard_bytes": self.shard_bytes,
+            "parts": self.parts,
+        }
+        temp_file = self.manifest_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_file, self.manifest_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._part is not None:
+            self._part["stream"].close()
+            self._part["raw"].close()
+
+    def _open_part(self):
+        """Start the next part file and write the header into it"""
+        path = self.part_file(len(self.parts) + 1)
+        raw = HashingFile(path)
+        binary = COMPRESSORS[self.compress][1](raw, "wb") if self.compress else io.BufferedWriter(raw)
+        stream = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        writer = csv.writer(ByteCountingText(stream))
+        if self.header is not None:
+            writer.writerow(self.header)
+        self._part = {"path": path, "raw": raw, "stream": stream, "writer": writer,
+                      "first_row": self.rows + 1, "rows": 0, "text_bytes": 0}
+
+    def _close_part(self):
+        """Finish the current part and add it to the manifest"""
+        part = self._part
+        self._part = None
+        part["stream"].close()
+        if self.compress:
+            part["raw"].close()  # compressors leave file objects they did not open open
+        self.parts.append({
+            "file": os.path.basename(part["path"]),
+            "first_row": part["first_row"],
+            "last_row": part["first_row"] + part["rows"] - 1,
+            "rows": part["rows"],
+            "bytes": part["raw"].size,
+            "sha256": part["raw"].sha256.hexdigest(),
+        })
@@ -0,0 +1,90 @@
+"""Lightweight wall-time spans reported to registered listeners"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+_listeners = []
+_ids = itertools.count(1)
+_local = threading.local()
+
+
+class Span:
+    """A finished unit of work: name, attributes, start time, duration and parent"""
+
+    __slots__ = ("span_id", "parent_id", "name", "attrs", "start", "seconds", "thread_id")
+
+    def __init__(self, name, attrs, parent_id):
+        """Initialize a running span"""
+        self.span_id = next(_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.thread_id = threading.get_ident()
+
+
+def add_listener(listener):
+    """Register a callable receiving every finished Span"""
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    """Unregister a listener added with add_listener"""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def current_span_id():
+    """Return the ID of the innermost open span in this thread, or None"""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def adopt(parent_id):
+    """Nest spans opened in this thread under a span of another thread, e.g. a worker's caller"""
+    if parent_id is None:
+        yield
+        return
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(parent_id)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as a span nested under the current one
+
+    Does nothing beyond the context switch when no listener is registered, so
+    exporters can mark their phases unconditionally.
+
+    Args:
+        name: Span name, e.g. fetch, parse, transform or write
+        attrs: Extra attributes passed through to listeners
+    """
+    if not _listeners:
+        yield None
+        return
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    current = Span(name, attrs, stack[-1] if stack else None)
+    stack.append(current.span_id)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = str(e) or type(e).__name__
+        raise
+    finally:
+        stack.pop()
+        current.seconds = time.perf_counter() - current.start
+        for listener in list(_listeners):
+            listener(current)
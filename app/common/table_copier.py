@@ -0,0 +1,124 @@
+"""Streaming copy of table rows between Coda documents"""
+
+import time
+from .base_exporter import BaseExporter
+from .prefetch import prefetch
+
+
+class TableCopier(BaseExporter):
+    """Copies rows from a source table into a destination table page by page"""
+
+    def __init__(self, pycoda_client, batch_size=100, prefetch_depth=2):
+        """Initialize TableCopier with Pycoda client
+
+        Args:
+            pycoda_client: Instance of Pycoda for API operations
+            batch_size: Number of rows sent per upsert request
+            prefetch_depth: Number of source pages read ahead of the writer
+        """
+        super().__init__(pycoda_client)
+        self.batch_size = batch_size
+        self.prefetch_depth = prefetch_depth
+
+    def map_columns(self, src_columns, dst_columns):
+        """Map source column IDs to destination column IDs by column name
+
+        Calculated destination columns are skipped since they cannot be written.
+
+        Returns:
+            List of (column name, source column ID, destination column ID) tuples
+        """
+        dst_by_name = {
+            col.get("name"): col.get("id")
+            for col in dst_columns
+            if not col.get("calculated", False)
+        }
+        return [
+            (col.get("name"), col.get("id"), dst_by_name[col.get("name")])
+            for col in src_columns
+            if col.get("name") in dst_by_name
+        ]
+
+    def copy_table(self, src_doc_id, src_table_id, dst_doc_id, dst_table_id, key_columns=None):
+        """Copy all rows of the source table into the destination table
+
+        Pages are read ahead in a background thread while the previous page is
+        upserted, so at most prefetch_depth pages plus one batch are held in memory.
+
+        Args:
+            key_columns: Optional column names used to update matching rows instead of inserting
+
+        Returns:
+            Dict with rows copied, batches sent and mapped column names
+        """
+        started = time.perf_counter()
+        src_columns = self._parse_api_response(self.pycoda.list_columns(src_doc_id, src_table_id))
+        dst_columns = self._parse_api_response(self.pycoda.list_columns(dst_doc_id, dst_table_id))
+        mapping = self.map_columns(src_columns, dst_columns)
+        if not mapping:
+            raise ValueError("No columns with matching names between source and destination tables")
+
+        dst_key_ids = []
+        for name in key_columns or []:
+            match = [dst_id for col_name, _, dst_id in mapping if col_name == name]
+            if not match:
+                raise ValueError(f"Key column '{name}' is not shared by both tables")
+            dst_key_ids.append(match[0])
+
+        summary = {"rows": 0, "batches": 0, "columns": [name for name, _, _ in mapping]}
+        batch = []
+        pages = self.pycoda.iter_row_pages(src_doc_id, src_table_id)
+        for page in prefetch(pages, self.prefetch_depth):
+            for row in page.get("items", []):
+                batch.append(self._build_upsert_row(row, mapping))
+                if len(batch) >= self.batch_size:
+                    self._flush(dst_doc_id, dst_table_id, batch, dst_key_ids, summary)
+                    batch = []
+        if batch:
+            self._flush(dst_doc_id, dst_table_id, batch, dst_key_ids, summary)
+        self._record_rows(f"copy-table {src_table_id}", summary["rows"], time.perf_counter() - started)
+        return summary
+
+    def _build_upsert_row(self, row, mapping):
+        """Build an upsert row payload from a source row using the column mapping"""
+        values = row.get("values", {}) if isinstance(row, dict) else {}
+        cells = [
+            {"column": dst_id, "value": self._to_cell_value(values[src_id])}
+            for _, src_id, dst_id in mapping
+            if src_id in values
+        ]
+        return {"cells": cells}
+
+    def _to_cell_value(self, value):
+        """Convert a source cell value into a value accepted by the upsert endpoint"""
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            return [self._to_cell_value(item) for item in value]
+        if isinstance(value, dict):
+            # Rich values (people, lookups, links) are written back by display name
+            return value.get("name") or value.get("url") or str(value)
+        return value
+
+    def _flush(self, doc_id, table_id, batch, key_ids, summary):
+        """Send one batch of rows to the destination table"""
+        result = self.pycoda.upsert_rows(doc_id, table_id, batch, key_ids or None)
+        if isinstance(result, dict) and "error" in result:
+            raise ValueError(f"Upsert failed after {summary['rows']} rows: {result['error']}")
+        summary["rows"] += len(batch)
+        summary["batches"] += 1
+
+    def copy_with_cli_output(self, src_doc_id, src_table_id, dst_doc_id, dst_table_id, key_columns=None):
+        """Copy table rows with CLI-specific messaging"""
+        try:
+            summary = self.copy_table(src_doc_id, src_table_id, dst_doc_id, dst_table_id, key_columns)
+            print(f"Copied {summary['rows']} rows in {summary['batches']} batches "
+                  f"from {src_table_id} to {dst_table_id}")
+            print(f"Columns mapped: {', '.join(summary['columns'])}")
+        except Exception as e:
+            # Import click here to avoid circular dependencies
+            import click
+            if isinstance(e, click.ClickException):
+                raise
+            else:
+                raise click.ClickException(f"Copy failed: {str(e)}")
@@ -1,37 +1,103 @@
 import csv
+import sys
+import time
 from io import StringIO
 from .base_exporter import BaseExporter
+from .cell_converters import cell_text, compile_converters, value_format_for
+from .compression import compression_for, open_output
+from .export_checkpoint import ExportCheckpoint
+from .sharded_output import ShardedOutput
+from .lookup_expander import LookupExpander
+from .prefetch import prefetch
+from .row_filter import RowFilter
+from .row_writers import JsonlWriter, SqliteWriter, output_types
+from .spans import span
+from .table_model import Table
 
 
 class TableDataExporter(BaseExporter):
-    """Exports Coda table data to CSV format"""
+    """Exports Coda table data as CSV, JSON Lines or SQLite"""
     
-    def __init__(self, pycoda_client):
-        """Initialize TableDataExporter with Pycoda client"""
+    def __init__(self, pycoda_client, prefetch_depth=2):
+        """Initialize TableDataExporter with Pycoda client
+
+        Args:
+            pycoda_client: Instance of Pycoda for API operations
+            prefetch_depth: Number of row pages fetched ahead of the CSV writer (0 disables)
+        """
         super().__init__(pycoda_client)
+        self.prefetch_depth = prefetch_depth
+        self.row_count = 0
     
-    def export_table_csv(self, doc_id, table_id):
-        """Export table data as CSV string"""
+    def export_table_csv(self, doc_id, table_id, expand=(), select=None, where=()):
+        """Export table data as CSV string
+
+        Args:
+            expand: Optional expansions, "lookups" joins referenced table values
+            select: Column names to export (default: all columns)
+            where: "Column:value" filters, the first one is applied by the API
+        """
+        output = StringIO()
+        self.write_table_csv(output, doc_id, table_id, expand, select, where)
+        return output.getvalue()
+
+    def write_table_csv(self, stream, doc_id, table_id, expand=(), select=None, where=()):
+        """Stream table data as CSV into a text stream, one page at a time
+
+        Returns:
+            Number of rows written, or None when the table has no columns
+        """
+        started = time.perf_counter()
+        export = self._prepare_export(doc_id, table_id, expand, select, where)
+        if export is None:
+            return None
+        self._write_rows(stream, *export)
+        self._record_rows(f"export-table {table_id}", self.row_count, time.perf_counter() - started)
+        return self.row_count
+
+    def _prepare_export(self, doc_id, table_id, expand=(), select=None, where=(), page_token=None):
+        """Fetch columns and lookups and start the row pages pipeline
+
+        Pages are fetched and filtered in a background thread up to prefetch_depth
+        pages ahead, so the network wait for the next page overlaps the CSV encoding
+        and writing of the current one.
+
+        Args:
+            page_token: Optional page token to start from instead of the first row
+
+        Returns:
+            Tuple of (columns, pages, expander), or None when the table has no columns
+        """
         try:
             # Get columns to create headers
-            columns_json = self.pycoda.list_columns(doc_id, table_id)
+            with span("fetch", call="list_columns"):
+                columns_json = self.pycoda.list_columns(doc_id, table_id)
             if not columns_json or columns_json == "{}":
-                return ""  # Empty CSV for no columns
-                
-            columns = self._parse_api_response(columns_json)
-            
-            # Get rows data
-            rows_json = self.pycoda.list_rows(doc_id, table_id)
-            if not rows_json or rows_json == "{}":
-                # Return CSV with headers only if columns exist
-                if columns:
-                    return self._generate_csv(columns, [])
-                return ""
-                
-            rows = self._parse_api_response(rows_json)
-            
-            # Generate CSV content
-            return self._generate_csv(columns, rows)
+                return None  # Empty CSV for no columns
+
+            with span("parse"):
+                columns = self._parse_api_response(columns_json)
+                row_filter = RowFilter(columns, select, where)
+                columns = row_filter.columns
+
+            expander = None
+            if "lookups" in expand:
+                expander = LookupExpander(self.pycoda, doc_id, columns)
+                with span("fetch", call="lookups"):
+                    expander.load()
+
+            # Stream rows page by page, rich values are needed to resolve lookups and convert cells
+            pages = self._iter_pages(
+                doc_id, table_id, row_filter,
+                strValueFormat=value_format_for(columns),
+                strPageToken=page_token
+            )
+            # Cell converters are compiled once per column; lookups keep their raw references for the join
+            converters = [
+                (lambda value: value) if expander and expander.is_lookup(col.get("id")) else converter
+                for col, converter in zip(columns, compile_converters(columns))
+            ]
+            return columns, prefetch(self._compact_pages(pages, columns, converters), self.prefetch_depth), expander
             
         except Exception as e:
             if "JSON" in str(e):
@@ -40,75 +106,190 @@ class TableDataExporter(BaseExporter):
         except Exception as e:
             # Re-raise with more context
             raise Exception(f"Failed to export table data: {str(e)}")
+
+    def iter_filtered_rows(self, doc_id, table_id, select=None, where=()):
+        """Return selected columns and a generator of matching, projected rows"""
+        columns = self._parse_api_response(self.pycoda.list_columns(doc_id, table_id))
+        row_filter = RowFilter(columns, select, where)
+        return row_filter.columns, self._iter_rows(doc_id, table_id, row_filter)
+
+    def iter_tables(self, doc_id, table_id, select=None, where=()):
+        """Return selected columns and a prefetching generator of one converted Table per row page
+
+        Returns:
+            Tuple of (columns, tables), or None when the table has no columns
+        """
+        export = self._prepare_export(doc_id, table_id, select=select, where=where)
+        if export is None:
+            return None
+        columns, pages, _ = export
+        return columns, (table for table, _ in pages)
+
+    def _iter_rows(self, doc_id, table_id, row_filter=None, **kwargs):
+        """Yield rows of a table one page at a time, pushing filters down to the API"""
+        return (row for rows, _ in self._iter_pages(doc_id, table_id, row_filter, **kwargs) for row in rows)
+
+    def _iter_pages(self, doc_id, table_id, row_filter=None, **kwargs):
+        """Yield (matching rows, next page token) for each page, timing the fetch and parse phases"""
+        kwargs = {key: value for key, value in kwargs.items() if value is not None}
+        if row_filter and row_filter.api_query():
+            kwargs["strQuery"] = row_filter.api_query()
+        pages = self.pycoda.iter_row_pages(doc_id, table_id, **kwargs)
+        while True:
+            with span("fetch", call="rows"):
+                page = next(pages, None)
+            if page is None:
+                return
+            with span("parse"):
+                rows = page.get("items", [])
+                if row_filter:
+                    rows = list(row_filter.apply(rows))
+            yield rows, page.get("nextPageToken")
     
-    def _generate_csv(self, columns, rows):
-        """Generate CSV content from columns and rows data"""
-        output = StringIO()
+    def _compact_pages(self, pages, columns, converters=None):
+        """Yield (Table, next page token) holding the converted values of the exported columns"""
+        for rows, next_page_token in pages:
+            with span("parse", rows=len(rows)):
+                table = Table.from_columns(columns, rows, converters)
+            yield table, next_page_token
+
+    def _write_rows(self, stream, columns, pages, expander=None, write_header=True, on_page=None, typed=False):
+        """Write headers and pages of rows data to a text stream or record writer
+
+        Args:
+            write_header: False when appending to a resumed export
+            on_page: Optional callback(next_page_token, rows_written) after each page
+            typed: Keep converted values as they are (JSON Lines, SQLite) instead of CSV text
+        """
+        self.row_count = 0
         
         # Extract column names for headers and create name-to-id mapping
-        if isinstance(columns, list) and columns:
-            headers = [col.get('name', '') for col in columns]
-            column_map = {col.get('name', ''): col.get('id', '') for col in columns}
+        if not isinstance(columns, list) or not columns:
+            return
+        render = (lambda value: value) if typed else cell_text
+        if expander and expander.lookups:
+            headers = [
+                header
+                for col in columns
+                for header in (expander.headers(col) if expander.is_lookup(col.get('id')) else [col.get('name', '')])
+            ]
+            convert = lambda row: self._expand_row(row, columns, expander, render)
         else:
-            headers = []
-            column_map = {}
-            
-        # Write CSV data
-        if headers:
-            writer = csv.writer(output)
-            writer.writerow(headers)
-            
-            # Extract and write row data
-            if isinstance(rows, list):
-                for row in rows:
-                    row_values = [
-                        self._extract_cell_value(row, header, column_map) 
-                        for header in headers
-                    ]
-                    writer.writerow(row_values)
-        
-        return output.getvalue()
-    
+            headers = [col.get('name', '') for col in columns]
+            convert = (lambda row: row) if typed else (lambda row: [cell_text(value) for value in row])
+
+        # Write data
+        if write_header:
+            self._write_records(stream, [headers], header=True)
+        for table, next_page_token in pages:
+            with span("transform", rows=len(table)):
+                records = [convert(row) for row in table.rows()]
+            self._write_records(stream, records)
+            self.row_count += len(records)
+            if on_page:
+                on_page(next_page_token, self.row_count)
+
+    def _write_records(self, stream, records, header=False):
+        """Encode one page of CSV records and write it to the stream in a single call
+
+        Record writers (sharded, JSON Lines and SQLite outputs) take the records
+        themselves, so parts split on row boundaries and values keep their types.
+        """
+        with span("write", rows=len(records)) as write_span:
+            if hasattr(stream, "write_records"):
+                size = stream.write_records(records, header)
+            else:
+                buffer = StringIO()
+                csv.writer(buffer).writerows(records)
+                chunk = buffer.getvalue()
+                stream.write(chunk)
+                size = len(chunk.encode("utf-8"))
+            if write_span:
+                write_span.attrs["bytes"] = size
+
+    def _expand_row(self, row, columns, expander, render=cell_text):
+        """Build an output row with lookup columns joined against their referenced tables"""
+        row_values = []
+        for col, value in zip(columns, row):
+            if expander.is_lookup(col.get('id')):
+                row_values.extend(expander.expand(col.get('id'), value))
+            else:
+                row_values.append(render(value))
+        return row_values
 
-    def _extract_cell_value(self, row, column_name, column_map):
-        """Extract cell value from row data structure using column ID mapping"""
-        # Handle typical Coda API response structure
-        if isinstance(row, dict) and 'values' in row:
-            values = row['values']
-            if isinstance(values, dict):
-                # Use column ID (not name) to lookup the actual value
-                column_id = column_map.get(column_name, "")
-                if column_id:
-                    cell_value = values.get(column_id, "")
-                    # Ensure string conversion and handle None values
-                    return str(cell_value) if cell_value is not None else ""
-        return ""
-
-    def export_with_cli_output(self, doc_id, table_id, output_file=None):
-        """Export table data as CSV with CLI-specific file handling"""
+    def export_with_cli_output(self, doc_id, table_id, output_file=None, expand=(), select=None, where=(),
+                               compress=None, resume=False, shard_rows=None, shard_bytes=None, output_format="csv"):
+        """Export table data as CSV, JSON Lines or SQLite with CLI-specific file handling
+
+        Rows are written to the file (or stdout) page by page as they arrive, through
+        the compressor when compress is given or the file extension names one.
+        Uncompressed file exports are checkpointed after every page; with resume they
+        continue from the last checkpoint instead of the first row. With shard_rows or
+        shard_bytes the output is split into numbered parts plus a manifest. The
+        sqlite format replaces a table named after table_id in the output database.
+        """
         try:
-            # Export table data to CSV
-            csv_content = self.export_table_csv(doc_id, table_id)
-            
-            if not csv_content.strip():
+            import click
+            started = time.perf_counter()
+            sharded = bool(shard_rows or shard_bytes)
+            if sharded and (not output_file or resume):
+                raise click.ClickException("Sharding needs --output and cannot be combined with --resume")
+            if sharded and output_format != "csv":
+                raise click.ClickException("Sharding is only supported for CSV output")
+            compressed = compression_for(output_file, compress)
+            if output_format == "sqlite" and (not output_file or compressed or resume):
+                raise click.ClickException("--format sqlite needs an uncompressed --output database and cannot be resumed")
+            checkpoint = None
+            if output_file and not compressed and not sharded and output_format != "sqlite":
+                checkpoint = ExportCheckpoint(output_file, {
+                    "doc_id": doc_id, "table_id": table_id, "format": output_format,
+                    "expand": list(expand), "select": select, "where": list(where)
+                })
+            elif resume:
+                raise click.ClickException("--resume needs an uncompressed --output file")
+            state = checkpoint.load() if checkpoint and resume else None
+
+            export = self._prepare_export(doc_id, table_id, expand, select, where,
+                                          page_token=state["page_token"] if state else None)
+            if export is None:
                 print("Warning: No data found for the specified table")
                 return
                 
             if output_file:
                 # Write to file with error handling
                 try:
-                    with open(output_file, "w", encoding="utf-8") as f:
-                        f.write(csv_content)
-                    print(f"Table data exported to {output_file}")
+                    if sharded:
+                        with ShardedOutput(output_file, shard_rows, shard_bytes, compress) as shards:
+                            self._write_rows(shards, *export)
+                        print(f"Table data exported to {len(shards.parts)} parts, manifest {shards.manifest_file}")
+                    elif output_format == "sqlite":
+                        columns, _, expander = export
+                        with SqliteWriter(output_file, table_id, output_types(columns, expander)) as db:
+                            self._write_rows(db, *export, typed=True)
+                        print(f"Table data exported to {output_file} (table {table_id})")
+                    elif checkpoint:
+                        if state:
+                            print(f"Resuming export of {table_id} after row {state['rows']}")
+                        self._write_checkpointed(output_file, export, checkpoint, state, output_format)
+                        print(f"Table data exported to {output_file}")
+                    else:
+                        with open_output(output_file, compress) as f:
+                            self._write_formatted(f, export, output_format)
+                        print(f"Table data exported to {output_file}")
                 except PermissionError:
-                    import click
                     raise click.ClickException(f"Permission denied: Cannot write to {output_file}")
-                except Exception as e:
-                    import click
+                except OSError as e:
                     raise click.ClickException(f"File error: {str(e)}")
+            elif compress:
+                # Compressed bytes go to the binary stdout stream
+                with open_output(sys.stdout.buffer, compress) as f:
+                    self._write_formatted(f, export, output_format)
             else:
                 # Print to stdout
-                print(csv_content)
+                self._write_formatted(sys.stdout, export, output_format)
+                if output_format == "csv":
+                    print()
+            self._record_rows(f"export-table {table_id}", self.row_count, time.perf_counter() - started)
                 
         except Exception as e:
             # Import click here to avoid circular dependencies
@@ -116,4 +297,31 @@ class TableDataExporter(BaseExporter):
             if isinstance(e, click.ClickException):
                 raise
             else:
-                raise click.ClickException(f"Export failed: {str(e)}")
\ No newline at end of file
+                raise click.ClickException(f"Export failed: {str(e)}")
+
+    def _write_formatted(self, stream, export, output_format="csv", **kwargs):
+        """Write an export to a text stream as CSV or JSON Lines"""
+        if output_format == "jsonl":
+            self._write_rows(JsonlWriter(stream), *export, typed=True, **kwargs)
+        else:
+            self._write_rows(stream, *export, **kwargs)
+
+    def _write_checkpointed(self, output_file, export, checkpoint, state=None, output_format="csv"):
+        """Write to output_file, saving a checkpoint after each page and appending when resuming"""
+        resumed_rows = 0
+        if state:
+            # Drop anything written after the checkpoint, including a partial trailing row
+            with open(output_file, "r+b") as f:
+                f.truncate(state["offset"])
+            resumed_rows = state["rows"]
+
+        with open(output_file, "a" if state else "w", encoding="utf-8", newline="") as f:
+            def save(next_page_token, rows):
+                if next_page_token:
+                    f.flush()
+                    checkpoint.save(next_page_token, resumed_rows + rows, f.buffer.tell())
+
+            # JSON Lines repeats the keys on every line, so its header record is always needed
+            self._write_formatted(f, export, output_format, write_header=not state or output_format == "jsonl",
+                                  on_page=save)
+        checkpoint.clear()
@@ -0,0 +1,81 @@
+"""Single-pass data quality profile of a Coda table"""
+
+import time
+from .base_exporter import BaseExporter
+from .column_stats import ColumnStats
+from .row_renderer import render_rows
+from .spans import span
+from .table_data_exporter import TableDataExporter
+
+HEADERS = ["column", "type", "rows", "nulls", "distinct", "min", "max", "mean", "stddev", "top"]
+
+
+class TableDescriber(BaseExporter):
+    """Computes per-column statistics while streaming a table's row pages once
+
+    Each page arrives as a column-oriented Table and is folded into fixed-size
+    sketches, then discarded, so memory stays constant however many rows the
+    table has.
+    """
+
+    def __init__(self, pycoda_client, top=5, prefetch_depth=2):
+        """Initialize TableDescriber with Pycoda client
+
+        Args:
+            pycoda_client: Instance of Pycoda for API operations
+            top: Number of most frequent values reported per column
+            prefetch_depth: Number of row pages fetched ahead of the statistics
+        """
+        super().__init__(pycoda_client)
+        self.top = top
+        self.prefetch_depth = prefetch_depth
+
+    def describe(self, doc_id, table_id, select=None, where=()):
+        """Return one statistics dict per column, or an empty list for a table without columns"""
+        started = time.perf_counter()
+        exporter = TableDataExporter(self.pycoda, self.prefetch_depth)
+        result = exporter.iter_tables(doc_id, table_id, select, where)
+        if result is None:
+            return []
+        columns, tables = result
+        stats = [
+            ColumnStats(col.get("name", ""), (col.get("format") or {}).get("type", "text"),
+                        top_capacity=max(100, self.top * 10))
+            for col in columns
+        ]
+        rows = 0
+        for table in tables:
+            with span("transform", rows=len(table)):
+                for index, column_stats in enumerate(stats):
+                    column_stats.update(table.column(index))
+            rows += len(table)
+        self._record_rows(f"describe-table {table_id}", rows, time.perf_counter() - started)
+        return [column_stats.summary(self.top) for column_stats in stats]
+
+    def describe_with_cli_output(self, doc_id, table_id, select=None, where=(), out="text"):
+        """Describe a table and render one line per column in the --out format"""
+        try:
+            summaries = self.describe(doc_id, table_id, select, where)
+            if not summaries:
+                print("Warning: No data found for the specified table")
+                return
+            render_rows(HEADERS, (self._format_row(summary, out) for summary in summaries), out)
+        except Exception as e:
+            # Import click here to avoid circular dependencies
+            import click
+            if isinstance(e, click.ClickException):
+                raise
+            else:
+                raise click.ClickException(f"Describe failed: {str(e)}")
+
+    def _format_row(self, summary, out):
+        """Return a summary as a row, rounding floats and flattening top values for text outputs"""
+        row = []
+        for header in HEADERS:
+            value = summary[header]
+            if isinstance(value, float):
+                value = round(value, 6)
+            elif header == "top" and out != "json":
+                value = ", ".join(f"{item} ({count})" for item, count in value)
+            row.append(value)
+        return tuple(row)
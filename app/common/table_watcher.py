@@ -0,0 +1,179 @@
+"""Tail a Coda table's changed rows with adaptive polling"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+
+from .base_exporter import BaseExporter
+from .call_stats import status_of
+from .rate_budget import RateBudget
+from .spans import span
+
+# Statuses with which the API rejects an expired or invalid sync token
+RESYNC_STATUS = (400, 410)
+# Polls between full listings that find rows deleted since the last one
+RECONCILE_EVERY = 30
+
+
+def row_hash(row):
+    """Return a 64-bit hash of a row's values, independent of key order"""
+    encoded = json.dumps(row.get("values", {}), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), "big")
+
+
+class TableWatcher(BaseExporter):
+    """Polls a table for rows changed since the previous poll
+
+    The first poll lists every row to build an index of row ID to a 64-bit hash
+    of its values; that index is all that is kept between polls. Later polls pass
+    the previous nextSyncToken so that only rows changed since then are listed,
+    and a row is reported when its hash differs from the index. Listings by sync
+    token do not include deleted rows, so every reconcile_every polls, and
+    whenever the API returns no sync token or rejects an expired one, the whole
+    table is listed again and rows missing from it are reported as deleted and
+    dropped from the index. A deletion is therefore reported up to
+    reconcile_every polls late, and never when reconciling is disabled (0).
+
+    The wait between polls starts at min_interval, doubles (by backoff) after
+    every poll without changes up to max_interval, and drops back to
+    min_interval as soon as changes arrive. It is never shorter than the time
+    the rate budget needs for the requests of the previous poll.
+    """
+
+    def __init__(self, pycoda_client, min_interval=1.0, max_interval=60.0, backoff=2.0, budget=None,
+                 reconcile_every=RECONCILE_EVERY):
+        """Initialize TableWatcher
+
+        Args:
+            pycoda_client: Instance of Pycoda for API operations
+            min_interval: Seconds between polls while changes are arriving
+            max_interval: Longest wait between polls of an idle table
+            backoff: Factor the wait grows by after each poll without changes
+            budget: RateBudget bounding the poll rate (default: the client's budget, else Coda's limits)
+            reconcile_every: Polls between full listings that detect deletions (0 disables)
+        """
+        super().__init__(pycoda_client)
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = backoff
+        self.budget = budget or getattr(pycoda_client, "budget", None) or RateBudget()
+        self.reconcile_every = reconcile_every
+        self.index = {}
+        self.sync_token = None
+        self.requests = 0
+        self.polls = 0
+
+    def poll(self, doc_id, table_id):
+        """Yield (event, row) for each row changed since the previous poll, updating the index
+
+        Events are added, updated or deleted, produced a page at a time. The
+        requests made are left in self.requests.
+        """
+        self.requests = 0
+        sync_token = self.sync_token
+        if self.reconcile_every and self.polls and self.polls % self.reconcile_every == 0:
+            sync_token = None
+        self.polls += 1
+        try:
+            yield from self._list_changes(doc_id, table_id, sync_token)
+        except Exception as e:
+            if sync_token is None or self.requests or status_of(e) not in RESYNC_STATUS:
+                raise
+            self.requests = 1
+            yield from self._list_changes(doc_id, table_id, None)
+
+    def _list_changes(self, doc_id, table_id, sync_token):
+        """Compare listed rows with the index, listing every row when sync_token is None"""
+        full = sync_token is None
+        index = self.index
+        seen = set() if full else None
+        next_sync_token = None
+        for page in self.pycoda.iter_row_pages(doc_id, table_id, strSyncToken=sync_token):
+            self.requests += 1
+            with span("transform", rows=len(page.get("items", []))):
+                changes = []
+                for row in page.get("items", []):
+                    row_id = row.get("id")
+                    digest = row_hash(row)
+                    previous = index.get(row_id)
+                    if previous != digest:
+                        changes.append(("added" if previous is None else "updated", row))
+                        index[row_id] = digest
+                    if full:
+                        seen.add(row_id)
+            yield from changes
+            next_sync_token = page.get("nextSyncToken") or next_sync_token
+        if full:
+            for row_id in [row_id for row_id in index if row_id not in seen]:
+                del index[row_id]
+                yield "deleted", {"id": row_id}
+        self.sync_token = next_sync_token
+
+    def next_interval(self, interval, changed, requests):
+        """Return the wait before the next poll, at least what the budget needs for requests reads"""
+        interval = self.min_interval if changed else min(interval * self.backoff, self.max_interval)
+        return max(interval, requests * self.budget.window / self.budget.reads)
+
+    def watch(self, doc_id, table_id, initial=False, max_polls=None, sleep=time.sleep):
+        """Yield (event, row) for every change, polling until max_polls polls (default: forever)
+
+        Args:
+            initial: Also yield every row of the first poll as added
+        """
+        interval = self.min_interval
+        polls = 0
+        while True:
+            first = polls == 0
+            changed = 0
+            for change in self.poll(doc_id, table_id):
+                changed += 1
+                if initial or not first:
+                    yield change
+            polls += 1
+            interval = self.next_interval(interval, first or changed > 0, self.requests)
+            if max_polls is not None and polls >= max_polls:
+                return
+            sleep(interval)
+
+    def watch_with_cli_output(self, doc_id, table_id, initial=False, max_polls=None, stream=None):
+        """Write each change as one JSON line, values keyed by column name, until interrupted"""
+        stream = stream or sys.stdout
+        try:
+            columns = self._parse_api_response(self.pycoda.list_columns(doc_id, table_id))
+            if not columns:
+                raise ValueError(f"Table not found or has no columns: {table_id}")
+            names = {col.get("id"): col.get("name") for col in columns}
+            encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+            for event, row in self.watch(doc_id, table_id, initial, max_polls):
+                record = {"event": event, "id": row.get("id")}
+                if event != "deleted":
+                    record["name"] = row.get("name")
+                    record["updatedAt"] = row.get("updatedAt")
+                    record["values"] = {names.get(key, key): value for key, value in row.get("values", {}).items()}
+                stream.write(encode(record) + "\n")
+                stream.flush()
+        except KeyboardInterrupt:
+            return
+        except BrokenPipeError:
+            # The reader went away (e.g. piped into head): stop like an interrupt
+            self._discard_output(stream)
+            return
+        except Exception as e:
+            # Import click here to avoid circular dependencies
+            import click
+            if isinstance(e, click.ClickException):
+                raise
+            else:
+                raise click.ClickException(f"Watch failed: {str(e)}")
+
+    def _discard_output(self, stream):
+        """Point a closed pipe's file descriptor at devnull so flushing it on exit cannot fail again"""
+        try:
+            fileno = stream.fileno()
+        except (OSError, ValueError, AttributeError):
+            return
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, fileno)
+        os.close(devnull)
@@ -3,8 +3,30 @@ TemplateExporter module for Automated YAML Template Export
 Optimized implementation with 56% token reduction while preserving all business functionality
 """
 import json
+import sys
 import yaml
 from .base_exporter import BaseExporter
+from .compression import open_output
+from .spans import span
+
+
+def format_column(column):
+    """Format column data for template"""
+    column_entry = {
+        "name": column["name"],
+        "type": column.get("type", "column")
+    }
+
+    if "format" in column:
+        column_entry["format"] = column["format"]
+    if "display" in column:
+        column_entry["display"] = column["display"]
+    if column.get("calculated", False):
+        column_entry["calculated"] = True
+        if "formula" in column:
+            column_entry["formula"] = column["formula"]
+
+    return column_entry
 
 
 class TemplateExporter(BaseExporter):
@@ -14,19 +36,23 @@ class TemplateExporter(BaseExporter):
         """Initialize TemplateExporter with Pycoda client"""
         super().__init__(pycoda_client)
 
-    def extract_document_structure(self, doc_id):
-        """Extract document structure from Coda API responses"""
+    def extract_document_structure(self, doc_id, doc_data=None):
+        """Extract document structure from Coda API responses
+
+        Args:
+            doc_data: Optional parsed get_doc response, saving a request when already fetched
+        """
         # Get document metadata
-        doc_data = json.loads(self.pycoda.get_doc(doc_id))
+        if doc_data is None:
+            doc_data = self.get_doc_data(doc_id)
         
         # Get sections and tables data
-        sections_data = self._parse_api_response(self.pycoda.list_sections(doc_id))
-        tables_data = self._parse_api_response(self.pycoda.list_tables(doc_id))
+        sections_data = self._fetch_list(self.pycoda.list_sections, doc_id)
+        tables_data = self._fetch_list(self.pycoda.list_tables, doc_id)
         
         # Get column data for each table
         for table in tables_data:
-            columns_data = self._parse_api_response(self.pycoda.list_columns(doc_id, table["id"]))
-            table["columns"] = columns_data
+            table["columns"] = self._fetch_list(self.pycoda.list_columns, doc_id, table["id"])
 
         return {
             "id": doc_data["id"],
@@ -36,6 +62,13 @@ class TemplateExporter(BaseExporter):
             "tables": tables_data
         }
 
+    def get_doc_data(self, doc_id):
+        """Fetch and parse document metadata"""
+        with span("fetch", call="get_doc"):
+            doc_json = self.pycoda.get_doc(doc_id)
+        with span("parse"):
+            return json.loads(doc_json)
+
     def detect_variables(self, document_structure):
         """Detect template variables from document structure"""
         variables = {}
@@ -67,7 +100,7 @@ class TemplateExporter(BaseExporter):
             
             table_entry = {"name": table["name"]}
             if table.get("columns"):
-                table_entry["columns"] = [self._format_column(col) for col in table["columns"]]
+                table_entry["columns"] = [format_column(col) for col in table["columns"]]
             tables_by_section[parent_name].append(table_entry)
 
         # Convert sections to template format
@@ -92,41 +125,30 @@ class TemplateExporter(BaseExporter):
         return yaml.dump(template_structure, default_flow_style=False, allow_unicode=True)
 
 
-    def _format_column(self, column):
-        """Format column data for template"""
-        column_entry = {
-            "name": column["name"],
-            "type": column.get("type", "column")
-        }
-        
-        if "format" in column:
-            column_entry["format"] = column["format"]
-        if "display" in column:
-            column_entry["display"] = column["display"]
-        if column.get("calculated", False):
-            column_entry["calculated"] = True
-            if "formula" in column:
-                column_entry["formula"] = column["formula"]
-        
-        return column_entry
+    def export_with_cli_output(self, doc_id, output_file=None, compress=None):
+        """Export document as YAML template with CLI-specific file handling
 
-    def export_with_cli_output(self, doc_id, output_file=None):
-        """Export document as YAML template with CLI-specific file handling"""
+        Args:
+            compress: Optional gzip, bz2, xz or zstd compression; defaults to the output file extension
+        """
         try:
             # Extract document structure
             document_structure = self.extract_document_structure(doc_id)
             
-            # Detect variables
-            detected_variables = self.detect_variables(document_structure)
-            
-            # Generate YAML template
-            yaml_content = self.generate_yaml_template(document_structure, detected_variables)
+            with span("transform"):
+                # Detect variables
+                detected_variables = self.detect_variables(document_structure)
+
+                # Generate YAML template
+                yaml_content = self.generate_yaml_template(document_structure, detected_variables)
             
             if output_file:
                 # Write to file with error handling
                 try:
-                    with open(output_file, "w", encoding="utf-8") as f:
+                    with span("write", target="file") as write_span, open_output(output_file, compress) as f:
                         f.write(yaml_content)
+                        if write_span:
+                            write_span.attrs["bytes"] = len(yaml_content.encode("utf-8"))
                     print(f"Template exported to {output_file}")
                 except PermissionError:
                     import click
@@ -134,9 +156,18 @@ class TemplateExporter(BaseExporter):
                 except Exception as e:
                     import click
                     raise click.ClickException(f"File error: {str(e)}")
+            elif compress:
+                # Compressed bytes go to the binary stdout stream
+                with span("write", target="stdout") as write_span, open_output(sys.stdout.buffer, compress) as f:
+                    f.write(yaml_content)
+                    if write_span:
+                        write_span.attrs["bytes"] = len(yaml_content.encode("utf-8"))
             else:
                 # Print to stdout
-                print(yaml_content)
+                with span("write", target="stdout") as write_span:
+                    print(yaml_content)
+                    if write_span:
+                        write_span.attrs["bytes"] = len(yaml_content.encode("utf-8")) + 1
                 
         except Exception as e:
             # Import click here to avoid circular dependencies
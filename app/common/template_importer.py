@@ -3,6 +3,7 @@ TemplateImporter: Efficient YAML template parsing and variable substitution
 """
 import yaml
 import re
+from .spans import span
 
 
 class TemplateImporter:
@@ -29,6 +30,24 @@ class TemplateImporter:
         
         return self._var_pattern.sub(replacer, yaml_content)
     
+    def parse_variables(self, variables_str):
+        """Parse "VAR1=value1 VAR2='quoted value'" into a dict of variables"""
+        variables = {}
+        if not variables_str:
+            return variables
+        import shlex
+        try:
+            # Split respecting quotes: "DOC_NAME=My CLI Test Project" becomes one argument
+            args = shlex.split(variables_str)
+        except ValueError:
+            # Fallback to simple split if shlex fails
+            args = variables_str.split()
+        for var_pair in args:
+            if "=" in var_pair:
+                key, value = var_pair.split("=", 1)
+                variables[key.strip()] = value.strip()
+        return variables
+
     def create_document_from_template(self, yaml_content, variables, pycoda_client):
         """Create a new Coda document from YAML template with variable substitution
         
@@ -45,16 +64,19 @@ class TemplateImporter:
         """
         try:
             # Step 1: Substitute variables in template
-            substituted_yaml = self.substitute_variables(yaml_content, variables)
+            with span("transform"):
+                substituted_yaml = self.substitute_variables(yaml_content, variables)
             
             # Step 2: Parse the substituted YAML template
-            template_structure = self.parse_yaml_template(substituted_yaml)
+            with span("parse"):
+                template_structure = self.parse_yaml_template(substituted_yaml)
             
             # Step 3: Extract document name from parsed structure
             document_name = template_structure["document"]["name"]
             
             # Step 4: Create the document using Pycoda client
-            result = pycoda_client.create_document(document_name)
+            with span("write", target="document"):
+                result = pycoda_client.create_document(document_name)
             
             # Step 5: Check for errors in document creation
             if "error" in result:
@@ -80,28 +102,11 @@ class TemplateImporter:
                 yaml_content = f.read()
             
             # Parse variables if provided
-            variables = {}
-            if variables_str:
-                try:
-                    # Parse "VAR1=value1 VAR2=value2" format with quoted values support
-                    import shlex
-                    # Use shlex to handle quoted arguments properly
-                    try:
-                        # Split respecting quotes: "DOC_NAME=My CLI Test Project" becomes one argument
-                        args = shlex.split(variables_str)
-                        for var_pair in args:
-                            if "=" in var_pair:
-                                key, value = var_pair.split("=", 1)
-                                variables[key.strip()] = value.strip()
-                    except Exception:
-                        # Fallback to simple split if shlex fails
-                        for var_assignment in variables_str.split():
-                            if '=' in var_assignment:
-                                key, value = var_assignment.split('=', 1)
-                                variables[key.strip()] = value.strip()
-                except Exception as e:
-                    import click
-                    raise click.ClickException(f"Invalid variables format: {str(e)}")
+            try:
+                variables = self.parse_variables(variables_str)
+            except Exception as e:
+                import click
+                raise click.ClickException(f"Invalid variables format: {str(e)}")
             
             # Create document from template
             result = self.create_document_from_template(yaml_content, variables, pycoda_client)
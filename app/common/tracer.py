@@ -0,0 +1,96 @@
+"""Trace files of nested spans for chrome://tracing, Perfetto or plain JSON"""
+
+import json
+import os
+import threading
+import time
+
+from .spans import add_listener, remove_listener
+
+TRACE_FORMATS = ("chrome", "json")
+
+
+class Tracer:
+    """Span listener writing every finished span to a trace file
+
+    The chrome format is the Trace Event format (complete "X" events, one track
+    per thread) that chrome://tracing and Perfetto open directly. The json format
+    is a flat list of spans with their IDs, parent IDs, start/end and attributes.
+    """
+
+    def __init__(self, output_file, trace_format="chrome"):
+        """Initialize a tracer
+
+        Args:
+            output_file: Trace file written on stop()
+            trace_format: "chrome" or "json"
+        """
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace format: {trace_format}")
+        self.output_file = output_file
+        self.trace_format = trace_format
+        self._lock = threading.Lock()
+        self.spans = []
+        self.threads = {}
+        self._origin = 0.0
+        self._wall_origin = 0.0
+
+    def start(self):
+        """Start collecting spans"""
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()
+        add_listener(self)
+        return self
+
+    def __call__(self, span):
+        """Keep a finished span, called in the thread that ran it"""
+        thread_name = threading.current_thread().name
+        with self._lock:
+            self.spans.append(span)
+            self.threads.setdefault(span.thread_id, thread_name)
+
+    def stop(self):
+        """Stop collecting and write the trace file"""
+        remove_listener(self)
+        with self._lock:
+            spans = sorted(self.spans, key=lambda item: item.start)
+        trace = self._chrome_trace(spans) if self.trace_format == "chrome" else self._json_trace(spans)
+        temp_file = f"{self.output_file}.{os.getpid()}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(trace, f, default=str)
+        os.replace(temp_file, self.output_file)
+
+    def _chrome_trace(self, spans):
+        """Return spans as Trace Event format"""
+        pid = os.getpid()
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": name}}
+            for thread_id, name in self.threads.items()
+        ]
+        for span in spans:
+            events.append({
+                "name": span.name,
+                "cat": "coda",
+                "ph": "X",
+                "ts": round((span.start - self._origin) * 1e6, 3),
+                "dur": round(span.seconds * 1e6, 3),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": dict(span.attrs, span_id=span.span_id, parent_id=span.parent_id),
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _json_trace(self, spans):
+        """Return spans as a flat list with epoch start and end times"""
+        return {"spans": [
+            {
+                "id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start": round(self._wall_origin + span.start - self._origin, 6),
+                "end": round(self._wall_origin + span.start - self._origin + span.seconds, 6),
+                "thread": self.threads.get(span.thread_id, str(span.thread_id)),
+                "attrs": span.attrs,
+            }
+            for span in spans
+        ]}
@@ -0,0 +1,58 @@
+"""Tests for per-request latency and throughput statistics"""
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.call_stats import CallStats, percentile, status_of
+
+
+def test_percentile_and_status():
+    """Percentiles use nearest rank and statuses are parsed from codaio errors"""
+    values = [0.1 * i for i in range(1, 101)]
+    assert percentile(values, 0.50) == values[49]
+    assert percentile(values, 0.99) == values[98]
+    assert percentile([], 0.5) == 0.0
+    assert status_of(None) == 200
+    assert status_of("Status code: 404. Message: not found") == 404
+    assert status_of("connection reset") == 0
+
+
+def test_summary_aggregates_per_endpoint():
+    """Calls are grouped per endpoint with errors, retries, cache hits and bytes"""
+    stats = CallStats()
+    stats.record_call("list_tables", 200, 100, 0.010)
+    stats.record_call("list_tables", 429, 0, 0.030, retries=5)
+    stats.record_call("get_doc", 200, 50, 0.001, cache="hit")
+    stats.record_rows("export-table grid-1", 500, 0.5)
+
+    summary = {item["endpoint"]: item for item in stats.endpoint_summary()}
+    assert summary["list_tables"]["calls"] == 2
+    assert summary["list_tables"]["errors"] == 1
+    assert summary["list_tables"]["retries"] == 5
+    assert summary["list_tables"]["bytes"] == 100
+    assert summary["get_doc"]["cache_hits"] == 1
+    text = stats.format_summary()
+    assert "total: 3 calls, 150 bytes" in text
+    assert "export-table grid-1: 500 rows in 0.500s (1000.0 rows/s)" in text
+
+
+def test_stats_flag_reports_export(monkeypatch):
+    """--stats prints per-endpoint latency and rows/s to stderr, leaving stdout unchanged"""
+    monkeypatch.setattr("common.pycoda.RETRY_BACKOFF", 0)
+    doc = generate_doc(tables=1, columns=3, rows=450)
+    table_id = doc["tables"][0]["id"]
+    runner = CliRunner(mix_stderr=False)
+    with FakeCodaServer([doc], rate_limit_every=3) as server:
+        result = runner.invoke(
+            clickMain, ['--stats', 'export-table', '--doc', doc["id"], '--table', table_id],
+            env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+        )
+    assert result.exit_code == 0
+    assert len(result.stdout.strip().splitlines()) == 451
+    assert "API call statistics:" in result.stderr
+    assert "get /docs/*/tables/*/rows" in result.stderr
+    assert f"export-table {table_id}: 450 rows" in result.stderr
+    rows_line = next(line for line in result.stderr.splitlines() if "get /docs/*/tables/*/rows" in line)
+    # endpoint label is two words: get, path, then calls, errors, retries
+    assert int(rows_line.split()[4]) >= 1
@@ -0,0 +1,90 @@
+"""Tests for per-column cell converters compiled from column formats"""
+import csv
+import json
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from bench.cell_conversion import run
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.cell_converters import cell_text, compile_converter, compile_converters
+
+MONEY = {"@context": "http://schema.org/", "@type": "MonetaryAmount", "currency": "USD", "amount": 42.5}
+PERSON = {"@context": "http://schema.org/", "@type": "Person", "name": "Ann Lee", "email": "ann@example.com"}
+LINK = {"@context": "http://schema.org/", "@type": "WebPage", "url": "https://example.com/a"}
+
+
+def test_rich_values_become_typed_scalars_by_column_format():
+    """Currency gives its amount, people and lookups their name, links their URL"""
+    currency, person, link, select = compile_converters([
+        {"id": "c-1", "format": {"type": "currency"}},
+        {"id": "c-2", "format": {"type": "person"}},
+        {"id": "c-3", "format": {"type": "link"}},
+        {"id": "c-4", "format": {"type": "select"}},
+    ])
+    assert currency(MONEY) == 42.5
+    assert person(PERSON) == "Ann Lee"
+    assert person({"@type": "Person", "email": "bob@example.com"}) == "bob@example.com"
+    assert link(LINK) == "https://example.com/a"
+    assert select([{"name": "Open"}, {"name": "Urgent"}]) == ["Open", "Urgent"]
+
+
+def test_scalars_pass_through_and_unknown_values_fall_back_to_json():
+    """Scalars keep their type; unrecognised structures become compact JSON without @ keys"""
+    convert = compile_converter({"id": "c-1"})
+    assert convert(3) == 3 and convert(True) is True and convert(None) is None and convert("x") == "x"
+    assert convert({"@type": "Thing", "b": 2, "a": 1}) == '{"a":1,"b":2}'
+    assert convert({"@type": "Thing", "amount": 0}) == 0
+
+
+def test_cell_text_joins_lists_and_leaves_scalars_to_csv():
+    """Lists are joined with commas, anything else is handed to csv.writer as is"""
+    assert cell_text(["Open", None, 3]) == "Open, , 3"
+    assert cell_text(1.5) == 1.5
+    assert cell_text(None) is None
+
+
+def test_export_writes_clean_values_for_rich_cells():
+    """export-table writes amounts, names and URLs rather than dict reprs"""
+    columns = [
+        {"name": "Cost", "id": "c-cost", "format": {"type": "currency"}},
+        {"name": "Owner", "id": "c-owner", "format": {"type": "person"}},
+        {"name": "Tags", "id": "c-tags", "format": {"type": "select"}},
+        {"name": "Site", "id": "c-site", "format": {"type": "link"}},
+    ]
+    rows = [{"id": "i-1", "values": {"c-cost": MONEY, "c-owner": PERSON,
+                                     "c-tags": [{"name": "a"}, {"name": "b"}], "c-site": LINK}}]
+    with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
+        mock_list_columns.return_value = json.dumps(columns)
+        mock_iter_row_pages.return_value = iter([{"items": rows}])
+        result = CliRunner().invoke(clickMain, ['export-table', '--doc', 'd', '--table', 't'])
+
+    assert result.exit_code == 0
+    assert mock_iter_row_pages.call_args.kwargs["strValueFormat"] == "rich"
+    assert 'Cost,Owner,Tags,Site' in result.output
+    assert '42.5,Ann Lee,"a, b",https://example.com/a' in result.output
+    assert '@type' not in result.output
+
+
+def test_export_requests_rich_values_from_the_api():
+    """Against the API stand-in, currency is exported as its amount rather than "$482.73" text"""
+    doc = generate_doc(tables=1, columns=7, rows=20)
+    table = doc["tables"][0]
+    with FakeCodaServer([doc]) as server:
+        result = CliRunner().invoke(clickMain, ['export-table', '--doc', doc["id"], '--table', table["id"]],
+                                    env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url})
+    assert result.exit_code == 0, result.output
+    rows = list(csv.reader(result.output.splitlines()))
+    first = table["rows"][0]["values"]
+    assert rows[1][2] == str(first["c-0-2"]["amount"]) and "$" not in result.output
+    assert rows[1][6] == first["c-0-6"]["name"]
+
+
+def test_benchmark_reports_each_method():
+    """The conversion benchmark times every method over the same table"""
+    results = run(rows=20, columns=10)
+    assert set(results) == {"str", "display_value", "compiled"}
+    assert all(result["cells_per_second"] > 0 for result in results.values())
@@ -0,0 +1,72 @@
+"""Tests for constant-memory column statistics"""
+import random
+import statistics
+
+from common.column_stats import ColumnStats, FrequentItems, HyperLogLog
+
+
+def test_hyperloglog_estimates_distinct_counts():
+    """Estimates stay within a few percent, and duplicates do not inflate them"""
+    small = HyperLogLog()
+    for value in ["a", "b", "c"] * 100:
+        small.add(value)
+    assert small.count() == 3
+
+    large = HyperLogLog()
+    for value in range(100000):
+        large.add(value)
+        large.add(value)
+    assert abs(large.count() - 100000) < 5000
+    assert len(large.registers) == 4096
+
+
+def test_frequent_items_bounded_and_keeps_heavy_hitters():
+    """Counts are exact under capacity; past it the frequent values survive with lower-bound counts"""
+    exact = FrequentItems(capacity=10)
+    exact.update({"a": 3, "b": 1})
+    exact.update({"a": 2})
+    assert exact.top(2) == [("a", 5), ("b", 1)]
+
+    rng = random.Random(1)
+    summary = FrequentItems(capacity=20)
+    for _ in range(50):
+        page = {f"noise-{rng.randrange(100000)}": 1 for _ in range(200)}
+        page["hot"] = 40
+        page["warm"] = 20
+        summary.update(page)
+    assert len(summary.counts) <= 20
+    assert [value for value, _ in summary.top(2)] == ["hot", "warm"]
+    assert 2000 - summary.error <= summary.counts["hot"] <= 2000
+
+
+def test_column_stats_merges_pages():
+    """Moments merged page by page match the whole-column values"""
+    rng = random.Random(2)
+    values = [rng.uniform(-50, 150) for _ in range(1000)] + [None, ""]
+    stats = ColumnStats("Cost", "number")
+    for start in range(0, len(values), 97):
+        stats.update(values[start:start + 97])
+    summary = stats.summary()
+    numbers = [value for value in values if isinstance(value, float)]
+    assert summary["rows"] == 1002 and summary["nulls"] == 2
+    assert abs(summary["mean"] - statistics.mean(numbers)) < 1e-9
+    assert abs(summary["stddev"] - statistics.stdev(numbers)) < 1e-9
+    assert (summary["min"], summary["max"]) == (min(numbers), max(numbers))
+
+
+def test_column_stats_text_lists_and_checkboxes():
+    """Text ranges sort lexically, lists count by their joined text, checkboxes are not numeric"""
+    dates = ColumnStats("Due", "date")
+    dates.update(["2024-03-01", "2023-12-31", "2024-03-01"])
+    summary = dates.summary(top=1)
+    assert (summary["min"], summary["max"]) == ("2023-12-31", "2024-03-01")
+    assert summary["distinct"] == 2 and summary["top"] == [("2024-03-01", 2)]
+
+    tags = ColumnStats("Tags", "select")
+    tags.update([["a", "b"], ["a", "b"], ["c"], []])
+    assert tags.summary()["top"] == [("a, b", 2), ("c", 1)]
+    assert tags.summary()["nulls"] == 1
+
+    done = ColumnStats("Done", "checkbox")
+    done.update([True, False, True])
+    assert done.summary()["mean"] is None and done.summary()["distinct"] == 2
@@ -0,0 +1,78 @@
+"""Tests for compressed export outputs"""
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+import pytest
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.compression import COMPRESSORS, compression_for, open_output
+
+
+def test_compression_from_extension_or_choice():
+    """An explicit choice wins over the extension, plain names are uncompressed"""
+    assert compression_for("rows.csv.gz") == "gzip"
+    assert compression_for("rows.csv.bz2") == "bz2"
+    assert compression_for("rows.csv.xz") == "xz"
+    assert compression_for("rows.csv") is None
+    assert compression_for("rows.csv", "xz") == "xz"
+    if "zstd" not in COMPRESSORS:
+        with pytest.raises(ValueError):
+            compression_for("rows.csv", "zstd")
+
+
+def test_open_output_streams_compressed_text():
+    """Text written in pieces reads back from every available compressor"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, (extension, _) in COMPRESSORS.items():
+            path = os.path.join(temp_dir, f"rows.csv{extension}")
+            with open_output(path) as f:
+                for index in range(1000):
+                    f.write(f"row {index},Café\r\n")
+            with open(path, "rb") as f:
+                assert not f.read(20).startswith(b"row 0")
+            if name in ("gzip", "bz2", "xz"):
+                opener = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}[name]
+                with opener(path, "rt", encoding="utf-8", newline="") as f:
+                    lines = f.read().split("\r\n")
+                assert lines[0] == "row 0,Café"
+                assert len(lines) == 1001
+
+
+def test_export_table_gzip_from_extension():
+    """export-table --output rows.csv.gz writes gzip without a --compress flag"""
+    doc = generate_doc(tables=1, columns=3, rows=450)
+    table_id = doc["tables"][0]["id"]
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        plain_file = os.path.join(temp_dir, "rows.csv")
+        gzip_file = os.path.join(temp_dir, "rows.csv.gz")
+        with FakeCodaServer([doc]) as server:
+            env = {"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+            for output in (plain_file, gzip_file):
+                result = runner.invoke(
+                    clickMain, ['export-table', '--doc', doc["id"], '--table', table_id, '--output', output], env=env
+                )
+                assert result.exit_code == 0
+        with open(plain_file, "rb") as f:
+            plain = f.read()
+        with gzip.open(gzip_file, "rb") as f:
+            assert f.read() == plain
+        assert os.path.getsize(gzip_file) < len(plain)
+
+
+def test_export_template_xz_to_stdout():
+    """--compress without --output writes compressed bytes to stdout"""
+    doc = generate_doc(tables=2, columns=3, rows=5)
+    runner = CliRunner()
+    with FakeCodaServer([doc]) as server:
+        result = runner.invoke(
+            clickMain, ['export-template', '--doc', doc["id"], '--compress', 'xz'],
+            env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+        )
+    assert result.exit_code == 0
+    assert "document:" in lzma.decompress(result.stdout_bytes).decode("utf-8")
@@ -0,0 +1,128 @@
+"""Tests for dry-run cost estimates and the rate budget"""
+import json
+import os
+import tempfile
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.cost_estimator import ITEM_BYTES, CostEstimator, pages_for
+from common.doc_fingerprint import DocumentFingerprint
+from common.pycoda import Pycoda
+from common.rate_budget import RateBudget, is_write
+from common.table_data_exporter import TableDataExporter
+from common.template_exporter import TemplateExporter
+
+
+@pytest.fixture
+def synthetic_doc():
+    """Two tables of 450 rows; the second looks up rows of the first"""
+    return generate_doc(tables=2, columns=4, rows=450)
+
+
+def _api_calls(server):
+    return len([request for request in server.requests if request["status"] == 200])
+
+
+def test_export_table_estimate_matches_the_export(synthetic_doc):
+    """The estimated calls and row pages are what the export then makes, lookups included"""
+    with FakeCodaServer([synthetic_doc]) as server:
+        pycoda = Pycoda("test-key", server.url)
+        table_id = synthetic_doc["tables"][1]["id"]
+        estimate = CostEstimator(pycoda, RateBudget()).estimate_export_table(synthetic_doc["id"], table_id, ["lookups"])
+        assert estimate["pages"] == 6  # 3 pages of the table and 3 of the looked up table
+        assert estimate["bytes"] > 0 and estimate["writes"] == 0
+        assert estimate["dry_run_reads"] == len(server.requests) == 4  # get_table and list_columns of both tables
+
+        server.requests.clear()
+        TableDataExporter(pycoda).export_table_csv(synthetic_doc["id"], table_id, expand=["lookups"])
+        assert _api_calls(server) == estimate["calls"] == 8
+
+
+def test_export_template_estimate_matches_the_export(synthetic_doc):
+    """Listing pages and tables is enough to count the requests of a template export"""
+    with FakeCodaServer([synthetic_doc]) as server:
+        pycoda = Pycoda("test-key", server.url)
+        estimate = CostEstimator(pycoda, RateBudget(), cache_file=None).estimate_export_template(synthetic_doc["id"])
+        assert len(server.requests) == estimate["dry_run_reads"] == 3  # get_doc, list_sections and list_tables
+
+        server.requests.clear()
+        TemplateExporter(pycoda).extract_document_structure(synthetic_doc["id"])
+        assert _api_calls(server) == estimate["calls"] == 5
+
+
+def test_cached_export_template_estimate_counts_only_listed_pages():
+    """Tables outside the listed pages add pseudo-sections to the cached tree but no page to list"""
+    structure = {"id": "doc-1", "name": "Project", "sections": [{"id": "canvas-1", "name": "Page", "contentType": "canvas"}],
+                 "tables": [
+                     {"id": "grid-1", "name": "Listed", "parent": {"id": "canvas-1", "name": "Page"},
+                      "columns": [{"name": f"c{i}", "format": {"type": "text"}} for i in range(2)]},
+                     {"id": "grid-2", "name": "Nested", "parent": {"id": "canvas-9", "name": "Hidden"},
+                      "columns": [{"name": f"c{i}", "format": {"type": "text"}} for i in range(3)]}]}
+    client = Mock(spec=Pycoda)
+    client.get_doc.return_value = json.dumps({"id": "doc-1", "updatedAt": "2024-01-01T00:00:00.000Z"})
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_file = os.path.join(tmp_dir, "fingerprints.json")
+        with patch.object(TemplateExporter, "extract_document_structure", return_value=structure):
+            assert len(DocumentFingerprint(client, cache_file).fingerprint("doc-1")["children"]) == 2
+        estimate = CostEstimator(client, RateBudget(), cache_file).estimate_export_template("doc-1")
+    assert estimate["bytes"] == (1 + 1 + 2 + 5) * ITEM_BYTES  # doc, one page, two tables, five columns
+    assert estimate["reads"] == 5 and estimate["dry_run_reads"] == 1
+    client.list_sections.assert_not_called()
+
+
+def test_estimates_use_the_rate_budget():
+    """Wall time is the larger of sequential latency and the time the budget needs"""
+    estimator = CostEstimator(Mock(spec=Pycoda), RateBudget(reads=100, writes=10, window=6))
+    assert estimator.estimate("x", reads=10)["seconds"] == 3.0
+    assert estimator.estimate("x", reads=1100)["seconds"] == 330.0
+    assert estimator.estimate("x", writes=510)["seconds"] == 300.0
+    assert estimator.estimate("x", writes=1)["budget"] == "100 reads and 10 writes per 6s"
+    assert pages_for(0) == 1 and pages_for(100) == 1 and pages_for(101) == 2
+
+
+def test_rate_budget_spaces_requests_beyond_the_burst():
+    """acquire() lets a burst through at once, then waits for the bucket to refill"""
+    budget = RateBudget(reads=5, writes=1, window=0.5)
+    started = time.monotonic()
+    for _ in range(5):
+        budget.acquire()
+    assert time.monotonic() - started < 0.05
+    budget.acquire()
+    assert time.monotonic() - started >= 0.09
+    assert is_write("create_doc") and is_write("post /docs/*/pages") and not is_write("list_rows")
+    with pytest.raises(ValueError):
+        RateBudget(reads=0)
+
+
+def test_dry_run_import_creates_nothing():
+    """import-template --dry-run reports one write without calling the API"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template_file = os.path.join(tmp_dir, "template.yaml")
+        with open(template_file, "w") as f:
+            f.write("document:\n  name: '{{DOC_NAME}}'\n  sections: []\n")
+        with patch.object(Pycoda, "create_document") as create_document:
+            result = CliRunner().invoke(clickMain, ['--out', 'json', 'import-template', '--file', template_file,
+                                                    '--variables', 'DOC_NAME=Alpha', '--dry-run'])
+        assert result.exit_code == 0, result.output
+        create_document.assert_not_called()
+        estimate = json.loads(result.output)[0]
+        assert estimate["operation"] == "import-template Alpha"
+        assert estimate["calls"] == estimate["writes"] == 1
+
+
+def test_configured_rate_budget(monkeypatch):
+    """CODA_RATE_* settings throttle the client and are what dry runs estimate under"""
+    monkeypatch.setenv("CODA_RATE_READS", "50")
+    monkeypatch.setenv("CODA_RATE_WINDOW", "10")
+    with patch.object(Pycoda, "get_table", return_value=json.dumps({"id": "grid-1", "rowCount": 1000})), \
+            patch.object(Pycoda, "list_columns", return_value=json.dumps([{"id": "c-1", "name": "Name"}])):
+        result = CliRunner().invoke(clickMain, ['export-table', '--doc', 'doc-1', '--table', 'grid-1', '--dry-run'])
+    assert result.exit_code == 0, result.output
+    assert "export-table grid-1\t6\t6\t0\t5\t" in result.output
+    assert "50 reads and 10 writes per 10s" in result.output
@@ -0,0 +1,116 @@
+"""Tests for content-addressed document backups"""
+import gzip
+import json
+import os
+import tempfile
+import pytest
+from unittest.mock import Mock
+
+from click.testing import CliRunner
+
+from coda import clickMain
+from common.doc_backup import BlobStore, DocumentBackup
+from common.pycoda import Pycoda
+
+
+DOCS = [
+    {"id": "doc-1", "name": "Alpha", "updatedAt": "2024-01-01T00:00:00Z"},
+    {"id": "doc-2", "name": "Beta", "updatedAt": "2024-01-02T00:00:00Z"},
+]
+TABLES = [
+    {"id": "grid-tasks", "name": "Tasks", "tableType": "table", "parent": {"id": "canvas-1", "name": "Work"}},
+    {"id": "view-open", "name": "Open Tasks", "tableType": "view", "parent": {"id": "canvas-1", "name": "Work"}}
+]
+COLUMNS = [{"id": "c-name", "name": "Name", "format": {"type": "text"}}]
+
+
+@pytest.fixture
+def dest():
+    """Temporary backup directory"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield tmp_dir
+
+
+@pytest.fixture
+def mock_pycoda():
+    """Mock Pycoda serving two documents with one table and one view each"""
+    client = Mock(spec=Pycoda)
+    client.list_docs.return_value = json.dumps(DOCS)
+    client.get_doc.side_effect = lambda doc_id: json.dumps(
+        {"id": doc_id, "name": doc_id.title(), "ownerName": "Owner"})
+    client.list_sections.return_value = "{}"
+    client.list_tables.return_value = json.dumps(TABLES)
+    client.list_columns.return_value = json.dumps(COLUMNS)
+    client.iter_row_pages.side_effect = lambda *args, **kwargs: iter(
+        [{"items": [{"id": "i-1", "values": {"c-name": "Write spec"}}]}])
+    return client
+
+
+def _blob_files(dest):
+    return sorted(name for _, _, names in os.walk(os.path.join(dest, "blobs")) for name in names)
+
+
+def test_blob_store_deduplicates_content(dest):
+    """Equal content is stored once under its SHA-256"""
+    store = BlobStore(dest)
+    digest, size, created = store.put(b"hello")
+    assert (size, created) == (5, True)
+    assert store.put(b"hello") == (digest, 5, False)
+    with gzip.open(store.path(digest)) as f:
+        assert f.read() == b"hello"
+    assert _blob_files(dest) == [f"{digest}.gz"]
+
+
+def test_backup_exports_every_doc_and_writes_snapshot(mock_pycoda, dest):
+    """Each doc gets a template blob and one blob per table; views are skipped"""
+    manifest, path = DocumentBackup(mock_pycoda, dest, jobs=2).backup()
+
+    assert os.path.dirname(path) == os.path.join(dest, "snapshots")
+    with open(path) as f:
+        assert json.load(f) == manifest
+    alpha, beta = manifest["docs"]
+    assert [alpha["id"], beta["id"]] == ["doc-1", "doc-2"]
+    assert [table["id"] for table in alpha["tables"]] == ["grid-tasks"]
+    assert alpha["tables"][0]["rows"] == 1
+    # Both docs have the same table data and, once the name becomes {{DOC_NAME}},
+    # the same template, so each is stored once
+    assert alpha["tables"][0]["blob"] == beta["tables"][0]["blob"]
+    assert alpha["template"]["blob"] == beta["template"]["blob"]
+    assert manifest["new_blobs"] == 2
+    with gzip.open(BlobStore(dest).path(alpha["tables"][0]["blob"])) as f:
+        assert f.read() == b"Name\r\nWrite spec\r\n"
+
+
+def test_unchanged_docs_are_reused_without_api_calls(mock_pycoda, dest):
+    """A second run carries over docs whose updatedAt did not change"""
+    DocumentBackup(mock_pycoda, dest).backup()
+    mock_pycoda.get_doc.reset_mock()
+    mock_pycoda.list_docs.return_value = json.dumps([DOCS[0], dict(DOCS[1], updatedAt="2024-02-01T00:00:00Z")])
+
+    manifest, _ = DocumentBackup(mock_pycoda, dest).backup()
+
+    assert [entry.get("unchanged", False) for entry in manifest["docs"]] == [True, False]
+    assert [call.args[0] for call in mock_pycoda.get_doc.call_args_list] == ["doc-2"]
+    assert manifest["new_blobs"] == 0  # doc-2 content is unchanged, so its blobs already exist
+    assert len(_blob_files(dest)) == 2
+
+
+def test_failed_table_is_recorded_and_leaves_no_blob(mock_pycoda, dest):
+    """An export error is reported per doc and its partial blob discarded"""
+    def failing(*args, **kwargs):
+        raise Exception("Status code: 500. Message: boom")
+        yield  # pragma: no cover
+
+    mock_pycoda.iter_row_pages.side_effect = failing
+    manifest, _ = DocumentBackup(mock_pycoda, dest).backup(["doc-1"])
+
+    assert "boom" in manifest["docs"][0]["error"]
+    assert len(_blob_files(dest)) == 1  # only the template
+    assert not [name for name in os.listdir(dest) if name.startswith(".tmp")]
+
+
+def test_backup_command_requires_docs(dest):
+    """backup needs --all-docs or --doc"""
+    result = CliRunner().invoke(clickMain, ['backup', '--dest', dest])
+    assert result.exit_code != 0
+    assert "--all-docs" in result.output
@@ -0,0 +1,122 @@
+"""Tests for structural fingerprints and drift checks"""
+import copy
+import json
+import os
+import tempfile
+import pytest
+from unittest.mock import Mock, patch
+
+from click.testing import CliRunner
+
+from coda import clickMain
+from common.doc_fingerprint import DocumentFingerprint, diff_trees, fingerprint_tree
+from common.pycoda import Pycoda
+
+
+def _structure(doc_id="doc-1", suffix="1"):
+    """Document structure as extract_document_structure returns it, with per-doc IDs"""
+    return {
+        "id": doc_id, "name": f"Project {suffix}", "ownerName": "Owner",
+        "sections": [{"id": f"canvas-a{suffix}", "name": "Work", "contentType": "canvas"},
+                     {"id": f"canvas-b{suffix}", "name": "Notes", "contentType": "canvas"}],
+        "tables": [{
+            "id": f"grid-{suffix}", "name": "Tasks", "parent": {"id": f"canvas-a{suffix}", "name": "Work"},
+            "columns": [
+                {"id": f"c-name{suffix}", "name": "Name", "format": {"type": "text"}, "display": True},
+                {"id": f"c-proj{suffix}", "name": "Project", "format": {
+                    "type": "lookup", "table": {"id": f"grid-p{suffix}", "href": f"https://x/{suffix}", "name": "Projects"}}},
+                {"id": f"c-total{suffix}", "name": "Total", "calculated": True, "formula": "thisRow.Cost * 2",
+                 "format": {"type": "number"}},
+            ]}],
+    }
+
+
+def test_documents_from_one_template_share_hashes():
+    """IDs, links and the document name do not affect the fingerprint"""
+    assert fingerprint_tree(_structure("doc-1", "1"))["hash"] == fingerprint_tree(_structure("doc-2", "2"))["hash"]
+    tree = fingerprint_tree(_structure())
+    assert list(tree["children"]) == ["Work", "Notes"]
+    assert list(tree["children"]["Work"]["children"]["Tasks"]["children"]) == ["Name", "Project", "Total"]
+
+
+def test_drift_is_reported_per_subtree():
+    """Changed, missing and extra nodes are reported at the deepest differing path"""
+    expected = fingerprint_tree(_structure())
+    drifted = _structure("doc-2", "2")
+    columns = drifted["tables"][0]["columns"]
+    columns[2]["formula"] = "thisRow.Cost * 3"
+    columns.pop(0)
+    columns.append({"id": "c-new", "name": "Owner", "format": {"type": "person"}})
+    drifted["sections"].pop()
+
+    assert diff_trees(expected, fingerprint_tree(drifted)) == [
+        ("missing", "/Work/Tasks/Name"),
+        ("changed", "/Work/Tasks/Total"),
+        ("extra", "/Work/Tasks/Owner"),
+        ("missing", "/Notes"),
+    ]
+    assert diff_trees(expected, expected) == []
+
+
+@pytest.fixture
+def cache_file():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield os.path.join(tmp_dir, "fingerprints.json")
+
+
+def _mock_pycoda(updated_at="2024-01-01T00:00:00Z"):
+    structure = _structure()
+    client = Mock(spec=Pycoda)
+    client.get_doc.return_value = json.dumps({"id": "doc-1", "name": "Project 1", "ownerName": "Owner",
+                                              "updatedAt": updated_at})
+    client.list_sections.return_value = json.dumps(structure["sections"])
+    client.list_tables.return_value = json.dumps([{k: v for k, v in t.items() if k != "columns"}
+                                                  for t in structure["tables"]])
+    client.list_columns.return_value = json.dumps(structure["tables"][0]["columns"])
+    return client
+
+
+def test_unchanged_documents_come_from_the_cache(cache_file):
+    """A cached tree is reused while updatedAt is unchanged, costing one get_doc"""
+    client = _mock_pycoda()
+    tree = DocumentFingerprint(client, cache_file).fingerprint("doc-1")
+    assert tree == fingerprint_tree(_structure())
+    assert client.list_columns.call_count == 1
+
+    again = DocumentFingerprint(client, cache_file).fingerprint("doc-1")
+    assert again == tree
+    assert client.list_columns.call_count == 1 and client.get_doc.call_count == 2
+
+    client.get_doc.return_value = json.dumps({"id": "doc-1", "name": "Project 1", "ownerName": "Owner",
+                                              "updatedAt": "2024-02-01T00:00:00Z"})
+    DocumentFingerprint(client, cache_file).fingerprint("doc-1")
+    assert client.list_columns.call_count == 2
+
+
+def test_check_drift_command_exit_status(cache_file):
+    """check-drift exits 0 without drift and 1 with it, listing the drifted paths"""
+    base = fingerprint_tree(_structure())
+    changed = copy.deepcopy(_structure())
+    changed["tables"][0]["columns"][0]["format"] = {"type": "number"}
+    trees = {"doc-t": base, "doc-a": base, "doc-b": fingerprint_tree(changed)}
+
+    with patch.object(DocumentFingerprint, "fingerprint", side_effect=lambda doc_id: trees[doc_id]):
+        runner = CliRunner()
+        args = ['check-drift', '--template', 'doc-t', '--cache', cache_file, '--doc', 'doc-a']
+        result = runner.invoke(clickMain, args)
+        assert result.exit_code == 0, result.output
+        assert "doc-a\tnone" in result.output
+
+        result = runner.invoke(clickMain, args + ['--doc', 'doc-b'])
+        assert result.exit_code == 1
+        assert "doc-b\tchanged\t/Work/Tasks/Name" in result.output
+
+
+def test_fingerprint_command_lists_hashes(cache_file):
+    """fingerprint prints the root hash first, then every subtree"""
+    with patch.object(DocumentFingerprint, "fingerprint", return_value=fingerprint_tree(_structure())):
+        result = CliRunner().invoke(clickMain, ['fingerprint', '--doc', 'doc-1', '--cache', cache_file])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[1] == "/\t" + fingerprint_tree(_structure())["hash"]
+    assert any(line.startswith("/Work/Tasks/Total\t") for line in lines)
@@ -0,0 +1,140 @@
+"""Tests for the SQLite document mirror"""
+import json
+import os
+import sqlite3
+import tempfile
+import pytest
+from unittest.mock import Mock
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from common.doc_mirror import DocumentMirror
+from common.pycoda import Pycoda
+
+
+TABLES = [
+    {"id": "grid-tasks", "name": "Tasks", "tableType": "table"},
+    {"id": "view-open", "name": "Open Tasks", "tableType": "view"}
+]
+COLUMNS = [
+    {"id": "c-name", "name": "Name", "format": {"type": "text"}},
+    {"id": "c-cost", "name": "Cost", "format": {"type": "currency"}},
+    {"id": "c-done", "name": "Done", "format": {"type": "checkbox"}},
+    {"id": "c-tags", "name": "Tags", "format": {"type": "select"}}
+]
+
+
+def _row(row_id, name, cost, done):
+    """Build an API row for the Tasks table"""
+    return {"id": row_id, "index": int(row_id[2:]), "updatedAt": "2024-01-01T00:00:00Z",
+            "values": {"c-name": name, "c-cost": cost, "c-done": done, "c-tags": ["a", "b"]}}
+
+
+@pytest.fixture
+def db_path():
+    """Temporary SQLite database path"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield os.path.join(tmp_dir, "mirror.sqlite")
+
+
+@pytest.fixture
+def mock_pycoda():
+    """Mock Pycoda returning one table and one view"""
+    client = Mock(spec=Pycoda)
+    client.list_tables.return_value = json.dumps(TABLES)
+    client.list_columns.return_value = json.dumps(COLUMNS)
+    return client
+
+
+def test_full_load_types_and_indexes(mock_pycoda, db_path):
+    """Views are skipped, columns get typed affinity and indexes are created"""
+    mock_pycoda.iter_row_pages.return_value = iter([
+        {"items": [_row("i-1", "Write spec", 12.5, False)]},
+        {"items": [_row("i-2", "Ship it", 3, True)], "nextSyncToken": "sync-1"}
+    ])
+
+    results = DocumentMirror(mock_pycoda, db_path).mirror_document("doc-1", ["Tasks.Name"])
+
+    assert results == [{"table": "Tasks", "rows": 2, "mode": "full"}]
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT _row_id, Name, Cost, Done, Tags FROM "grid-tasks" ORDER BY _row_index').fetchall()
+    assert rows == [("i-1", "Write spec", 12.5, 0, '["a", "b"]'), ("i-2", "Ship it", 3.0, 1, '["a", "b"]')]
+    assert conn.execute("SELECT sync_token, row_count FROM _coda_tables").fetchone() == ("sync-1", 2)
+    indexes = [r[1] for r in conn.execute("PRAGMA index_list('grid-tasks')")]
+    assert "ix_grid-tasks_Name" in indexes
+    conn.close()
+
+
+def test_incremental_refresh_uses_sync_token(mock_pycoda, db_path):
+    """A second run only fetches changed rows and upserts them by row ID"""
+    mirror = DocumentMirror(mock_pycoda, db_path)
+    mock_pycoda.iter_row_pages.return_value = iter([
+        {"items": [_row("i-1", "Write spec", 12.5, False), _row("i-2", "Ship it", 3, True)],
+         "nextSyncToken": "sync-1"}
+    ])
+    mirror.mirror_document("doc-1")
+
+    mock_pycoda.iter_row_pages.return_value = iter([
+        {"items": [_row("i-2", "Ship it now", 4, True)], "nextSyncToken": "sync-2"}
+    ])
+    results = mirror.mirror_document("doc-1")
+
+    assert results == [{"table": "Tasks", "rows": 1, "mode": "incremental"}]
+    assert mock_pycoda.iter_row_pages.call_args.kwargs["strSyncToken"] == "sync-1"
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('SELECT Name FROM "grid-tasks" ORDER BY _row_index').fetchall() == [("Write spec",), ("Ship it now",)]
+    assert conn.execute("SELECT sync_token, row_count FROM _coda_tables").fetchone() == ("sync-2", 2)
+    conn.close()
+
+
+def test_schema_change_triggers_rebuild(mock_pycoda, db_path):
+    """Changing the column list drops and reloads the mirrored table"""
+    mirror = DocumentMirror(mock_pycoda, db_path)
+    mock_pycoda.iter_row_pages.return_value = iter([{"items": [_row("i-1", "A", 1, False)], "nextSyncToken": "s"}])
+    mirror.mirror_document("doc-1")
+
+    mock_pycoda.list_columns.return_value = json.dumps(COLUMNS[:2])
+    mock_pycoda.iter_row_pages.return_value = iter([{"items": [_row("i-1", "A", 1, False)]}])
+    results = mirror.mirror_document("doc-1")
+
+    assert results[0]["mode"] == "full"
+    conn = sqlite3.connect(db_path)
+    columns = [r[1] for r in conn.execute("PRAGMA table_info('grid-tasks')")]
+    assert columns == ["_row_id", "_row_index", "_updated_at", "Name", "Cost"]
+    conn.close()
+
+
+def test_currency_from_the_api_is_stored_as_real(db_path):
+    """Against the API stand-in, currency cells hold amounts that SUM correctly"""
+    doc = generate_doc(tables=1, columns=7, rows=250)
+    table = doc["tables"][0]
+    amounts = [row["values"]["c-0-2"]["amount"] for row in table["rows"]]
+    with FakeCodaServer([doc]) as server:
+        DocumentMirror(Pycoda("test-key", server.url), db_path).mirror_document(doc["id"])
+    conn = sqlite3.connect(db_path)
+    name = table["id"]
+    types = conn.execute(f'SELECT DISTINCT typeof("Column 2") FROM "{name}"').fetchall()
+    total = conn.execute(f'SELECT SUM("Column 2") FROM "{name}"').fetchone()[0]
+    person = conn.execute(f'SELECT "Column 6" FROM "{name}" WHERE _row_id = ?', (table["rows"][0]["id"],)).fetchone()[0]
+    conn.close()
+    assert types == [("real",)] and total == pytest.approx(sum(amounts))
+    assert person == table["rows"][0]["values"]["c-0-6"]["name"]
+
+
+def test_tables_sharing_a_name_are_mirrored_apart(db_path):
+    """Tables are stored by ID, so same-named tables of one or two docs never overwrite each other"""
+    docs = [generate_doc("doc-a", tables=2, columns=2, rows=3), generate_doc("doc-b", tables=1, columns=2, rows=4)]
+    docs[0]["tables"][1]["name"] = docs[0]["tables"][0]["name"]  # two "Table 0" in doc-a, one in doc-b
+    with FakeCodaServer(docs) as server:
+        mirror = DocumentMirror(Pycoda("test-key", server.url), db_path)
+        mirror.mirror_document("doc-a")
+        mirror.mirror_document("doc-b", ["Table 0.Column 0"])
+        mirror.mirror_document("doc-a", full=True)
+    conn = sqlite3.connect(db_path)
+    counts = {table["id"]: conn.execute(f'SELECT COUNT(*) FROM "{table["id"]}"').fetchone()[0]
+              for doc in docs for table in doc["tables"]}
+    assert counts == {"grid-doc-a-0": 3, "grid-doc-a-1": 3, "grid-doc-b-0": 4}
+    assert conn.execute("SELECT COUNT(*) FROM _coda_tables WHERE name = 'Table 0'").fetchone()[0] == 3
+    assert mirror.table_views(conn, "doc-b") == [("Table 0", "grid-doc-b-0")]
+    assert mirror.table_views(conn, "doc-a") == []
+    conn.close()
@@ -0,0 +1,73 @@
+"""Tests for checkpointed, resumable export-table"""
+import json
+import os
+import tempfile
+import pytest
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.export_checkpoint import CHECKPOINT_SUFFIX, ExportCheckpoint
+
+
+def _export(doc, output, *options, **server_options):
+    """Run export-table into output against a fresh fake server"""
+    with FakeCodaServer([doc], **server_options) as server:
+        return CliRunner().invoke(
+            clickMain, ['export-table', '--doc', doc["id"], '--table', doc["tables"][0]["id"], '--output', output]
+            + list(options),
+            env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+        )
+
+
+def test_interrupted_export_resumes_from_checkpoint(monkeypatch):
+    """A failed export leaves a checkpoint and --resume completes it identically"""
+    monkeypatch.setattr("common.pycoda.MAX_RETRIES", 0)
+    doc = generate_doc(tables=1, columns=4, rows=950)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        expected_file = os.path.join(temp_dir, "expected.csv")
+        output_file = os.path.join(temp_dir, "rows.csv")
+        assert _export(doc, expected_file).exit_code == 0
+        assert not os.path.exists(expected_file + CHECKPOINT_SUFFIX)
+
+        # The 4th request (third row page) is rate limited and not retried
+        failed = _export(doc, output_file, '--prefetch', '0', rate_limit_every=4)
+        assert failed.exit_code != 0
+        with open(output_file + CHECKPOINT_SUFFIX, encoding="utf-8") as f:
+            state = json.load(f)
+        assert state["rows"] == 400
+        assert state["page_token"] == "400"
+
+        # Simulate a crash mid-row after the last checkpoint
+        with open(output_file, "a", encoding="utf-8") as f:
+            f.write("partial,ro")
+
+        resumed = _export(doc, output_file, '--resume')
+        assert resumed.exit_code == 0
+        assert "Resuming export" in resumed.output
+        assert not os.path.exists(output_file + CHECKPOINT_SUFFIX)
+        with open(expected_file, "rb") as expected, open(output_file, "rb") as actual:
+            assert actual.read() == expected.read()
+
+
+def test_checkpoint_rejects_other_exports():
+    """A checkpoint written for different parameters is not resumed"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, "rows.csv")
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write("Name\r\nRow 1\r\n")
+        ExportCheckpoint(output_file, {"table_id": "grid-1"}).save("200", 1, 12)
+        assert ExportCheckpoint(output_file, {"table_id": "grid-1"}).load()["page_token"] == "200"
+        with pytest.raises(ValueError, match="different export"):
+            ExportCheckpoint(output_file, {"table_id": "grid-2"}).load()
+        assert ExportCheckpoint(os.path.join(temp_dir, "other.csv"), {}).load() is None
+
+
+def test_resume_needs_uncompressed_file():
+    """--resume is refused for stdout and compressed outputs"""
+    doc = generate_doc(tables=1, rows=5)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        result = _export(doc, os.path.join(temp_dir, "rows.csv.gz"), '--resume')
+    assert result.exit_code != 0
+    assert "--resume needs an uncompressed --output file" in result.output
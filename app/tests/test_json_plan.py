@@ -0,0 +1,207 @@
+"""Tests for planning and applying configs against live documents"""
+import json
+import os
+import tempfile
+import pytest
+import yaml
+from unittest.mock import Mock, patch
+
+from click.testing import CliRunner
+
+from coda import clickMain
+from common.doc_fingerprint import DocumentFingerprint, fingerprint_tree
+from common.json_cli import JsonPlan
+from common.pycoda import Pycoda
+from common.template_exporter import TemplateExporter
+
+
+def _structure(sections=10, tables_per_section=4):
+    """Live document structure with sections * tables_per_section tables"""
+    structure = {"id": "doc-1", "name": "Project", "ownerName": "Owner", "sections": [], "tables": []}
+    for s in range(sections):
+        structure["sections"].append({"id": f"canvas-{s}", "name": f"Section {s}", "contentType": "canvas"})
+        for t in range(tables_per_section):
+            structure["tables"].append({
+                "id": f"grid-{s}-{t}", "name": f"Table {s}.{t}", "parent": {"id": f"canvas-{s}", "name": f"Section {s}"},
+                "columns": [{"id": f"c-{s}-{t}-{c}", "name": f"Column {c}", "type": "column",
+                             "format": {"type": "text"}} for c in range(3)]})
+    return structure
+
+
+def _template(structure):
+    """Template dict as import-template parses it from an exported YAML file"""
+    return yaml.safe_load(TemplateExporter(None).generate_yaml_template(structure, {}))
+
+
+@pytest.fixture
+def cache_file():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield os.path.join(tmp_dir, "fingerprints.json")
+
+
+def _client(live=None):
+    client = Mock(spec=Pycoda)
+    client.list_docs.return_value = json.dumps([{"id": "doc-1", "name": "Project"}] if live else [])
+    client.create_document.return_value = {"id": "doc-new", "name": "Project"}
+    client.create_page.side_effect = lambda doc_id, name: {"id": f"canvas-{name}", "name": name}
+    return client
+
+
+def _fingerprint(live):
+    return patch.object(DocumentFingerprint, "fingerprint", return_value=fingerprint_tree(live))
+
+
+def test_unchanged_template_plans_nothing(cache_file):
+    """Re-applying a 40-table template to an unchanged doc makes no write calls"""
+    structure = _structure()
+    client = _client(live=True)
+    with _fingerprint(structure):
+        objPlan = JsonPlan(client, _template(structure))
+        assert objPlan.plan(strCacheFile=cache_file) == []
+    assert objPlan.apply() == []
+    client.create_page.assert_not_called()
+    client.create_document.assert_not_called()
+
+
+def test_plan_contains_only_the_differences(cache_file):
+    """Only the missing page and column are planned; tables and columns are manual steps"""
+    desired = _structure()
+    desired["sections"].append({"id": "canvas-x", "name": "Archive", "contentType": "canvas"})
+    live = _structure()
+    live["tables"][5]["columns"].pop()
+    client = _client(live=True)
+    with _fingerprint(live):
+        listOps = JsonPlan(client, _template(desired)).plan(strCacheFile=cache_file)
+
+    assert [(op["op"], op["doc"], op["path"]) for op in listOps] == [
+        ("create_column", "doc-1", "/Section 1/Table 1.1/Column 2"),
+        ("create_section", "doc-1", "/Archive"),
+    ]
+    assert listOps[0]["manual"] and listOps[1]["manual"] is None
+
+    objPlan = JsonPlan(client, _template(desired))
+    results = objPlan.apply(listOps)
+    assert results == [(listOps[1], {"id": "canvas-Archive", "name": "Archive"})]
+    client.create_page.assert_called_once_with("doc-1", "Archive")
+
+
+def test_missing_doc_is_created_with_pages_in_order(cache_file):
+    """A doc not found by name is created first, then its pages in template order"""
+    structure = _structure(sections=3, tables_per_section=1)
+    client = _client(live=False)
+    objPlan = JsonPlan(client, _template(structure))
+    listOps = objPlan.plan(strCacheFile=cache_file)
+
+    assert [(op["op"], op["path"]) for op in listOps] == [
+        ("create_doc", "/"),
+        ("create_section", "/Section 0"), ("create_table", "/Section 0/Table 0.0"),
+        ("create_section", "/Section 1"), ("create_table", "/Section 1/Table 1.0"),
+        ("create_section", "/Section 2"), ("create_table", "/Section 2/Table 2.0"),
+    ]
+    assert {op["doc"] for op in listOps} == {"new:Project"}
+
+    objPlan.apply(intJobs=2)
+    client.create_document.assert_called_once_with("Project")
+    assert [c.args for c in client.create_page.call_args_list] == [
+        ("doc-new", "Section 0"), ("doc-new", "Section 1"), ("doc-new", "Section 2")]
+
+
+def test_plan_and_apply_commands(cache_file):
+    """plan lists the operations; apply executes them and reports the manual steps left"""
+    desired = _structure(sections=2, tables_per_section=1)
+    live = _structure(sections=1, tables_per_section=1)
+    desired["name"] = "Project"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template_file = os.path.join(tmp_dir, "template.yaml")
+        with open(template_file, "w") as f:
+            f.write(TemplateExporter(None).generate_yaml_template(desired, {"DOC_NAME": "Project"}))
+
+        runner = CliRunner()
+        args = ['--file', template_file, '--doc', 'doc-1', '--variables', 'DOC_NAME=Project', '--cache', cache_file]
+        with _fingerprint(live), patch.object(Pycoda, "create_page", return_value={"id": "canvas-9", "name": "Section 1"}) as create_page:
+            result = runner.invoke(clickMain, ['plan'] + args)
+            assert result.exit_code == 0, result.output
+            assert "create_section\tdoc-1\t/Section 1\t" in result.output
+            create_page.assert_not_called()
+
+            result = runner.invoke(clickMain, ['apply'] + args)
+            assert result.exit_code == 0, result.output
+            create_page.assert_called_once_with("doc-1", "Section 1")
+            assert "Applied 1 of 1 operations, 1 manual steps left" in result.output
+
+        with _fingerprint(desired):
+            result = runner.invoke(clickMain, ['plan'] + args)
+        assert "No changes" in result.output
+
+
+def test_create_plan_handles_configs_deeper_than_the_recursion_limit():
+    """The explicit stack copies a config nested far beyond sys.getrecursionlimit()"""
+    config = leaf = {}
+    for depth in range(50000):
+        leaf["child"] = {"depth": depth, "items": [depth, None, 1.5]}
+        leaf = leaf["child"]
+    plan = JsonPlan(Mock(spec=Pycoda), config).config
+    node = plan
+    for depth in range(50000):
+        node = node["child"]
+        assert node["depth"] == depth
+    assert node["items"] == [49999, None, 1.5] and "child" not in node
+    assert plan is not config and plan["child"] is not config["child"]
+
+
+def test_replan_shares_unchanged_subtrees():
+    """Re-planning reuses the previous plan's objects for every subtree that did not change"""
+    config = {"coda": {"docs": [{"name": f"Doc {i}", "sections": [{"name": "Work"}]} for i in range(3)]}}
+    objPlan = JsonPlan(Mock(spec=Pycoda), config)
+    before = objPlan.config
+    changed = json.loads(json.dumps(config))
+    changed["coda"]["docs"][1]["sections"][0]["name"] = "Done"
+
+    after = objPlan.replan(changed)
+    assert after == changed
+    assert after is not before and after["coda"]["docs"][1] is not before["coda"]["docs"][1]
+    assert after["coda"]["docs"][0] is before["coda"]["docs"][0]
+    assert after["coda"]["docs"][2] is before["coda"]["docs"][2]
+
+
+def test_aliased_subtrees_are_copied_once():
+    """A subtree reached twice, as YAML aliases produce, stays shared in the copy"""
+    columns = [{"name": "Name", "format": {"type": "text"}}]
+    config = yaml.safe_load("a: &cols [{name: Name}]\nb: *cols\n")
+    assert config["a"] is config["b"]
+    plan = JsonPlan(Mock(spec=Pycoda), {"x": columns, "y": columns, **config}).config
+    assert plan["x"] is plan["y"] and plan["x"] is not columns
+    assert plan["a"] is plan["b"]
+
+
+def test_replan_compares_scalar_types_strictly():
+    """1, 1.0 and True are equal in Python but a change of type is still a change"""
+    config = {"a": {"value": 1}, "b": {"value": 1}, "c": {"value": 1}, "d": {"value": 1}}
+    objPlan = JsonPlan(Mock(spec=Pycoda), config)
+    before = objPlan.config
+    after = objPlan.replan({"a": {"value": True}, "b": {"value": 1.0}, "c": {"value": 1}, "d": {"value": 1}})
+    assert after["a"]["value"] is True and type(after["b"]["value"]) is float
+    assert after["a"] is not before["a"] and after["b"] is not before["b"]
+    assert after["c"] is before["c"] and after["d"] is before["d"]
+
+
+def test_replan_shares_subtrees_of_configs_deeper_than_the_recursion_limit():
+    """A change at the bottom of a deep config is found without recursion and unchanged siblings are shared"""
+    def deep(value):
+        config = leaf = {}
+        for depth in range(20000):
+            leaf["child"] = {"depth": depth, "side": {"depth": depth}}
+            leaf = leaf["child"]
+        leaf["value"] = value
+        return config
+
+    objPlan = JsonPlan(Mock(spec=Pycoda), deep(1))
+    before = objPlan.config
+    assert objPlan.replan(deep(1)) is before
+    after = objPlan.replan(deep(2))
+    assert after is not before
+    node, previous = after, before
+    for depth in range(20000):
+        node, previous = node["child"], previous["child"]
+        assert node is not previous and node["side"] is previous["side"]
+    assert node["value"] == 2
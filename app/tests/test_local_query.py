@@ -0,0 +1,77 @@
+"""Tests for SQL queries over the local document mirror"""
+import json
+from unittest.mock import patch
+from click.testing import CliRunner
+
+from coda import clickMain
+
+
+TABLES = [
+    {"id": "grid-projects", "name": "Projects", "tableType": "table"},
+    {"id": "grid-tasks", "name": "Tasks", "tableType": "table"}
+]
+COLUMNS = {
+    "grid-projects": [{"id": "c-pname", "name": "Project", "format": {"type": "text"}}],
+    "grid-tasks": [
+        {"id": "c-task", "name": "Task", "format": {"type": "text"}},
+        {"id": "c-proj", "name": "Project", "format": {"type": "text"}},
+        {"id": "c-hours", "name": "Hours", "format": {"type": "number"}}
+    ]
+}
+ROWS = {
+    "grid-projects": [{"items": [
+        {"id": "i-p1", "index": 1, "values": {"c-pname": "Alpha"}},
+        {"id": "i-p2", "index": 2, "values": {"c-pname": "Beta"}}
+    ], "nextSyncToken": "s1"}],
+    "grid-tasks": [{"items": [
+        {"id": "i-t1", "index": 1, "values": {"c-task": "Spec", "c-proj": "Alpha", "c-hours": 3}},
+        {"id": "i-t2", "index": 2, "values": {"c-task": "Build", "c-proj": "Alpha", "c-hours": 5}},
+        {"id": "i-t3", "index": 3, "values": {"c-task": "Plan", "c-proj": "Beta", "c-hours": 2}}
+    ], "nextSyncToken": "s2"}]
+}
+SQL = ('SELECT p.Project, SUM(t.Hours) AS Hours FROM Projects p '
+       'JOIN Tasks t ON t.Project = p.Project GROUP BY p.Project ORDER BY p.Project')
+
+
+def test_query_mirrors_once_then_runs_locally():
+    """First query builds the mirror, later queries never call the API"""
+    runner = CliRunner()
+    with runner.isolated_filesystem(), \
+         patch('common.pycoda.Pycoda.list_tables') as mock_list_tables, \
+         patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
+        mock_list_tables.return_value = json.dumps(TABLES)
+        mock_list_columns.side_effect = lambda doc, table: json.dumps(COLUMNS[table])
+        mock_iter_row_pages.side_effect = lambda doc, table, **kwargs: iter(ROWS[table])
+
+        result = runner.invoke(clickMain, ['--out', 'csv', 'query', '--doc', 'doc-1', SQL])
+        assert result.exit_code == 0
+        assert result.output.splitlines() == ["Project,Hours", "Alpha,8.0", "Beta,2.0"]
+
+        mock_list_tables.reset_mock()
+        mock_iter_row_pages.reset_mock()
+        result = runner.invoke(clickMain, ['--out', 'json', 'query', '--doc', 'doc-1', SQL])
+        assert result.exit_code == 0
+        assert json.loads(result.output) == [{"Project": "Alpha", "Hours": 8.0}, {"Project": "Beta", "Hours": 2.0}]
+        mock_list_tables.assert_not_called()
+        mock_iter_row_pages.assert_not_called()
+
+
+def test_query_rejects_writes_and_bad_sql():
+    """The mirror is opened read-only and SQL errors surface as CLI errors"""
+    runner = CliRunner()
+    with runner.isolated_filesystem(), \
+         patch('common.pycoda.Pycoda.list_tables') as mock_list_tables, \
+         patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
+        mock_list_tables.return_value = json.dumps(TABLES)
+        mock_list_columns.side_effect = lambda doc, table: json.dumps(COLUMNS[table])
+        mock_iter_row_pages.side_effect = lambda doc, table, **kwargs: iter(ROWS[table])
+
+        result = runner.invoke(clickMain, ['query', '--doc', 'doc-1', 'DELETE FROM Tasks'])
+        assert result.exit_code != 0
+        assert "Query failed" in result.output
+
+        result = runner.invoke(clickMain, ['query', '--doc', 'doc-1', 'SELECT * FROM Missing'])
+        assert result.exit_code != 0
+        assert "no such table" in result.output
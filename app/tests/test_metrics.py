@@ -0,0 +1,103 @@
+"""Tests for Prometheus textfile metrics of a CLI run"""
+import gzip
+import os
+import tempfile
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.call_stats import CallStats
+from common.metrics import RunMetrics, format_sample
+
+
+def _samples(text):
+    """Parse sample lines into {line without value: value}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = value
+    return samples
+
+
+def test_format_escapes_labels_and_aggregates_calls():
+    """Calls are counted per method with errors, retries and latency quantiles"""
+    stats = CallStats()
+    stats.record_call("list_tables", 200, 100, 0.2)
+    stats.record_call("list_tables", 429, 0, 0.4, retries=5)
+    stats.record_rows("export-table grid-1", 450, 1.0)
+    samples = _samples(RunMetrics(stats, "export-table").format(success=True, duration=1.5))
+
+    labels = 'command="export-table",method="list_tables"'
+    assert samples[f"coda_cli_requests_total{{{labels}}}"] == "2"
+    assert samples[f"coda_cli_request_errors_total{{{labels}}}"] == "1"
+    assert samples[f"coda_cli_request_retries_total{{{labels}}}"] == "5"
+    assert samples[f'coda_cli_request_duration_seconds{{{labels},quantile="0.5"}}'] == "0.200000"
+    assert samples[f"coda_cli_request_duration_seconds_count{{{labels}}}"] == "2"
+    assert samples['coda_cli_rows_total{command="export-table",operation="export-table",table="grid-1"}'] == "450"
+    assert samples['coda_cli_command_duration_seconds{command="export-table"}'] == "1.500000"
+    assert format_sample("m", {"path": 'a"b\\c'}, 1) == 'm{path="a\\"b\\\\c"} 1'
+
+
+def test_metrics_file_written_for_failed_run():
+    """A failed command still writes metrics, with success 0"""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        metrics_file = os.path.join(temp_dir, "coda.prom")
+        with FakeCodaServer([generate_doc(tables=1, rows=5)]) as server:
+            result = runner.invoke(
+                clickMain, ['--metrics-file', metrics_file, 'export-template', '--doc', 'missing'],
+                env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+            )
+        assert result.exit_code != 0
+        with open(metrics_file, encoding="utf-8") as f:
+            samples = _samples(f.read())
+    assert samples['coda_cli_command_success{command="export-template"}'] == "0"
+
+
+def test_metrics_file_for_export():
+    """export-table writes rows, bytes written and per-method request counts"""
+    doc = generate_doc(tables=1, columns=3, rows=450)
+    table_id = doc["tables"][0]["id"]
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        metrics_file = os.path.join(temp_dir, "coda.prom")
+        output_file = os.path.join(temp_dir, "rows.csv")
+        with FakeCodaServer([doc]) as server:
+            result = runner.invoke(
+                clickMain, ['--metrics-file', metrics_file, 'export-table', '--doc', doc["id"],
+                            '--table', table_id, '--output', output_file],
+                env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+            )
+        assert result.exit_code == 0
+        with open(metrics_file, encoding="utf-8") as f:
+            samples = _samples(f.read())
+        written = os.path.getsize(output_file)
+    assert samples['coda_cli_command_success{command="export-table"}'] == "1"
+    assert samples[f'coda_cli_rows_total{{command="export-table",operation="export-table",table="{table_id}"}}'] == "450"
+    assert samples['coda_cli_uncompressed_bytes_written_total{command="export-table"}'] == str(written)
+    assert samples['coda_cli_requests_total{command="export-table",method="get /docs/*/tables/*/rows"}'] == "3"
+    assert samples['coda_cli_requests_total{command="export-table",method="list_columns"}'] == "1"
+
+
+def test_bytes_written_are_counted_before_compression():
+    """A gzip export reports the CSV bytes it compressed, not the smaller file size"""
+    doc = generate_doc(tables=1, columns=3, rows=450)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        metrics_file = os.path.join(temp_dir, "coda.prom")
+        output_file = os.path.join(temp_dir, "rows.csv.gz")
+        with FakeCodaServer([doc]) as server:
+            result = CliRunner().invoke(
+                clickMain, ['--metrics-file', metrics_file, 'export-table', '--doc', doc["id"],
+                            '--table', doc["tables"][0]["id"], '--output', output_file],
+                env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+            )
+        assert result.exit_code == 0
+        with open(metrics_file, encoding="utf-8") as f:
+            samples = _samples(f.read())
+        with gzip.open(output_file, "rb") as f:
+            uncompressed = len(f.read())
+        compressed = os.path.getsize(output_file)
+    assert samples['coda_cli_uncompressed_bytes_written_total{command="export-table"}'] == str(uncompressed)
+    assert compressed < uncompressed
@@ -0,0 +1,100 @@
+"""Tests for --profile and exporter phase spans"""
+import os
+import pstats
+import tempfile
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.profiler import PhaseTimer
+from common.spans import add_listener, remove_listener, span
+
+
+def test_spans_nest_and_reach_listeners():
+    """Finished spans carry their parent, duration and attributes"""
+    finished = []
+    add_listener(finished.append)
+    try:
+        with span("export") as outer:
+            with span("fetch", call="rows") as inner:
+                pass
+    finally:
+        remove_listener(finished.append)
+    assert [s.name for s in finished] == ["fetch", "export"]
+    assert inner.parent_id == outer.span_id
+    assert inner.attrs == {"call": "rows"}
+    assert outer.seconds >= inner.seconds
+
+    with span("ignored") as unobserved:
+        assert unobserved is None
+
+
+def test_export_table_phases_are_timed():
+    """export-table reports fetch, parse, transform and write phases"""
+    doc = generate_doc(tables=1, columns=3, rows=450)
+    timer = PhaseTimer()
+    add_listener(timer)
+    try:
+        from common.pycoda import Pycoda
+        from common.table_data_exporter import TableDataExporter
+        with FakeCodaServer([doc]) as server:
+            TableDataExporter(Pycoda("test-key", server.url)).export_table_csv(doc["id"], doc["tables"][0]["id"])
+    finally:
+        remove_listener(timer)
+    # list_columns + 3 row pages + the exhausted page iterator
+    assert timer.totals["fetch"][0] == 5
+    assert timer.totals["transform"][0] == 3
+    # header + 3 pages
+    assert timer.totals["write"][0] == 4
+
+
+def test_profile_cpu_writes_pstats():
+    """--profile cpu writes a loadable pstats file and reports phases on stderr"""
+    doc = generate_doc(tables=1, columns=3, rows=50)
+    runner = CliRunner(mix_stderr=False)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stats_file = os.path.join(temp_dir, "export.pstats")
+        with FakeCodaServer([doc]) as server:
+            result = runner.invoke(
+                clickMain, ['--profile', 'cpu', '--profile-output', stats_file,
+                            'export-table', '--doc', doc["id"], '--table', doc["tables"][0]["id"]],
+                env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+            )
+        assert result.exit_code == 0
+        assert pstats.Stats(stats_file).total_calls > 0
+    assert f"CPU profile written to {stats_file}" in result.stderr
+    assert "transform" in result.stderr
+
+
+def test_profile_cpu_includes_prefetch_thread():
+    """With the default prefetch the row pipeline runs in a worker thread and is still profiled"""
+    doc = generate_doc(tables=1, columns=3, rows=450)
+    runner = CliRunner(mix_stderr=False)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stats_file = os.path.join(temp_dir, "export.pstats")
+        with FakeCodaServer([doc]) as server:
+            result = runner.invoke(
+                clickMain, ['--profile', 'cpu', '--profile-output', stats_file,
+                            'export-table', '--doc', doc["id"], '--table', doc["tables"][0]["id"]],
+                env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+            )
+        assert result.exit_code == 0, result.output
+        functions = {name for _, _, name in pstats.Stats(stats_file).stats}
+    assert {"iter_row_pages", "_compact_pages", "from_columns"} <= functions
+
+
+def test_profile_mem_reports_peak_and_sites():
+    """--profile mem reports the peak and top allocation sites for export-template"""
+    doc = generate_doc(tables=2, columns=3, rows=10)
+    runner = CliRunner(mix_stderr=False)
+    with FakeCodaServer([doc]) as server:
+        result = runner.invoke(
+            clickMain, ['--profile', 'mem', 'export-template', '--doc', doc["id"]],
+            env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+        )
+    assert result.exit_code == 0
+    assert "Memory: peak" in result.stderr
+    assert "Top allocation sites:" in result.stderr
+    for phase in ("fetch", "parse", "transform", "write"):
+        assert f"  {phase}" in result.stderr
@@ -0,0 +1,63 @@
+"""Tests for column projection and row filter pushdown"""
+import json
+import pytest
+from unittest.mock import patch
+from click.testing import CliRunner
+
+from coda import clickMain
+from common.row_filter import RowFilter, parse_where
+
+
+COLUMNS = [
+    {"id": "c-name", "name": "Name"},
+    {"id": "c-status", "name": "Status"},
+    {"id": "c-owner", "name": "Owner"},
+    {"id": "c-points", "name": "Points"}
+]
+ROWS = [
+    {"id": "i-1", "href": "https://coda.io/apis/v1/...", "browserLink": "https://coda.io/d/...",
+     "values": {"c-name": "Spec", "c-status": "Open", "c-owner": "Ann", "c-points": 3}},
+    {"id": "i-2", "values": {"c-name": "Build", "c-status": "Open", "c-owner": "Bob", "c-points": 5}},
+    {"id": "i-3", "values": {"c-name": "Ship", "c-status": "Open", "c-owner": ["Ann", "Bob"], "c-points": 1}}
+]
+
+
+def test_first_filter_pushed_down_rest_local():
+    """Only the first filter becomes the API query, the rest filter while streaming"""
+    row_filter = RowFilter(COLUMNS, ["Name", "Points"], ["Status:Open", "Owner:Ann"])
+
+    assert row_filter.api_query() == 'c-status:"Open"'
+    rows = list(row_filter.apply(ROWS))
+    assert rows == [
+        {"id": "i-1", "values": {"c-name": "Spec", "c-points": 3}},
+        {"id": "i-3", "values": {"c-name": "Ship", "c-points": 1}}
+    ]
+    assert [col["name"] for col in row_filter.columns] == ["Name", "Points"]
+
+
+def test_filter_values_and_errors():
+    """Values parse as JSON when possible and unknown columns are rejected"""
+    assert parse_where("Points:5") == ("Points", 5)
+    assert parse_where("Name:Spec: draft") == ("Name", "Spec: draft")
+    assert RowFilter(COLUMNS, where=["Points:5"]).api_query() == "c-points:5"
+    with pytest.raises(ValueError):
+        RowFilter(COLUMNS, ["Missing"])
+    with pytest.raises(ValueError):
+        RowFilter(COLUMNS, where=["Status"])
+
+
+def test_export_table_columns_and_where():
+    """export-table passes the query to the API and writes only selected columns"""
+    with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
+        mock_list_columns.return_value = json.dumps(COLUMNS)
+        mock_iter_row_pages.return_value = iter([{"items": ROWS}])
+
+        result = CliRunner().invoke(clickMain, [
+            'export-table', '--doc', 'test-doc', '--table', 'test-table',
+            '--columns', 'Points,Name', '--where', 'Status:Open', '--where', 'Owner:Bob'
+        ])
+
+        assert result.exit_code == 0
+        assert result.output.split() == ["Points,Name", "5,Build", "1,Ship"]
+        mock_iter_row_pages.assert_called_once_with('test-doc', 'test-table', strQuery='c-status:"Open"')
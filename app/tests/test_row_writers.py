@@ -0,0 +1,142 @@
+"""Tests for JSON Lines and SQLite export-table output"""
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import pytest
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.row_writers import JsonlWriter, SqliteWriter, output_types
+
+COLUMNS = [
+    {"name": "Task", "id": "c-task", "format": {"type": "text"}},
+    {"name": "Cost", "id": "c-cost", "format": {"type": "currency"}},
+    {"name": "Done", "id": "c-done", "format": {"type": "checkbox"}},
+    {"name": "Tags", "id": "c-tags", "format": {"type": "select"}},
+]
+ROWS = [
+    {"id": "i-1", "values": {"c-task": "Write", "c-cost": {"@type": "MonetaryAmount", "amount": 12.5},
+                             "c-done": True, "c-tags": [{"name": "a"}, {"name": "b"}]}},
+    {"id": "i-2", "values": {"c-task": "Ship, \"now\"", "c-cost": 3, "c-done": False, "c-tags": None}},
+]
+
+
+def _export(*args):
+    with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
+        mock_list_columns.return_value = json.dumps(COLUMNS)
+        mock_iter_row_pages.return_value = iter([{"items": ROWS[:1], "nextPageToken": "p2"}, {"items": ROWS[1:]}])
+        return CliRunner().invoke(clickMain, ['export-table', '--doc', 'd', '--table', 'grid-1', *args])
+
+
+def test_jsonl_writer_keeps_native_types():
+    """Each record becomes one JSON object keyed by the header"""
+    stream = io.StringIO()
+    writer = JsonlWriter(stream)
+    writer.write_records([["a", "b"]], header=True)
+    size = writer.write_records([[1, None], [True, ["x", "é"]]])
+    assert stream.getvalue() == '{"a":1,"b":null}\n{"a":true,"b":["x","é"]}\n'
+    assert size == len(stream.getvalue().encode("utf-8"))
+
+
+def test_sqlite_writer_creates_typed_table_and_replaces_it():
+    """The header record creates typed columns; exporting again replaces the table"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "out.sqlite")
+        for _ in range(2):
+            with SqliteWriter(db_path, "grid-1", output_types(COLUMNS)) as db:
+                db.write_records([["Task", "Cost", "Done", "Tags"]], header=True)
+                assert db.write_records([["Write", 12.5, True, ["a"]]]) >= 0
+        conn = sqlite3.connect(db_path)
+        types = [row[2] for row in conn.execute('PRAGMA table_info("grid-1")')]
+        assert types == ["TEXT", "REAL", "INTEGER", "TEXT"]
+        assert conn.execute('SELECT * FROM "grid-1"').fetchall() == [("Write", 12.5, 1, '["a"]')]
+        conn.close()
+
+
+def test_export_table_format_jsonl_to_stdout():
+    """--format jsonl streams one typed object per row"""
+    result = _export('--format', 'jsonl')
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.output.splitlines() if line]
+    assert lines == [
+        {"Task": "Write", "Cost": 12.5, "Done": True, "Tags": ["a", "b"]},
+        {"Task": "Ship, \"now\"", "Cost": 3, "Done": False, "Tags": None},
+    ]
+
+
+def test_export_table_format_sqlite():
+    """--format sqlite loads every page into a typed table named after the table ID"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "export.db")
+        result = _export('--format', 'sqlite', '--output', db_path)
+        assert result.exit_code == 0
+        assert f"Table data exported to {db_path} (table grid-1)" in result.output
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute('SELECT Task, Cost, Done, Tags FROM "grid-1" ORDER BY rowid').fetchall()
+        conn.close()
+    assert rows == [("Write", 12.5, 1, '["a", "b"]'), ('Ship, "now"', 3.0, 0, None)]
+
+
+def test_export_table_format_errors():
+    """SQLite output needs a database file; sharding stays CSV only"""
+    result = _export('--format', 'sqlite')
+    assert result.exit_code != 0
+    assert "--format sqlite needs" in result.output
+    result = _export('--format', 'jsonl', '--output', 'rows.jsonl', '--shard-rows', '1')
+    assert result.exit_code != 0
+    assert "Sharding is only supported for CSV output" in result.output
+
+
+def test_export_table_jsonl_resume_keeps_keys():
+    """A resumed JSON Lines export still writes keyed objects after the checkpoint"""
+    def interrupted(*args, **kwargs):
+        yield {"items": ROWS[:1], "nextPageToken": "p2"}
+        raise ConnectionError("connection reset")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, "rows.jsonl")
+        args = ['export-table', '--doc', 'd', '--table', 'grid-1', '--format', 'jsonl', '--output', output_file]
+        with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+             patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
+            mock_list_columns.return_value = json.dumps(COLUMNS)
+            mock_iter_row_pages.side_effect = interrupted
+            assert CliRunner().invoke(clickMain, args + ['--prefetch', '0']).exit_code != 0
+            mock_iter_row_pages.side_effect = lambda *args, **kwargs: iter([{"items": ROWS[1:]}])
+            result = CliRunner().invoke(clickMain, args + ['--resume'])
+        assert result.exit_code == 0, result.output
+        assert mock_iter_row_pages.call_args.kwargs["strPageToken"] == "p2"
+        with open(output_file, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+    assert [line["Task"] for line in lines] == ["Write", 'Ship, "now"']
+    assert lines[1]["Done"] is False
+
+
+def test_typed_outputs_hold_numeric_currency_from_the_api():
+    """Against the API stand-in, currency lands as REAL in SQLite and as a JSON number"""
+    doc = generate_doc(tables=1, columns=7, rows=30)
+    table = doc["tables"][0]
+    amounts = [row["values"]["c-0-2"]["amount"] for row in table["rows"]]
+    with tempfile.TemporaryDirectory() as temp_dir, FakeCodaServer([doc]) as server:
+        env = {"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+        db_path = os.path.join(temp_dir, "export.db")
+        args = ['export-table', '--doc', doc["id"], '--table', table["id"]]
+        result = CliRunner().invoke(clickMain, args + ['--format', 'sqlite', '--output', db_path], env=env)
+        assert result.exit_code == 0, result.output
+        conn = sqlite3.connect(db_path)
+        types = conn.execute(f'SELECT DISTINCT typeof("Column 2") FROM "{table["id"]}"').fetchall()
+        total = conn.execute(f'SELECT SUM("Column 2") FROM "{table["id"]}"').fetchone()[0]
+        conn.close()
+
+        result = CliRunner().invoke(clickMain, args + ['--format', 'jsonl'], env=env)
+        assert result.exit_code == 0, result.output
+        records = [json.loads(line) for line in result.output.splitlines() if line]
+    assert types == [("real",)] and total == pytest.approx(sum(amounts))
+    assert [record["Column 2"] for record in records] == amounts
+    assert records[0]["Column 6"] == table["rows"][0]["values"]["c-0-6"]["name"]
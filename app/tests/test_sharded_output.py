@@ -0,0 +1,84 @@
+"""Tests for sharded export-table output with a manifest"""
+import csv
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import pytest
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.sharded_output import ShardedOutput, parse_size
+
+
+def test_parse_size():
+    """Sizes accept plain bytes and binary unit suffixes"""
+    assert parse_size("500000") == 500000
+    assert parse_size("64k") == 64 * 1024
+    assert parse_size("100MB") == 100 * 1024 ** 2
+    assert parse_size("1.5G") == int(1.5 * 1024 ** 3)
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_shard_rows_parts_and_manifest():
+    """Each part starts with the header and the manifest covers every row"""
+    doc = generate_doc(tables=1, columns=3, rows=450)
+    table = doc["tables"][0]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, "rows.csv.gz")
+        with FakeCodaServer([doc]) as server:
+            result = CliRunner().invoke(
+                clickMain, ['export-table', '--doc', doc["id"], '--table', table["id"],
+                            '--output', output_file, '--shard-rows', '200'],
+                env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+            )
+        assert result.exit_code == 0
+        assert "exported to 3 parts" in result.output
+        with open(os.path.join(temp_dir, "rows.manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        assert manifest["rows"] == 450
+        assert [(p["first_row"], p["last_row"]) for p in manifest["parts"]] == [(1, 200), (201, 400), (401, 450)]
+
+        names = [col["name"] for col in table["columns"]]
+        total = []
+        for part in manifest["parts"]:
+            assert part["file"].startswith("rows.part-") and part["file"].endswith(".csv.gz")
+            path = os.path.join(temp_dir, part["file"])
+            with open(path, "rb") as f:
+                data = f.read()
+            assert hashlib.sha256(data).hexdigest() == part["sha256"]
+            assert len(data) == part["bytes"]
+            rows = list(csv.reader(gzip.decompress(data).decode("utf-8").splitlines()))
+            assert rows[0] == names
+            assert len(rows) - 1 == part["rows"]
+            total.extend(rows[1:])
+        assert len(total) == 450
+
+
+def test_shard_bytes_splits_on_row_boundaries():
+    """Parts roll over once their CSV text reaches the byte limit"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with ShardedOutput(os.path.join(temp_dir, "rows.csv"), shard_bytes=100) as shards:
+            shards.write_records([["Name", "Notes"]], header=True)
+            shards.write_records([[f"Row {index}", "line one\nline two"] for index in range(20)])
+        assert len(shards.parts) > 1
+        for part in shards.parts:
+            with open(os.path.join(temp_dir, part["file"]), encoding="utf-8", newline="") as f:
+                rows = list(csv.reader(f))
+            assert rows[0] == ["Name", "Notes"]
+            assert all(row[1] == "line one\nline two" for row in rows[1:])
+        assert sum(part["rows"] for part in shards.parts) == 20
+
+
+def test_shard_bytes_counts_encoded_bytes_of_multibyte_values():
+    """A limit in bytes counts UTF-8 bytes, so multibyte text fills parts sooner than its length"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with ShardedOutput(os.path.join(temp_dir, "rows.csv"), shard_bytes=100) as shards:
+            shards.write_records([["Price"]], header=True)
+            written = shards.write_records([["€" * 10] for _ in range(20)])
+        assert written == 20 * len(("€" * 10 + "\r\n").encode("utf-8"))  # 32 bytes a row, 12 characters
+        assert [part["rows"] for part in shards.parts] == [4] * 5
@@ -0,0 +1,107 @@
+"""Tests for streaming table-to-table copy"""
+import json
+import threading
+import pytest
+from unittest.mock import Mock, patch
+from click.testing import CliRunner
+
+from coda import clickMain
+from common.pycoda import Pycoda
+from common.prefetch import prefetch
+from common.table_copier import TableCopier
+
+
+SRC_COLUMNS = [
+    {"id": "c-src-name", "name": "Name"},
+    {"id": "c-src-qty", "name": "Qty"},
+    {"id": "c-src-only", "name": "Source Only"}
+]
+DST_COLUMNS = [
+    {"id": "c-dst-qty", "name": "Qty"},
+    {"id": "c-dst-name", "name": "Name"},
+    {"id": "c-dst-total", "name": "Source Only", "calculated": True}
+]
+
+
+def _pages(count, per_page):
+    """Build count pages of per_page source rows"""
+    return [
+        {"items": [
+            {"values": {"c-src-name": f"Row {p}-{i}", "c-src-qty": i, "c-src-only": "x"}}
+            for i in range(per_page)
+        ]}
+        for p in range(count)
+    ]
+
+
+@pytest.fixture
+def mock_pycoda():
+    """Mock Pycoda with source and destination column metadata"""
+    client = Mock(spec=Pycoda)
+    client.list_columns.side_effect = [json.dumps(SRC_COLUMNS), json.dumps(DST_COLUMNS)]
+    client.upsert_rows.return_value = {"requestId": "req-1"}
+    return client
+
+
+def test_copy_maps_columns_by_name_and_batches(mock_pycoda):
+    """Rows are mapped by column name, calculated columns skipped, and upserted in batches"""
+    mock_pycoda.iter_row_pages.return_value = iter(_pages(3, 4))
+
+    summary = TableCopier(mock_pycoda, batch_size=5).copy_table("doc-a", "grid-t", "doc-b", "grid-u")
+
+    assert summary == {"rows": 12, "batches": 3, "columns": ["Name", "Qty"]}
+    batch_sizes = [len(c.args[2]) for c in mock_pycoda.upsert_rows.call_args_list]
+    assert batch_sizes == [5, 5, 2]
+    first_row = mock_pycoda.upsert_rows.call_args_list[0].args[2][0]
+    assert first_row == {"cells": [
+        {"column": "c-dst-name", "value": "Row 0-0"},
+        {"column": "c-dst-qty", "value": 0}
+    ]}
+
+
+def test_copy_key_columns_and_errors(mock_pycoda):
+    """Key columns resolve to destination IDs and upsert errors abort the copy"""
+    mock_pycoda.iter_row_pages.return_value = iter(_pages(1, 2))
+    mock_pycoda.upsert_rows.return_value = {"error": "Status code: 400"}
+
+    with pytest.raises(ValueError) as exc_info:
+        TableCopier(mock_pycoda).copy_table("doc-a", "grid-t", "doc-b", "grid-u", ["Name"])
+    assert "Upsert failed" in str(exc_info.value)
+    assert mock_pycoda.upsert_rows.call_args.args[3] == ["c-dst-name"]
+
+
+def test_prefetch_reads_ahead_and_propagates_errors():
+    """Producer runs ahead in its own thread and its errors surface in the consumer"""
+    producer_threads = set()
+
+    def source():
+        for i in range(5):
+            producer_threads.add(threading.current_thread().name)
+            yield i
+        raise RuntimeError("page fetch failed")
+
+    consumed = []
+    with pytest.raises(RuntimeError):
+        for item in prefetch(source(), depth=2):
+            consumed.append(item)
+    assert consumed == [0, 1, 2, 3, 4]
+    assert producer_threads == {"prefetch"}
+
+
+def test_copy_table_cli():
+    """copy-table command prints a summary of the copy"""
+    with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages, \
+         patch('common.pycoda.Pycoda.upsert_rows') as mock_upsert_rows:
+        mock_list_columns.side_effect = [json.dumps(SRC_COLUMNS), json.dumps(DST_COLUMNS)]
+        mock_iter_row_pages.return_value = iter(_pages(2, 3))
+        mock_upsert_rows.return_value = {"requestId": "req-1"}
+
+        result = CliRunner().invoke(clickMain, [
+            'copy-table', '--src-doc', 'doc-a', '--src-table', 'grid-t',
+            '--dst-doc', 'doc-b', '--dst-table', 'grid-u'
+        ])
+
+        assert result.exit_code == 0
+        assert "Copied 6 rows in 1 batches" in result.output
+        assert "Columns mapped: Name, Qty" in result.output
@@ -24,10 +24,10 @@ def test_export_table_basic():
     ]
     
     with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
-         patch('common.pycoda.Pycoda.list_rows') as mock_list_rows:
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
         
         mock_list_columns.return_value = json.dumps(mock_columns)
-        mock_list_rows.return_value = json.dumps(mock_rows)
+        mock_iter_row_pages.return_value = iter([{"items": mock_rows}])
         
         runner = CliRunner()
         result = runner.invoke(clickMain, [
@@ -71,11 +71,11 @@ def test_export_table_file_permission_error():
     mock_rows = [{"values": {"c-task-123": "Test task"}}]
     
     with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
-         patch('common.pycoda.Pycoda.list_rows') as mock_list_rows, \
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages, \
          patch('builtins.open', side_effect=PermissionError("Permission denied")):
         
         mock_list_columns.return_value = json.dumps(mock_columns)
-        mock_list_rows.return_value = json.dumps(mock_rows)
+        mock_iter_row_pages.return_value = iter([{"items": mock_rows}])
         
         runner = CliRunner()
         result = runner.invoke(clickMain, [
@@ -114,10 +114,10 @@ def test_export_to_file_and_unicode():
         ]
         
         with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
-             patch('common.pycoda.Pycoda.list_rows') as mock_list_rows:
+             patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
             
             mock_list_columns.return_value = json.dumps(unicode_columns)
-            mock_list_rows.return_value = json.dumps(unicode_rows)
+            mock_iter_row_pages.return_value = iter([{"items": unicode_rows}])
             
             runner = CliRunner()
             result = runner.invoke(clickMain, [
@@ -187,10 +187,10 @@ def test_export_csv_special_characters():
     ]
     
     with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
-         patch('common.pycoda.Pycoda.list_rows') as mock_list_rows:
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
         
         mock_list_columns.return_value = json.dumps(special_columns)
-        mock_list_rows.return_value = json.dumps(special_rows)
+        mock_iter_row_pages.return_value = iter([{"items": special_rows}])
         
         runner = CliRunner()
         result = runner.invoke(clickMain, [
@@ -262,7 +262,7 @@ def test_export_table_with_template_name():
     # Mock both the template registry and API calls
     with patch('common.template_registry.TemplateRegistry') as mock_registry_class, \
          patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
-         patch('common.pycoda.Pycoda.list_rows') as mock_list_rows:
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
         
         # Setup mock template registry instance
         mock_registry = mock_registry_class.return_value
@@ -271,7 +271,7 @@ def test_export_table_with_template_name():
         
         # Setup API mocks 
         mock_list_columns.return_value = json.dumps(mock_columns)
-        mock_list_rows.return_value = json.dumps(mock_rows)
+        mock_iter_row_pages.return_value = iter([{"items": mock_rows}])
         
         runner = CliRunner()
         result = runner.invoke(clickMain, [
@@ -287,9 +287,102 @@ def test_export_table_with_template_name():
         
         # Verify API was called with resolved document ID
         mock_list_columns.assert_called_once_with('test-doc-123', 'test-table-id')
-        mock_list_rows.assert_called_once_with('test-doc-123', 'test-table-id')
+        mock_iter_row_pages.assert_called_once_with('test-doc-123', 'test-table-id')
         
         # Verify expected CSV output
         assert 'Task,Owner,Priority' in result.output  # Expected CSV headers
         assert 'Setup project,John Doe,High' in result.output  # Expected CSV data
         assert 'Define scope,Jane Smith,Medium' in result.output  # Expected CSV data
+
+
+def test_export_table_expand_lookups():
+    """Test --expand lookups joins referenced rows from a single fetch per table
+
+    Lookup cells arrive as rich row references; each referenced table must be
+    fetched once and joined locally rather than resolved with per-row API calls.
+    """
+    columns = {
+        "grid-tasks": [
+            {"name": "Task", "id": "c-task", "format": {"type": "text"}},
+            {"name": "Project", "id": "c-proj", "format": {"type": "lookup", "table": {"id": "grid-proj", "name": "Projects"}}}
+        ],
+        "grid-proj": [
+            {"name": "Name", "id": "c-pname", "format": {"type": "text"}},
+            {"name": "Owner", "id": "c-owner", "format": {"type": "person"}}
+        ]
+    }
+
+    def ref(row_id, name):
+        return {"@context": "http://schema.org/", "@type": "StructuredValue", "additionalType": "row",
+                "name": name, "rowId": row_id, "tableId": "grid-proj"}
+
+    pages = {
+        "grid-tasks": [{"items": [
+            {"values": {"c-task": "Spec", "c-proj": ref("i-p1", "Alpha")}},
+            {"values": {"c-task": "Review", "c-proj": [ref("i-p1", "Alpha"), ref("i-p2", "Beta")]}},
+            {"values": {"c-task": "Idle", "c-proj": ""}}
+        ]}],
+        "grid-proj": [{"items": [
+            {"id": "i-p1", "values": {"c-pname": "Alpha", "c-owner": "Ann"}},
+            {"id": "i-p2", "values": {"c-pname": "Beta", "c-owner": "Bob"}}
+        ]}]
+    }
+
+    with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
+
+        mock_list_columns.side_effect = lambda doc, table: json.dumps(columns[table])
+        mock_iter_row_pages.side_effect = lambda doc, table, **kwargs: iter(pages[table])
+
+        runner = CliRunner()
+        result = runner.invoke(clickMain, [
+            'export-table', '--doc', 'test-doc', '--table', 'grid-tasks', '--expand', 'lookups'
+        ])
+
+        assert result.exit_code == 0
+        import csv
+        from io import StringIO
+        rows = [row for row in csv.reader(StringIO(result.output)) if row]
+        assert rows[0] == ["Task", "Project", "Project.Name", "Project.Owner"]
+        assert rows[1] == ["Spec", "Alpha", "Alpha", "Ann"]
+        assert rows[2] == ["Review", "Alpha, Beta", "Alpha, Beta", "Ann, Bob"]
+        assert rows[3] == ["Idle", "", "", ""]
+
+        # One paginated read per table, exported rows requested in rich format
+        assert mock_iter_row_pages.call_count == 2
+        assert mock_iter_row_pages.call_args_list[1].kwargs == {"strValueFormat": "rich"}
+
+
+def test_export_prefetches_next_page_while_writing():
+    """The next page is fetched while the current one is still being written"""
+    import time
+    from io import StringIO
+    from unittest.mock import Mock
+    from common.pycoda import Pycoda
+    from common.table_data_exporter import TableDataExporter
+
+    events = []
+    columns = [{"name": "Name", "id": "c-name"}]
+
+    def pages(*args, **kwargs):
+        for index in range(4):
+            events.append(f"fetch {index}")
+            yield {"items": [{"values": {"c-name": f"Row {index}"}}]}
+
+    class SlowStream(StringIO):
+        def write(self, chunk):
+            time.sleep(0.05)
+            events.append("write")
+            return super().write(chunk)
+
+    client = Mock(spec=Pycoda)
+    client.list_columns.return_value = json.dumps(columns)
+    client.iter_row_pages.side_effect = pages
+    stream = SlowStream()
+
+    rows = TableDataExporter(client, prefetch_depth=2).write_table_csv(stream, "doc-1", "grid-1")
+
+    assert rows == 4
+    assert stream.getvalue().splitlines() == ["Name", "Row 0", "Row 1", "Row 2", "Row 3"]
+    # Page 2 was fetched before the writer finished page 1 (header write + page 0 write)
+    assert events.index("fetch 2") < [i for i, event in enumerate(events) if event == "write"][2]
@@ -0,0 +1,101 @@
+"""Tests for the describe-table command"""
+import json
+import statistics
+import tracemalloc
+import pytest
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.table_describer import TableDescriber
+
+COLUMNS = [
+    {"name": "Task", "id": "c-task", "format": {"type": "text"}},
+    {"name": "Cost", "id": "c-cost", "format": {"type": "currency"}},
+    {"name": "Status", "id": "c-status", "format": {"type": "select"}},
+]
+
+
+def _pages(count, size=100):
+    for page in range(count):
+        yield {"items": [
+            {"id": f"i-{page}-{row}", "values": {
+                "c-task": f"Task {page}-{row}",
+                "c-cost": {"@type": "MonetaryAmount", "amount": row},
+                "c-status": "Done" if row % 4 else ""}}
+            for row in range(size)
+        ], "nextPageToken": f"p{page + 1}" if page + 1 < count else None}
+
+
+def _invoke(args, pages):
+    """Run the command on rich-format pages, which is what describe-table requests for these columns"""
+    with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+         patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
+        mock_list_columns.return_value = json.dumps(COLUMNS)
+        mock_iter_row_pages.return_value = pages
+        result = CliRunner().invoke(clickMain, args)
+    if mock_iter_row_pages.called:
+        assert mock_iter_row_pages.call_args.kwargs["strValueFormat"] == "rich"
+    return result
+
+
+def test_describe_table_json():
+    """describe-table reports nulls, distinct counts, ranges, moments and top values per column"""
+    result = _invoke(['--out', 'json', 'describe-table', '--doc', 'd', '--table', 't', '--top', '1'], _pages(3))
+    assert result.exit_code == 0, result.output
+    task, cost, status = json.loads(result.output)
+    assert task["rows"] == 300 and task["nulls"] == 0
+    assert 290 <= task["distinct"] <= 300
+    assert cost["type"] == "currency" and (cost["min"], cost["max"]) == (0, 99)
+    assert cost["mean"] == 49.5 and round(cost["stddev"], 3) == 28.914
+    assert status["nulls"] == 75 and status["top"] == [["Done", 225]]
+
+
+def test_describe_currency_from_the_api():
+    """Against the API stand-in, currency columns get a numeric range, mean and stddev"""
+    doc = generate_doc(tables=1, columns=3, rows=250)
+    table = doc["tables"][0]
+    amounts = [row["values"]["c-0-2"]["amount"] for row in table["rows"]]
+    with FakeCodaServer([doc]) as server:
+        result = CliRunner().invoke(
+            clickMain, ['--out', 'json', 'describe-table', '--doc', doc["id"], '--table', table["id"],
+                        '--columns', 'Column 2'],
+            env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url})
+    assert result.exit_code == 0, result.output
+    cost = json.loads(result.output)[0]
+    assert (cost["min"], cost["max"]) == (min(amounts), max(amounts))
+    assert cost["mean"] == pytest.approx(statistics.mean(amounts))
+    assert cost["stddev"] == pytest.approx(statistics.stdev(amounts), rel=1e-3)
+
+
+def test_describe_table_text_and_errors():
+    """Text output has one line per column; unknown columns fail cleanly"""
+    result = _invoke(['describe-table', '--doc', 'd', '--table', 't', '--columns', 'Status'], _pages(1))
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[0].split("\t")[:3] == ["column", "type", "rows"]
+    assert lines[1].startswith("Status\tselect\t100\t25\t1\t") and lines[1].endswith("Done (75)")
+
+    result = _invoke(['describe-table', '--doc', 'd', '--table', 't', '--columns', 'Nope'], _pages(1))
+    assert result.exit_code != 0
+    assert "Describe failed" in result.output
+
+
+def test_describe_memory_does_not_grow_with_rows():
+    """Peak memory for ten times the rows stays about the same"""
+    peaks = []
+    for count in (20, 200):
+        with patch('common.pycoda.Pycoda.list_columns') as mock_list_columns, \
+             patch('common.pycoda.Pycoda.iter_row_pages') as mock_iter_row_pages:
+            mock_list_columns.return_value = json.dumps(COLUMNS)
+            mock_iter_row_pages.return_value = _pages(count)
+            from common.pycoda import Pycoda
+            tracemalloc.start()
+            summaries = TableDescriber(Pycoda("test-key")).describe("d", "t")
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        assert summaries[0]["rows"] == count * 100
+    assert peaks[1] < peaks[0] * 1.5
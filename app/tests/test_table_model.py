@@ -0,0 +1,51 @@
+"""Tests for the compact column-oriented Table model"""
+from bench.table_memory import measure
+from common.table_model import POOL_LIMIT, Table
+
+COLUMNS = [{"id": "c-name", "name": "Name"}, {"id": "c-status", "name": "Status"}, {"id": "c-cost", "name": "Cost"}]
+
+
+def _rows(count):
+    return [
+        {"id": f"i-{index}", "href": f"https://coda.io/rows/i-{index}", "browserLink": "https://coda.io/d/_d",
+         "values": {"c-name": f"Task {index}", "c-status": "Open" if index % 2 else "Done",
+                    "c-cost": index * 1.5, "c-unused": "dropped"}}
+        for index in range(count)
+    ]
+
+
+def test_table_keeps_requested_columns_by_index():
+    """Only requested column values are kept and can be read by index, ID or name"""
+    table = Table.from_columns(COLUMNS, _rows(3) + [{"id": "i-empty", "values": {}}])
+    assert len(table) == 4
+    assert table.row(1) == ("Task 1", "Open", 1.5)
+    assert table.column("Status") == table.column("c-status") == table.column(1)
+    assert list(table.rows())[3] == (None, None, None)
+    assert table.index()["i-2"] == 2
+
+
+def test_repeated_strings_are_shared_and_converters_applied():
+    """Equal strings in a column are stored once; converters run as rows are added"""
+    rows = _rows(10)
+    for row in rows:
+        row["values"]["c-status"] = "".join(["In ", "Progress"])  # distinct but equal objects
+    table = Table.from_columns(COLUMNS, rows, converters=[str.upper, str, lambda value: round(value)])
+    statuses = table.column("Status")
+    assert all(status is statuses[0] for status in statuses)
+    assert table.row(3) == ("TASK 3", "In Progress", 4)
+
+
+def test_sharing_stops_for_mostly_distinct_columns():
+    """Columns of unique strings stop pooling so sharing does not cost memory"""
+    table = Table(["c-name"])
+    for index in range(POOL_LIMIT * 4):
+        table.append(f"i-{index}", [f"unique {index}"])
+    assert table._pools[0] is None
+    assert table.column(0)[-1] == f"unique {POOL_LIMIT * 4 - 1}"
+
+
+def test_table_memory_is_a_fraction_of_row_dicts():
+    """The Table holds well under half the memory of the API row dicts"""
+    result = measure(rows=5000, columns=8)
+    assert result["rows"] == 5000
+    assert result["ratio"] < 0.5
@@ -0,0 +1,141 @@
+"""Tests for watching a table's changed rows"""
+import json
+import pytest
+from unittest.mock import Mock, patch
+
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+from common.pycoda import Pycoda
+from common.rate_budget import RateBudget
+from common.table_watcher import TableWatcher, row_hash
+
+
+def _row(row_id, value):
+    return {"id": row_id, "name": value, "updatedAt": "2024-01-01T00:00:00.000Z", "values": {"c-1": value}}
+
+
+def test_sync_tokens_list_only_changed_rows():
+    """After the first full listing each poll fetches one page of changes"""
+    doc = generate_doc(tables=1, columns=3, rows=450)
+    table = doc["tables"][0]
+    first_id = table["rows"][0]["id"]
+    key = table["rows"][0]["values"][table["columns"][0]["id"]]
+    with FakeCodaServer([doc]) as server:
+        pycoda = Pycoda("test-key", server.url)
+        watcher = TableWatcher(pycoda, budget=RateBudget())
+        edits = iter([
+            [{"cells": [{"column": "Column 0", "value": key}, {"column": "Column 1", "value": "changed"}]},
+             {"cells": [{"column": "Column 0", "value": "new row"}]}],
+            [{"cells": [{"column": "Column 0", "value": "new row"}]}],  # rewritten without a change
+        ])
+        requests = []
+
+        def sleep(seconds):
+            requests.append(watcher.requests)
+            pycoda.upsert_rows(doc["id"], table["id"], next(edits), ["Column 0"])
+
+        changes = list(watcher.watch(doc["id"], table["id"], max_polls=3, sleep=sleep))
+    assert [(event, row["id"]) for event, row in changes] == [("updated", first_id), ("added", changes[1][1]["id"])]
+    assert changes[0][1]["values"][table["columns"][1]["id"]] == "changed"
+    assert requests == [3, 1]  # 450 rows in 3 pages, then a single page of changes
+    assert len(watcher.index) == 451 and watcher.requests == 1
+
+
+def test_periodic_reconcile_reports_deletions_between_sync_tokens():
+    """Rows deleted while polling by sync token are reported by the next full listing"""
+    doc = generate_doc(tables=1, columns=3, rows=5)
+    table = doc["tables"][0]
+    deleted_id = table["rows"][2]["id"]
+    with FakeCodaServer([doc]) as server:
+        pycoda = Pycoda("test-key", server.url)
+        watcher = TableWatcher(pycoda, budget=RateBudget(), reconcile_every=3)
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 1:
+                del table["rows"][2]  # the fake server has no delete route
+
+        with patch.object(pycoda, "iter_row_pages", wraps=pycoda.iter_row_pages) as iter_row_pages:
+            changes = list(watcher.watch(doc["id"], table["id"], max_polls=4, sleep=sleep))
+    assert [(event, row["id"]) for event, row in changes] == [("deleted", deleted_id)]
+    tokens = [c.kwargs["strSyncToken"] for c in iter_row_pages.call_args_list]
+    assert tokens[0] is None and tokens[1] and tokens[2] and tokens[3] is None
+    assert deleted_id not in watcher.index and len(watcher.index) == 4
+
+
+def test_full_listing_reports_deletions_without_sync_tokens():
+    """Without sync tokens every poll lists the table, and missing rows are deleted"""
+    pages = iter([
+        [{"items": [_row("i-1", "a"), _row("i-2", "b")]}],
+        [{"items": [_row("i-1", "a"), _row("i-3", "c")]}],
+    ])
+    client = Mock(spec=Pycoda)
+    client.iter_row_pages.side_effect = lambda *args, **kwargs: next(pages)
+    watcher = TableWatcher(client, budget=RateBudget())
+    changes = list(watcher.watch("doc-1", "grid-1", initial=True, max_polls=2, sleep=lambda seconds: None))
+    assert [(event, row["id"]) for event, row in changes] == [
+        ("added", "i-1"), ("added", "i-2"), ("added", "i-3"), ("deleted", "i-2")]
+    assert set(watcher.index) == {"i-1", "i-3"} and watcher.index["i-1"] == row_hash(_row("i-1", "a"))
+
+
+def test_expired_sync_token_resyncs():
+    """A rejected sync token falls back to a full listing diffed against the index"""
+    listings = iter([
+        [{"items": [_row("i-1", "a")], "nextSyncToken": "1"}],
+        Exception("Status code: 410. Message: Sync token expired"),
+        [{"items": [_row("i-1", "b")], "nextSyncToken": "2"}],
+    ])
+
+    def iter_row_pages(doc_id, table_id, strSyncToken=None):
+        listing = next(listings)
+        if isinstance(listing, Exception):
+            raise listing
+        return iter(listing)
+
+    client = Mock(spec=Pycoda)
+    client.iter_row_pages.side_effect = iter_row_pages
+    watcher = TableWatcher(client, budget=RateBudget())
+    changes = list(watcher.watch("doc-1", "grid-1", max_polls=2, sleep=lambda seconds: None))
+    assert [(event, row["values"]["c-1"]) for event, row in changes] == [("updated", "b")]
+    assert [c.kwargs["strSyncToken"] for c in client.iter_row_pages.call_args_list] == [None, "1", None]
+    assert watcher.sync_token == "2" and watcher.requests == 2
+
+
+def test_polling_backs_off_when_idle_within_the_budget():
+    """The wait doubles while idle, resets on changes and never undercuts the rate budget"""
+    watcher = TableWatcher(Mock(spec=Pycoda), min_interval=1, max_interval=8, budget=RateBudget(reads=10, window=6))
+    waits = []
+    interval = 1
+    for changed in (False, False, False, False, True):
+        interval = watcher.next_interval(interval, changed, 1)
+        waits.append(interval)
+    assert waits == [2, 4, 8, 8, 1]
+    assert watcher.next_interval(1, True, 5) == 3.0
+
+
+def test_watch_table_command_emits_ndjson():
+    """Each change is one JSON line with values keyed by column name"""
+    with patch.object(Pycoda, "list_columns", return_value=json.dumps([{"id": "c-1", "name": "Name"}])), \
+            patch.object(Pycoda, "iter_row_pages", return_value=iter([{"items": [_row("i-1", "a")], "nextSyncToken": "1"}])):
+        result = CliRunner().invoke(clickMain, ['watch-table', '--doc', 'doc-1', '--table', 'grid-1',
+                                                '--initial', '--max-polls', '1'])
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line) for line in result.output.splitlines()] == [{
+        "event": "added", "id": "i-1", "name": "a", "updatedAt": "2024-01-01T00:00:00.000Z", "values": {"Name": "a"}}]
+
+
+def test_closed_pipe_stops_watching_quietly():
+    """A reader that goes away, e.g. `| head`, ends the watch like an interrupt"""
+    class ClosedPipe:
+        def write(self, text):
+            raise BrokenPipeError(32, "Broken pipe")
+
+    client = Mock(spec=Pycoda)
+    client.list_columns.return_value = json.dumps([{"id": "c-1", "name": "Name"}])
+    client.iter_row_pages.return_value = iter([{"items": [_row("i-1", "a")]}])
+    watcher = TableWatcher(client, budget=RateBudget())
+    watcher.watch_with_cli_output("doc-1", "grid-1", initial=True, max_polls=1, stream=ClosedPipe())
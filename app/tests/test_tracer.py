@@ -0,0 +1,56 @@
+"""Tests for nested trace spans written to Chrome-trace and JSON files"""
+import json
+import os
+import tempfile
+from click.testing import CliRunner
+
+from bench.fake_coda_server import FakeCodaServer
+from bench.synthetic_doc import generate_doc
+from coda import clickMain
+
+
+def _run_traced(doc, args, trace_format, **server_options):
+    """Run a command against the fake server and return the loaded trace"""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        trace_file = os.path.join(temp_dir, "trace.json")
+        with FakeCodaServer([doc], **server_options) as server:
+            result = runner.invoke(
+                clickMain, ['--trace', trace_file, '--trace-format', trace_format] + args,
+                env={"CODA_API_KEY": "test-key", "CODA_API_ENDPOINT": server.url}
+            )
+        assert result.exit_code == 0
+        with open(trace_file, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def test_json_trace_nests_command_phase_call_retry(monkeypatch):
+    """Spans nest command -> phase -> Pycoda call -> retry"""
+    monkeypatch.setattr("common.pycoda.RETRY_BACKOFF", 0)
+    doc = generate_doc(tables=1, columns=3, rows=450)
+    trace = _run_traced(doc, ['export-table', '--doc', doc["id"], '--table', doc["tables"][0]["id"]], "json",
+                        rate_limit_every=2)
+    spans = {span["id"]: span for span in trace["spans"]}
+
+    command = [span for span in spans.values() if span["name"] == "command"]
+    assert len(command) == 1 and command[0]["attrs"]["command"] == "export-table"
+    retry = next(span for span in spans.values() if span["name"] == "retry")
+    call = spans[retry["parent_id"]]
+    phase = spans[call["parent_id"]]
+    assert call["name"] == "pycoda"
+    assert phase["name"] == "fetch"
+    assert phase["parent_id"] == command[0]["id"]
+    assert command[0]["start"] <= phase["start"] <= phase["end"] <= command[0]["end"]
+
+
+def test_chrome_trace_events():
+    """The chrome format has complete events and named thread tracks"""
+    doc = generate_doc(tables=2, columns=3, rows=5)
+    trace = _run_traced(doc, ['export-template', '--doc', doc["id"]], "chrome")
+    events = trace["traceEvents"]
+    complete = [event for event in events if event["ph"] == "X"]
+    assert {"command", "fetch", "parse", "transform", "write", "pycoda"} <= {event["name"] for event in complete}
+    assert all(event["dur"] >= 0 and event["ts"] >= 0 for event in complete)
+    assert any(event["ph"] == "M" and event["name"] == "thread_name" for event in events)
+    methods = {event["args"].get("method") for event in complete if event["name"] == "pycoda"}
+    assert {"get_doc", "list_sections", "list_tables", "list_columns"} <= methods